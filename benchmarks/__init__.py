@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'Benchmarks of the client against a local duedil stub, run with python -m benchmarks'
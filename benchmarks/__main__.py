@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Run the benchmark suite against a local duedil stub:
+
+    python -m benchmarks                      # run and compare with the baseline
+    python -m benchmarks --save               # run and store a new baseline
+
+The baseline holds timings of this machine only, so it is not committed:
+the first run stores one and later runs compare against it.
+    python -m benchmarks -k search --latency 0.02 --qps 50
+    python -m benchmarks --synthetic --size 100000 --baseline synthetic.json
+    python -m benchmarks --record run.cassette   # then --replay run.cassette, no server
+'''
+from __future__ import unicode_literals
+
+import argparse
+import os
+import sys
+
+from duedil.cache import configure_cache, dp_region
+from duedil.testing.stub import StubDataset, StubServer, StubTransport
+from duedil.testing.synthetic import SyntheticDataset
+from duedil.transport import Cassette, RecordingTransport, ReplayTransport
+
+from . import harness, suite
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='names', action='append', help='only benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file, default %(default)s')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative change reported as a regression, default %(default)s')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the repeat counts')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='stub latency jitter in seconds')
+    parser.add_argument('--qps', type=int, default=None, help='stub QPS limit, 403 beyond it')
+    parser.add_argument('--size', type=int, default=10000, help='companies in the stub dataset')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='serve the full synthetic dataset instead of the minimal stub payloads')
+    parser.add_argument('--in-process', action='store_true',
+                        help='answer from the dataset in process, without HTTP, to time the client alone')
+    parser.add_argument('--record', metavar='CASSETTE', help='record the traffic to the stub in CASSETTE')
+    parser.add_argument('--replay', metavar='CASSETTE',
+                        help='replay CASSETTE instead of running the stub, for runs without noise from the server')
+    parser.add_argument('--replay-latency', type=float, default=0.0,
+                        help='with --replay, sleep this many times the recorded response times')
+    args = parser.parse_args(argv)
+
+    if not dp_region.is_configured:
+        configure_cache('dogpile.cache.memory')
+    dataset = SyntheticDataset(size=args.size) if args.synthetic else StubDataset(size=args.size)
+    server = StubServer(dataset, latency=args.latency, jitter=args.jitter,
+                        qps_limit=args.qps, seed=0)
+    if args.in_process:
+        context = suite.Context(server, StubTransport(dataset, latency=args.latency))
+        results = harness.run(context, args.names, args.scale)
+    elif args.replay:
+        with Cassette(args.replay) as cassette:
+            context = suite.Context(server, ReplayTransport(cassette, latency=args.replay_latency))
+            results = harness.run(context, args.names, args.scale)
+    elif args.record:
+        with server, Cassette(args.record, 'w') as cassette:
+            results = harness.run(suite.Context(server, RecordingTransport(cassette)), args.names, args.scale)
+    else:
+        with server:
+            results = harness.run(suite.Context(server), args.names, args.scale)
+    sys.stdout.write('{0} requests served, {1} rejected\n'.format(server.requests, server.rejected))
+
+    if args.save or not os.path.exists(args.baseline):
+        harness.save(results, args.baseline)
+        sys.stdout.write('baseline written to {0}\n'.format(args.baseline))
+        return 0
+    lines, regressed = harness.compare(harness.load(args.baseline), results, args.tolerance)
+    sys.stdout.write('\n' + '\n'.join(lines) + '\n')
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
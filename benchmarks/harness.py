@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'Timing, baselines and the comparison report of the benchmark suite'
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import json
+import platform
+import sys
+import time
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name, repeat=20, warmup=1):
+    '''
+    Register a benchmark. The decorated function gets the suite context and
+    returns the operation to time, a zero argument callable
+    '''
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat, warmup)
+        return setup
+    return register
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(operation, repeat, warmup=1):
+    for _ in range(warmup):
+        operation()
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        operation()
+        timings.append(time.time() - start)
+    total = sum(timings)
+    return {
+        'repeat': repeat,
+        'ops_per_sec': repeat / total if total else float('inf'),
+        'p50_ms': percentile(timings, 0.5) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'max_ms': max(timings) * 1000,
+    }
+
+
+def run(context, names=None, scale=1.0, out=sys.stdout):
+    results = OrderedDict()
+    for name, (setup, repeat, warmup) in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        operation = setup(context)
+        results[name] = measure(operation, max(1, int(repeat * scale)), warmup)
+        out.write('{0:<32} {1:>10.1f} ops/s  p50 {2:>8.2f} ms  p95 {3:>8.2f} ms\n'.format(
+            name, results[name]['ops_per_sec'], results[name]['p50_ms'], results[name]['p95_ms']))
+    return results
+
+
+def save(results, path):
+    document = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+    with open(path, 'w') as baseline:
+        json.dump(document, baseline, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as baseline:
+        return json.load(baseline)['results']
+
+
+def compare(baseline, results, tolerance=0.25, min_ms=0.1):
+    '''
+    (report lines, regressed names): a benchmark regresses when its
+    throughput drops or its p95 grows by more than tolerance; p95s below
+    min_ms are timer noise and not compared
+    '''
+    lines = ['{0:<32} {1:>12} {2:>12} {3:>8} {4:>8}  {5}'.format(
+        'benchmark', 'baseline/s', 'current/s', 'ops', 'p95', 'status')]
+    regressed = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            lines.append('{0:<32} {1:>12} {2:>12.1f} {3:>8} {4:>8}  new'.format(
+                name, '-', current['ops_per_sec'], '-', '-'))
+            continue
+        throughput = current['ops_per_sec'] / before['ops_per_sec'] - 1
+        latency = current['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] >= min_ms else 0.0
+        if throughput < -tolerance or latency > tolerance:
+            status = 'REGRESSION'
+            regressed.append(name)
+        elif throughput > tolerance:
+            status = 'faster'
+        else:
+            status = 'ok'
+        lines.append('{0:<32} {1:>12.1f} {2:>12.1f} {3:>+7.0%} {4:>+7.0%}  {5}'.format(
+            name, before['ops_per_sec'], current['ops_per_sec'], throughput, latency, status))
+    return lines, regressed
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+The benchmarks. Every one gets a context with the running stub server and
+returns the operation to time; the dogpile region is a memory cache that
+the uncached benchmarks invalidate before each operation.
+'''
+from __future__ import unicode_literals
+
+import itertools
+
+from duedil.cache import dp_region
+from duedil.crawler import Crawler
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+
+from .harness import benchmark
+
+
+class Context(object):
+
+    def __init__(self, server, transport=None):
+        self.server = server
+        self.transport = transport
+        self.ids = itertools.count(1)
+
+    def client(self, **kwargs):
+        if self.transport is not None:
+            kwargs.setdefault('transport', self.transport)
+        return self.server.client(**kwargs)
+
+    def next_id(self):
+        return str(next(self.ids) % self.server.dataset.size + 1)
+
+
+@benchmark('client.get uncached', repeat=200)
+def client_get_uncached(context):
+    client = context.client()
+
+    def operation():
+        dp_region.invalidate()
+        client.get('uk/companies/{0}'.format(context.next_id()))
+    return operation
+
+
+@benchmark('client.get dogpile hit', repeat=2000)
+def client_get_cached(context):
+    client = context.client()
+    client.get('uk/companies/1')
+    return lambda: client.get('uk/companies/1')
+
+
+@benchmark('client.get_many 32 concurrent', repeat=20)
+def client_get_many(context):
+    client = context.client()
+    endpoints = ['uk/companies/{0}'.format(i) for i in range(1, 33)]
+
+    def operation():
+        dp_region.invalidate()
+        client.get_many(endpoints)
+    return operation
+
+
+@benchmark('session hit', repeat=5000)
+def session_hit(context):
+    client = context.client(session=Session())
+    Company.instance(client, '1')
+    return lambda: Company.instance(client, '1')
+
+
+@benchmark('Company construction x100', repeat=200)
+def company_construction(context):
+    client = context.client()
+    payloads = [context.server.dataset.get('uk/companies/{0}'.format(i), {})['response'] for i in range(1, 101)]
+
+    def operation():
+        for payload in payloads:
+            payload = dict(payload)
+            Company(payload.pop('id'), client=client, **payload)
+    return operation
+
+
+@benchmark('search 500 rows in pages', repeat=10)
+def search_pagination(context):
+    client = context.client()
+
+    def operation():
+        dp_region.invalidate()
+        results = client.search_company(limit=100, status='Active')
+        # indexing pages forward, iterating only walks the rows already fetched
+        for index in range(min(500, len(results))):
+            results[index]
+    return operation
+
+
+@benchmark('crawl depth 2', repeat=5)
+def graph_crawl(context):
+    def operation():
+        dp_region.invalidate()
+        client = context.client(session=Session())
+        crawler = Crawler(client, max_depth=2)
+        for _event in crawler.crawl([Company.instance(client, '1')]):
+            pass
+    return operation
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+duedil on asyncio, Python 3.5+ only: nothing imports this module on
+Python 2, whose compiler cannot read it.
+
+aget and aget_many send through the HTTP2Transport of a client:
+
+    client = ProClient(api_key, transport=HTTP2Transport())
+    payloads = await aget_many(client, ['uk/companies/1', 'uk/companies/2'])
+'''
+from __future__ import unicode_literals
+
+import asyncio
+import itertools
+import time
+
+from requests.exceptions import HTTPError
+
+from . import tracing
+from .api import deadline_timeouts, retry_throttling, retry_wait
+from .concurrency import bind
+from .http2 import _timed_out, _timeout, httpx
+
+
+async def asend(transport, url, params=None, timeout=None):
+    'HTTP2Transport.asend, send on the event loop, the stats are kept as for send'
+    start = time.time()
+    response = None
+    try:
+        try:
+            response = transport._count(await transport.async_client.get(url, params=params,
+                                                                         timeout=_timeout(timeout)))
+        except httpx.TimeoutException as error:
+            raise _timed_out(error)
+        return response
+    finally:
+        transport.stats.record(time.time() - start, len(response.content) if response is not None else 0,
+                               error=response is None)
+
+
+async def aclose(transport):
+    'HTTP2Transport.aclose, close the connections of both the threads and the event loop'
+    transport.close()
+    if transport._async_client is not None:
+        await transport._async_client.aclose()
+        transport._async_client = None
+
+
+async def _send(client, url, params):
+    'Client._send on the event loop, the hedges of a hedging policy sent from its threads'
+    await asyncio.sleep(client._token_wait())
+    timeout, started = client._started(url, params)
+    with deadline_timeouts():
+        if client.hedging is not None:
+            # the deadline and tracing of the task go along to the thread
+            send = bind(lambda: client._transmit(url, params, timeout))
+            response = await asyncio.get_event_loop().run_in_executor(None, send)
+        else:
+            response = await client.transport.asend(url, params, timeout)
+    return client._finished(response, started)
+
+
+async def aget(client, endpoint, data=None):
+    '''
+    client.get on asyncio, through the HTTP2Transport of client: the rate
+    limiter, hooks, metrics, tracing, hedging, error mapping, timeouts,
+    deadline and throttling retries of Client.get apply, the dogpile cache
+    does not. The deadline and the span are the task's own on Python 3.7+,
+    before that the tasks of an event loop share them.
+    '''
+    if not hasattr(client.transport, 'asend'):
+        raise TypeError('aget needs a client with an HTTP2Transport')
+    url, params = client._request(endpoint, data)
+    with tracing.span(endpoint):
+        for attempt in itertools.count(1):
+            try:
+                return client._result(await _send(client, url, params))
+            except HTTPError as error:
+                # as the retry of Client._get
+                if not retry_throttling(error):
+                    raise
+            await asyncio.sleep(retry_wait(attempt) / 1000.0)
+
+
+async def aget_many(client, endpoints, data=None):
+    'aget every endpoint concurrently, the results in the order of endpoints'
+    return await asyncio.gather(*[aget(client, endpoint, data) for endpoint in endpoints])
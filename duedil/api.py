@@ -20,37 +20,32 @@ from __future__ import unicode_literals
 
 
 from .search.lite import CompanySearchResult as LiteCompanySearchResult, LiteSearchResourceList
-from .search.pro import CompanySearchResult as ProCompanySearchResult, DirectorSearchResult, ProSearchResourceList
+from .search.pro import (CompanySearchResult as ProCompanySearchResult, DirectorSearchResult,
+                         ProSearchResourceList, MergedSearchResourceList)
 from .search.international import CompanySearchResult as InternationalCompanySearchResult, InternationalSearchResourceList
+from .search.query import SearchQuery
 
 from .cache import configure_cache, dp_region as cache_region
+from .concurrency import map_concurrently
+from . import deadlines, tracing
+from .transport import RequestsTransport
 
+from contextlib import contextmanager
 import os
-import json
+import time
 
-import requests
-from requests.exceptions import HTTPError
+from requests.exceptions import HTTPError, Timeout
 
 from retrying import retry
 
-try:  # pragma: no cover
-    long
-except NameError:  # pragma: no cover
-    # Python 3
-    long = int
-
-try:  # pragma: no cover
-    unicode
-except NameError:  # pragma: no cover
-    # Python 3
-    basestring = unicode = str
-
 API_URLS = {
     'pro': 'http://duedil.io/v3',
     'lite': 'http://api.duedil.com/open',
     'international': 'http://api.duedil.com/international',
 }
 API_KEY = os.environ.get('DUEDIL_API_KEY')
+# seconds to connect and to wait for each read of a response
+DEFAULT_TIMEOUT = (10, 60)
 
 
 class APILimitException(Exception):
@@ -61,24 +56,68 @@ class APIMonthlyLimitException(APILimitException):
     pass
 
 
+def is_throttled(response):
+    'True for responses rejecting a request for going over the QPS limit'
+    # HTTP/2 has no reason phrases, the transports leave the reason out
+    return (response.status_code == 403
+            and response.reason in ("Forbidden - Over rate limit", None)
+            and 'Developer Over Qps' in response.text)
+
+
 def retry_throttling(exception):
-    if (isinstance(exception, HTTPError)
-            and exception.response.status_code == 403
-            and exception.response.reason == "Forbidden - Over rate limit"
-            and 'Developer Over Qps' in exception.response.text):
+    if isinstance(exception, HTTPError) and is_throttled(exception.response):
         return True
     # elif 'Developer Over Rate' in exception.response.text:
     #     raise APIMonthlyLimitException('Monthly Limit reached for Duedil calls')
     return False
 
 
+def retry_wait(attempts, delay=None):
+    'milliseconds before the next attempt, 2, 4, 8 seconds up to 10 but no later than the deadline'
+    return deadlines.wait(min(1000 * 2 ** attempts, 10000))
+
+
+@contextmanager
+def deadline_timeouts():
+    'requests timing out inside raise DeadlineExceeded when it was the deadline that cut their timeout short'
+    try:
+        yield
+    except Timeout:
+        deadlines.check()
+        raise
+
+
 class Client(object):
     cache = None
     base_url = None
-
-    def __init__(self, api_key=None, sandbox=False):
-        'Initialise the Client with which API to connect to and what cache to use'
+    session = None
+    metrics = None
+    transport = None
+    default_transport = RequestsTransport()
+    timeout = DEFAULT_TIMEOUT
+    rate_limiter = None
+    hedging = None
+
+    def __init__(self, api_key=None, sandbox=False, session=None, metrics=None, transport=None,
+                 timeout=None, rate_limiter=None, hedging=None):
+        '''
+        Initialise the Client with which API to connect to and what cache to use,
+        session is an optional duedil.session.Session resources are shared through,
+        metrics an optional duedil.metrics.Metrics requests are recorded in,
+        transport an optional duedil.transport transport requests are sent with,
+        timeout the seconds a request may take, one number or (connect, read),
+        DEFAULT_TIMEOUT by default, rate_limiter an optional
+        duedil.ratelimit.TokenBucket every request takes a token from and
+        hedging an optional duedil.hedging.HedgingPolicy for slow requests
+        '''
         self.set_api(api_key, sandbox)
+        self.session = session
+        self.metrics = metrics
+        self.transport = transport
+        if timeout is not None:
+            self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.hedging = hedging
 
     def set_api(self, api_key=None, sandbox=False):
 
@@ -97,7 +136,22 @@ class Client(object):
             self.base_url = self.base_url + '/sandbox'
 
     def get(self, endpoint, data=None):
-        return self._get(endpoint, data)
+        with tracing.span(endpoint):
+            if self.metrics is None:
+                return self._get(endpoint, data)
+            made = self.metrics.requests_made
+            result = self._get(endpoint, data)
+            # no request went out from this thread, the result came from the cache
+            self.metrics.cache('dogpile', self.metrics.requests_made == made)
+            return result
+
+    def get_many(self, endpoints, data=None, max_workers=None):
+        '''
+        get every endpoint concurrently, results are in the order of endpoints,
+        None for those a partial deadline ran out before
+        '''
+        return map_concurrently(deadlines.partial_results(lambda endpoint: self.get(endpoint, data)),
+                                endpoints, max_workers=max_workers)
 
     def pre_request_hook(self, endpoint, data):
         '''This is so that custom code can be run before an api call e.g. metric collection
@@ -110,44 +164,89 @@ class Client(object):
         you cannot affect further processing of the response'''
         pass
 
-# - _get should probably be split a bit more to allow full urls to be called
-    @cache_region.cache_on_arguments()
-    @retry(retry_on_exception=retry_throttling, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-    def _get(self, endpoint, data=None):
-        'this should become the private interface to all reequests to the api'
-
-        result = None
-        data = data or {}
+    def _token_wait(self):
+        'seconds until the token of the rate limiter for the next request, DeadlineExceeded when after the deadline'
+        if self.rate_limiter is None:
+            return 0.0
+        wait = self.rate_limiter.reserve(deadlines.remaining())
+        if wait is None:
+            raise deadlines.DeadlineExceeded('the rate limit allows no request before the deadline')
+        return wait
 
+    def _started(self, url, params):
+        '''
+        the timeout of a request going out and when it started, after the hooks
+        and the client's own tracing and metrics, whatever the hooks do
+        '''
+        timeout = deadlines.timeout(self.timeout)
+        self.pre_request_hook(url, dict((k, v) for k, v in params.items() if k != 'api_key'))
+        tracing.request_sent()
+        started = self.metrics.request_started(url) if self.metrics is not None else None
+        return timeout, started
+
+    def _finished(self, response, started):
+        if self.metrics is not None:
+            self.metrics.request_finished(response, self.base_url, throttled=is_throttled(response), started=started)
+        self.post_request_hook(response)
+        return response
+
+    def _transmit(self, url, params, timeout):
+        'send through the transport of the client, hedged with a hedging policy'
+        transport = self.transport or self.default_transport
+        if self.hedging is not None:
+            return self.hedging.send(self, transport, url, params, timeout)
+        return transport.send(url, params, timeout)
+
+    def _request(self, endpoint, data=None):
+        'the url and query parameters of a request for endpoint'
         if self.api_type in ["pro", "lite"]:
-            data_format = 'json'
-            resp_format = '.{0}'.format(data_format)
+            resp_format = '.json'
         else:
             resp_format = ''
+        url = "{base_url}/{endpoint}{format}".format(base_url=self.base_url,
+                                                     endpoint=endpoint,
+                                                     format=resp_format)
+        params = dict(data or {})
+        params['api_key'] = self.api_key
+        return url, params
+
+    @staticmethod
+    def _result(response):
+        'the payload of response, {} for a 404, duedil\'s errors raised as exceptions'
+        try:
+            response.raise_for_status()
+        except HTTPError:
+            if response.status_code == 404:
+                return {}
+            elif 'Developer Over Rate' in response.text:
+                raise APIMonthlyLimitException('Monthly Limit reached for Duedil calls')
+            raise
+        return response.json()
+
+    def _send(self, url, params):
+        '''
+        send the request through the transport of the client, between the
+        hooks, within the timeout of the client and the deadline, hedged
+        with a hedging policy; duedil.aio.aget takes the same steps
+        '''
+        wait = self._token_wait()
+        if wait:
+            time.sleep(wait)
+        timeout, started = self._started(url, params)
+        with deadline_timeouts():
+            response = self._transmit(url, params, timeout)
+        return self._finished(response, started)
 
-        url = "{base_url}/{endpoint}{format}"
-        prepared_url = url.format(base_url=self.base_url,
-                                  endpoint=endpoint,
-                                  format=resp_format)
-        self.pre_request_hook(prepared_url, data)
-
-        if not result:
-            params = data.copy()
-            params['api_key'] = self.api_key
-            response = requests.get(prepared_url, params=params)
-            self.post_request_hook(response)
-            try:
-                if not response.raise_for_status():
-                    result = response.json()
-            except HTTPError:
-                if response.status_code == 404:
-                    result = {}
-                elif 'Developer Over Rate' in response.text:
-                    raise APIMonthlyLimitException('Monthly Limit reached for Duedil calls')
-                else:
-                    raise
+    @cache_region.cache_on_arguments()
+    @retry(retry_on_exception=retry_throttling, wait_func=retry_wait)
+    def _get(self, endpoint, data=None):
+        'this should become the private interface to all reequests to the api'
+        return self._result(self._send(*self._request(endpoint, data)))
 
-        return result
+    def close(self):
+        'close the transport the client was given, the shared default stays open'
+        if self.transport is not None:
+            self.transport.close()
 
     def _search(self, endpoint, result_klass, *args, **kwargs):
         query_params = self._build_search_string(*args, **kwargs)
@@ -182,69 +281,80 @@ class LiteClient(Client):
 class ProClient(Client):
     api_type = 'pro'
     search_list_class = ProSearchResourceList
+    search_result_classes = {
+        'companies': ProCompanySearchResult,
+        'directors': DirectorSearchResult,
+    }
+    query_engine = None
+    sector_index = None
+
+    def __init__(self, api_key=None, sandbox=False, session=None, query_engine=None,
+                 sector_index=None, metrics=None, transport=None, timeout=None,
+                 rate_limiter=None, hedging=None):
+        '''
+        query_engine: optional duedil.search.engine.LocalQueryEngine, searches
+        covered by a fully fetched broader search are then answered locally
+        sector_index: optional duedil.sectors.SectorIndex the companies
+        fetched are added to
+        '''
+        super(ProClient, self).__init__(api_key, sandbox, session=session, metrics=metrics,
+                                        transport=transport, timeout=timeout,
+                                        rate_limiter=rate_limiter, hedging=hedging)
+        self.query_engine = query_engine
+        self.sector_index = sector_index
+
+    def get(self, endpoint, data=None):
+        result = super(ProClient, self).get(endpoint, data)
+        if self.sector_index is not None:
+            self.sector_index.observe(endpoint, result)
+        return result
 
     @staticmethod
     def _build_search_string(term_filters, range_filters,
                              order_by=None, limit=None, offset=None,
                              **kwargs):
-        data = {}
-        for arg, value in kwargs.items():
-            if arg in term_filters:
-                # this must be  a string
-                try:
-                    assert(isinstance(value, basestring))
-                except AssertionError:
-                    raise TypeError('{0!s} must be string type'.format(arg))
-            elif arg in range_filters:
-                # array of two numbers
-                try:
-                    assert(isinstance(value, (list, tuple)))
-                except AssertionError:
-                    raise TypeError('{0!s} must be an array'.format(arg))
-                try:
-                    assert(len(value) == 2)
-                except AssertionError:
-                    raise ValueError('Argument {0!s} can only be an array of length 2'.format(arg))
-                for v in value:
-                    try:
-                        assert(isinstance(v, (int, long, float)))
-                    except AssertionError:
-                        raise TypeError('Value of {0!s} must be numeric'.format(arg))
-            else:
-                raise TypeError('{0!s} does not match {1!s}'.format(arg, ', '.join(term_filters+range_filters)))
-        data['filters'] = json.dumps(kwargs)
-        if order_by:
-            try:
-                assert(isinstance(order_by, dict))
-            except:
-                raise TypeError('order_by must be dictionary')
-            try:
-                assert('field' in order_by)
-            except AssertionError:
-                raise ValueError("'field' must be a key in the order_by dictionary")
-            try:
-                assert(order_by['field'] in term_filters + range_filters)
-            except AssertionError:
-                raise TypeError("order_by['field'] must be one of {0!s}".format((', '.join(term_filters+range_filters))))
-            if order_by.get('direction'):
-                try:
-                    assert(order_by['direction'] in ['asc', 'desc'])
-                except AssertionError:
-                    raise ValueError('The direction must either be "asc" or "desc"')
-            data['orderBy'] = json.dumps(order_by)
-        if limit:
-            try:
-                assert(isinstance(limit, int))
-            except AssertionError:
-                raise TypeError('limit must be an integer')
-            data['limit'] = limit
-        if offset:
-            try:
-                assert(isinstance(offset, int))
-            except AssertionError:
-                raise TypeError('offset must be an integer')
-            data['offset'] = offset
-        return data
+        return SearchQuery(None, term_filters, range_filters,
+                           order_by=order_by, limit=limit, offset=offset,
+                           **kwargs).params()
+
+    def _search(self, endpoint, result_klass, *args, **kwargs):
+        return self.execute(SearchQuery(endpoint, *args, **kwargs), result_klass)
+
+    def company_query(self, order_by=None, limit=None, offset=None, **kwargs):
+        'Build a reusable, canonical company search, see search_company'
+        return SearchQuery('companies',
+                           ProCompanySearchResult.term_filters,
+                           ProCompanySearchResult.range_filters,
+                           order_by=order_by, limit=limit, offset=offset,
+                           **kwargs)
+
+    def director_query(self, order_by=None, limit=None, offset=None, **kwargs):
+        'Build a reusable, canonical director search, see search_director'
+        return SearchQuery('directors',
+                           DirectorSearchResult.term_filters,
+                           DirectorSearchResult.range_filters,
+                           order_by=order_by, limit=limit, offset=offset,
+                           **kwargs)
+
+    def execute(self, query, result_klass=None):
+        '''
+        Run a SearchQuery, every page is requested with the canonical
+        parameters of the query so equivalent searches share cache entries
+        '''
+        result_klass = result_klass or self.search_result_classes[query.endpoint]
+        results = self._search_page(query)
+        return self.search_list_class(results, result_klass, self, query=query)
+
+    def _search_page(self, query, offset=None, limit=None):
+        offset = query.offset if offset is None else offset
+        limit = query.limit if limit is None else limit
+        if self.query_engine is not None:
+            page = self.query_engine.page(query, offset, limit)
+            if self.metrics is not None:
+                self.metrics.cache('query_engine', page is not None)
+            if page is not None:
+                return page
+        return self.get(query.endpoint, data=query.params(offset=offset, limit=limit))
 
     def search_company(self, order_by=None, limit=None, offset=None, **kwargs):
         '''
@@ -265,14 +375,10 @@ class ProClient(Client):
         You can order the results based on the ranges using the
         parameter orderBy.
         '''
-        return self._search('companies',
-                            ProCompanySearchResult,
-                            ProCompanySearchResult.term_filters,
-                            ProCompanySearchResult.range_filters,
-                            order_by=order_by,
-                            limit=limit,
-                            offset=offset,
-                            **kwargs)
+        return self.execute(self.company_query(order_by=order_by,
+                                               limit=limit,
+                                               offset=offset,
+                                               **kwargs))
 
     def search_director(self, order_by=None, limit=None, offset=None, **kwargs):
         '''
@@ -285,18 +391,22 @@ class ProClient(Client):
 
         NB: The location filter is not available for director search.
         '''
-        return self._search('directors',
-                            DirectorSearchResult,
-                            DirectorSearchResult.term_filters,
-                            DirectorSearchResult.range_filters,
-                            order_by=order_by,
-                            limit=limit,
-                            offset=offset,
-                            **kwargs)
+        return self.execute(self.director_query(order_by=order_by,
+                                                limit=limit,
+                                                offset=offset,
+                                                **kwargs))
 
     def search(self, order_by=None, limit=None, offset=None, **kwargs):
-        return self.search_company(order_by, limit, offset, **kwargs) + \
-               self.search_director(order_by, limit, offset, **kwargs)
+        '''
+        Search companies and directors at once. Both endpoints are queried
+        concurrently and the results come back as one lazily paginated
+        MergedSearchResourceList, interleaved by order_by or by rank,
+        with the total of each search in .totals
+        '''
+        queries = [self.company_query(order_by=order_by, limit=limit, offset=offset, **kwargs),
+                   self.director_query(order_by=order_by, limit=limit, offset=offset, **kwargs)]
+        sources = map_concurrently(self.execute, queries)
+        return MergedSearchResourceList(sources, order_by=queries[0].order_by)
 
 
 class InternationalClient(Client):
@@ -39,7 +39,7 @@ def kwargs_key_generator(namespace, fn, **kw):
     fname = fn.__name__
     def generate_key(*args, **kwargs):
         args_str = "_".join(str(s) for s in args)
-        kwargs_str = json.dumps(kwargs)
+        kwargs_str = json.dumps(kwargs, sort_keys=True)
         key = '{0}_{1}:{2}_{3}'.format(namespace, fname, args_str, kwargs_str)
         hashkey = hashlib.md5(key.encode('utf-8'))
         return hashkey.hexdigest()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:  # pragma: no cover
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover
+    ContextVar = None
+
+# duedil throttles on queries per second, more threads than this mostly wait on retries
+DEFAULT_MAX_WORKERS = 8
+
+_background = None
+_background_lock = threading.Lock()
+
+# functions capturing thread local state to carry over to the worker threads
+_contexts = []
+
+
+class ContextLocal(object):
+    '''
+    A threading.local that the asyncio tasks of a thread do not share
+    either, its attributes kept in contextvars on Python 3.7+
+    '''
+
+    def __init__(self, name):
+        if ContextVar is None:  # pragma: no cover
+            object.__setattr__(self, '_local', threading.local())
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_vars', {})
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _var(self, attribute):
+        var = self._vars.get(attribute)
+        if var is None:
+            with self._lock:
+                var = self._vars.get(attribute)
+                if var is None:
+                    var = self._vars[attribute] = ContextVar('{0}.{1}'.format(self._name, attribute))
+        return var
+
+    def __getattr__(self, attribute):
+        if ContextVar is None:  # pragma: no cover
+            return getattr(self._local, attribute)
+        try:
+            return self._var(attribute).get()
+        except LookupError:
+            raise AttributeError(attribute)
+
+    def __setattr__(self, attribute, value):
+        if ContextVar is None:  # pragma: no cover
+            setattr(self._local, attribute, value)
+        else:
+            self._var(attribute).set(value)
+
+
+def register_context(capture):
+    '''
+    capture() is called in the thread submitting work and returns None or
+    a callable that returns a context manager restoring the captured state;
+    the work then runs inside that context manager on the worker thread
+    '''
+    _contexts.append(capture)
+
+
+def bind(call):
+    'call wrapped to run with the registered context of the current thread'
+    restores = [restore for restore in (capture() for capture in _contexts) if restore is not None]
+    if not restores:
+        return call
+
+    def run(index=0):
+        if index == len(restores):
+            return call()
+        with restores[index]():
+            return run(index + 1)
+    return run
+
+
+def run_concurrently(calls, max_workers=None):
+    '''
+    Call every zero argument callable in calls on a thread pool and return
+    their results in the same order. The first exception raised by a call
+    is raised again once all calls have finished.
+    '''
+    calls = list(calls)
+    if len(calls) < 2:
+        return [call() for call in calls]
+    calls = [bind(call) for call in calls]
+    workers = min(max_workers or DEFAULT_MAX_WORKERS, len(calls))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
+
+
+def map_concurrently(fn, items, max_workers=None):
+    'fn(item) for every item, called concurrently, results in order'
+    return run_concurrently([lambda item=item: fn(item) for item in items],
+                            max_workers=max_workers)
+
+
+def background(fn, *args, **kwargs):
+    '''
+    Run fn on the shared background pool, used for prefetching, and return
+    its Future
+    '''
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS)
+    return _background.submit(bind(lambda: fn(*args, **kwargs)))
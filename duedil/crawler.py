@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict, deque, namedtuple
+from itertools import islice
+import json
+import os
+
+import six
+
+from . import deadlines
+from .concurrency import DEFAULT_MAX_WORKERS
+from .resources import RelatedResourceList, prefetch_related
+from .resources.pro.company import Company, Director, Shareholder
+
+DIRECTOR_OF = 'director_of'
+PARENT_OF = 'parent_of'
+SHAREHOLDER_OF = 'shareholder_of'
+
+# node key is (kind, locale, id), edges point from source to target key
+Node = namedtuple('Node', ['kind', 'locale', 'id', 'depth', 'resource'])
+Edge = namedtuple('Edge', ['relation', 'source', 'target'])
+
+KINDS = {
+    'company': Company,
+    'director': Director,
+    'shareholder': Shareholder,
+}
+
+# related property -> (relation, True when the edge points from the neighbour to the node)
+RELATIONS = {
+    'company': {
+        'directors': (DIRECTOR_OF, True),
+        'parent': (PARENT_OF, True),
+        'subsidiaries': (PARENT_OF, False),
+        'shareholders': (SHAREHOLDER_OF, True),
+    },
+    'director': {
+        'companies': (DIRECTOR_OF, False),
+    },
+    'shareholder': {},
+}
+
+DEFAULT_RELATIONS = ('directors', 'companies', 'parent', 'subsidiaries')
+
+
+def node_key(resource):
+    for kind, klass in KINDS.items():
+        if isinstance(resource, klass):
+            return kind, resource.locale, six.text_type(resource.id)
+    return None
+
+
+class Crawler(object):
+    '''
+    Breadth or depth first crawl of the company / director graph.
+
+    Starting from seed resources the crawler follows the related
+    resources named in relations up to max_depth hops, at most fan_out
+    neighbours per relation of a node. Every node is visited once, nodes
+    are expanded max_workers at a time with the related resources of the
+    batch fetched concurrently, max_workers requests in flight, and crawl()
+    yields Node and Edge tuples as they are found.
+
+    With checkpoint set to a file path the nodes visited and expanded are
+    appended there after every batch, the file compacted to the visited
+    set and frontier when the crawl stops, and a later crawl with the same
+    path resumes from them instead of the seeds; the file is removed once
+    the crawl completes. Edges out of nodes that were being expanded when
+    the crawl stopped can be reported twice. Under a partial deadline the
+    crawl stops once the deadline passes, the nodes it did not expand in
+    time are left in the frontier, and checkpoint, to resume from.
+    '''
+
+    def __init__(self, client, max_depth=2, fan_out=None, max_workers=DEFAULT_MAX_WORKERS,
+                 strategy='bfs', relations=DEFAULT_RELATIONS, checkpoint=None):
+        if strategy not in ('bfs', 'dfs'):
+            raise ValueError('strategy must either be "bfs" or "dfs"')
+        self.client = client
+        self.max_depth = max_depth
+        self.fan_out = fan_out
+        self.max_workers = max_workers
+        self.strategy = strategy
+        self.relations = tuple(relations)
+        self.checkpoint = checkpoint
+        self.visited = set()
+        self.frontier = deque()
+        self._edges = set()
+        self._journal = []
+
+    def _resource(self, kind, locale, id):
+        return KINDS[kind].instance(self.client, id, locale=locale)
+
+    def _seed(self, seeds):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            self.visited, frontier = self._replay()
+            self.frontier = deque(Node(kind, locale, id, depth, self._resource(kind, locale, id))
+                                  for (kind, locale, id), depth in frontier.items())
+            return []
+        nodes = []
+        for resource in seeds:
+            key = node_key(resource)
+            if key is None:
+                raise TypeError('cannot crawl from {0!r}'.format(resource))
+            if key not in self.visited:
+                self.visited.add(key)
+                node = Node(key[0], key[1], key[2], 0, resource)
+                if self.max_depth > 0:
+                    self.frontier.append(node)
+                self._log('visit' if self.max_depth > 0 else 'seen', key, 0)
+                nodes.append(node)
+        return nodes
+
+    # the checkpoint is a log of JSON lines: ["visit", kind, locale, id, depth]
+    # for a node going into the frontier, ["seen", kind, locale, id] for one
+    # that does not and ["expand", kind, locale, id] for a node expanded
+
+    def _log(self, entry, key, depth=None):
+        if self.checkpoint:
+            self._journal.append([entry] + list(key) + ([depth] if entry == 'visit' else []))
+
+    def _flush(self):
+        'append the entries of the batch, as many of them as the batch found'
+        if self._journal:
+            with open(self.checkpoint, 'a') as checkpoint:
+                checkpoint.write(''.join(json.dumps(entry) + '\n' for entry in self._journal))
+            self._journal = []
+
+    def _replay(self):
+        'the visited set and the frontier, key -> depth in order, of the checkpoint'
+        visited = set()
+        frontier = OrderedDict()
+        with open(self.checkpoint) as checkpoint:
+            for line in checkpoint:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line of a crawl killed while writing it
+                    continue
+                key = tuple(entry[1:4])
+                if entry[0] == 'expand':
+                    frontier.pop(key, None)
+                    continue
+                visited.add(key)
+                if entry[0] == 'visit':
+                    frontier[key] = entry[4]
+        return visited, frontier
+
+    def _compact(self):
+        'rewrite the checkpoint as the visited set and frontier it comes to'
+        if not (self.checkpoint and os.path.exists(self.checkpoint)):
+            return
+        visited, frontier = self._replay()
+        partial = self.checkpoint + '.tmp'
+        with open(partial, 'w') as checkpoint:
+            for key in sorted(visited):
+                if key not in frontier:
+                    checkpoint.write(json.dumps(['seen'] + list(key)) + '\n')
+            for key, depth in frontier.items():
+                checkpoint.write(json.dumps(['visit'] + list(key) + [depth]) + '\n')
+        # atomic, an interrupted write leaves the log in place
+        getattr(os, 'replace', os.rename)(partial, self.checkpoint)
+
+    def _prefetch(self, batch):
+        'load the relations of every node of batch, max_workers requests at a time'
+        by_kind = OrderedDict()
+        for node in batch:
+            by_kind.setdefault(node.kind, []).append(node.resource)
+        for kind, resources in by_kind.items():
+            keys = [key for key in self.relations if key in RELATIONS[kind]]
+            if keys:
+                prefetch_related(resources, *keys, max_workers=self.max_workers)
+
+    def _neighbours(self, node):
+        'the (relation, neighbour is source, resource) triples of node, prefetched with its batch'
+        relations = RELATIONS[node.kind]
+        keys = [key for key in self.relations if key in relations]
+        found = []
+        for key in keys:
+            related = getattr(node.resource, key)
+            if related is None:
+                continue
+            if isinstance(related, RelatedResourceList):
+                related = islice(related, self.fan_out)
+            else:
+                related = [related]
+            relation, inbound = relations[key]
+            found.extend((relation, inbound, resource) for resource in related)
+        return found
+
+    def _take(self):
+        batch = []
+        while self.frontier and len(batch) < self.max_workers:
+            batch.append(self.frontier.popleft() if self.strategy == 'bfs' else self.frontier.pop())
+        return batch
+
+    def crawl(self, seeds=()):
+        'yield Node and Edge tuples, seeds are Company or Director resources'
+        completed = False
+        try:
+            for node in self._seed(seeds):
+                yield node
+            self._flush()
+            while self.frontier:
+                batch = self._take()
+                self._prefetch(batch)
+                # what a partial deadline kept from the prefetch is left unexpanded
+                expanded = [deadlines.partial_results(self._neighbours)(node) for node in batch]
+                for node, neighbours in zip(batch, expanded):
+                    if neighbours is None:
+                        continue
+                    source = (node.kind, node.locale, node.id)
+                    self._log('expand', source)
+                    for relation, inbound, resource in neighbours:
+                        key = node_key(resource)
+                        if key is None:
+                            continue
+                        if key not in self.visited:
+                            self.visited.add(key)
+                            neighbour = Node(key[0], key[1], key[2], node.depth + 1, resource)
+                            if neighbour.depth < self.max_depth:
+                                self.frontier.append(neighbour)
+                                self._log('visit', key, neighbour.depth)
+                            else:
+                                self._log('seen', key)
+                            yield neighbour
+                        edge = Edge(relation, key, source) if inbound else Edge(relation, source, key)
+                        if edge not in self._edges:
+                            self._edges.add(edge)
+                            yield edge
+                self._flush()
+                unexpanded = [node for node, neighbours in zip(batch, expanded) if neighbours is None]
+                if unexpanded:
+                    # back where _take found them
+                    if self.strategy == 'bfs':
+                        self.frontier.extendleft(reversed(unexpanded))
+                    else:
+                        self.frontier.extend(reversed(unexpanded))
+                    return
+            completed = True
+        finally:
+            # a batch cut short is not in the log, a resumed crawl expands it again
+            self._journal = []
+            if completed and self.checkpoint and os.path.exists(self.checkpoint):
+                os.remove(self.checkpoint)
+            elif not completed:
+                self._compact()
+
+
+def crawl(seeds, client=None, **kwargs):
+    'crawl the graph around seeds, see Crawler for the options'
+    seeds = list(seeds)
+    client = client or seeds[0].client
+    return Crawler(client, **kwargs).crawl(seeds)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Deadlines bound a whole operation rather than one request:
+
+    with deadline(5):
+        company.prefetch_related('directors', 'accounts')
+
+Every request made inside, by the thread and by the threads the
+concurrency helpers start from it, lazy loads and retries included, gets
+at most the time left as its timeout and none is sent once the time is
+spent: DeadlineExceeded is raised instead. With partial=True get_many,
+prefetch_related and the crawler return what they got in time instead,
+None for the endpoints get_many did not get to and the relations
+prefetch_related did not load, while a crawl stops with the nodes it did
+not expand left in its frontier.
+'''
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import threading
+import time
+
+from .concurrency import register_context
+
+try:  # pragma: no cover
+    from contextvars import ContextVar
+except ImportError:  # pragma: no cover
+    ContextVar = None
+
+if ContextVar is not None:
+    _deadline = ContextVar('duedil_deadline', default=None)
+    _get, _set = _deadline.get, _deadline.set
+else:  # pragma: no cover
+    _local = threading.local()
+
+    def _get():
+        return getattr(_local, 'deadline', None)
+
+    def _set(deadline_):
+        _local.deadline = deadline_
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def current():
+    'the Deadline of the current thread or asyncio task, None without one'
+    return _get()
+
+
+class Deadline(object):
+    '''
+    seconds from now for whatever runs inside, the earlier deadline wins
+    when they are nested
+    '''
+
+    def __init__(self, seconds, partial=False):
+        self.seconds = seconds
+        self.partial = partial
+        self.expires = time.time() + seconds
+        self._previous = []
+
+    def remaining(self):
+        return max(self.expires - time.time(), 0.0)
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded('deadline of {0}s exceeded'.format(self.seconds))
+
+    def __enter__(self):
+        outer = current()
+        if outer is not None and outer.expires < self.expires:
+            self.expires = outer.expires
+        self._previous.append(outer)
+        _set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _set(self._previous.pop())
+
+
+def deadline(seconds, partial=False):
+    'a Deadline, to be entered: with deadline(5): ...'
+    return Deadline(seconds, partial=partial)
+
+
+def check():
+    'raise DeadlineExceeded when the deadline of the current thread has passed'
+    if current() is not None:
+        current().check()
+
+
+def remaining():
+    'seconds left before the deadline of the current thread, None without one'
+    deadline_ = current()
+    return None if deadline_ is None else deadline_.remaining()
+
+
+def timeout(timeout):
+    '''
+    timeout, a number of seconds or a (connect, read) tuple, capped to what
+    is left of the deadline; DeadlineExceeded when nothing is left
+    '''
+    deadline_ = current()
+    if deadline_ is None:
+        return timeout
+    deadline_.check()
+    remaining = deadline_.remaining()
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def wait(milliseconds):
+    'a retry wait in milliseconds, no longer than what is left of the deadline'
+    deadline_ = current()
+    if deadline_ is None:
+        return milliseconds
+    return min(milliseconds, deadline_.remaining() * 1000)
+
+
+def partial_results(fn, default=None):
+    '''
+    fn returning default instead of raising DeadlineExceeded when the
+    deadline is partial
+    '''
+    def call(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except DeadlineExceeded:
+            deadline_ = current()
+            if deadline_ is None or not deadline_.partial:
+                raise
+            return default
+    return call
+
+
+@contextmanager
+def _restore(deadline_):
+    previous = current()
+    _set(deadline_)
+    try:
+        yield
+    finally:
+        _set(previous)
+
+
+def _capture():
+    deadline_ = current()
+    if deadline_ is None:
+        return None
+    return lambda: _restore(deadline_)
+
+
+register_context(_capture)
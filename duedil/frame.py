@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+import re
+
+import six
+
+try:  # pragma: no cover
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+CATEGORICAL = ('status', 'company_type', 'sic_code', 'accounts_type')
+STRINGS = ('id', 'name')
+NUMERIC_PREFIX = 'accounts_'
+DATE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+def _payload(result):
+    'the company of a client result, bare company dicts are passed through'
+    if isinstance(result, dict) and isinstance(result.get('response'), dict):
+        return result['response']
+    return result
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _kind(values):
+    'numeric, date or string, whichever every value present is'
+    present = [value for value in values if value is not None and value != '']
+    if all(_is_number(value) for value in present):
+        return 'numeric'
+    if all(isinstance(value, six.string_types) and DATE.match(value) for value in present):
+        return 'date'
+    return 'string'
+
+
+def _dates(values):
+    'datetime64[D] column of ISO dates, NaT for missing'
+    return np.array([value[:10] if value else 'NaT' for value in values], dtype='datetime64[D]')
+
+
+def _strings(values):
+    column = np.empty(len(values), dtype=object)
+    column[:] = [None if v is None else six.text_type(v) for v in values]
+    return column
+
+
+def _encode(values):
+    'codes into the sorted distinct values, -1 for missing'
+    categories = sorted(set(six.text_type(v) for v in values if v is not None))
+    index = dict((category, code) for code, category in enumerate(categories))
+    codes = np.fromiter((-1 if v is None else index[six.text_type(v)] for v in values),
+                        dtype=np.int32, count=len(values))
+    return codes, categories
+
+
+class CompanyFrame(object):
+    '''
+    Columnar table of companies backed by numpy arrays.
+
+    Numeric accounts_* fields are float64 columns with NaN for missing
+    values, those holding dates datetime64[D] columns with NaT and the
+    others, like accounts_currency, object arrays of strings; the
+    CATEGORICAL fields are int32 codes into a sorted list of categories
+    (-1 when missing) and the STRINGS fields object arrays.
+    Built straight from company payloads, no Company resources are made.
+
+    filter, sort and the take they share return new frames; group_by
+    aggregates with numpy, one pass per aggregate.
+    '''
+
+    def __init__(self, columns, categories=None):
+        if np is None:
+            raise ImportError('numpy is required for CompanyFrame, pip install duedil[numpy]')
+        self.columns = columns
+        self.categories = categories or {}
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) > 1:
+            raise ValueError('columns must all have the same length')
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_payloads(cls, payloads, numeric=None, categorical=CATEGORICAL, strings=STRINGS):
+        '''
+        Frame of company payloads as returned by Client.get (with or without
+        the 'response' envelope). numeric defaults to the accounts_* fields
+        seen in the payloads that are not categorical and hold numbers, the
+        other accounts_* fields then become date or string columns
+        '''
+        if np is None:
+            raise ImportError('numpy is required for CompanyFrame, pip install duedil[numpy]')
+        rows = [_payload(payload) for payload in payloads if payload]
+        dates = []
+        strings = list(strings)
+        if numeric is None:
+            seen = set()
+            for row in rows:
+                seen.update(key for key in row if key.startswith(NUMERIC_PREFIX))
+            numeric = []
+            for name in sorted(seen - set(categorical) - set(strings)):
+                kind = _kind([row.get(name) for row in rows])
+                {'numeric': numeric, 'date': dates, 'string': strings}[kind].append(name)
+        columns = {}
+        categories = {}
+        for name in numeric:
+            columns[name] = np.fromiter((_number(row.get(name)) for row in rows),
+                                        dtype=np.float64, count=len(rows))
+        for name in dates:
+            columns[name] = _dates([row.get(name) for row in rows])
+        for name in categorical:
+            columns[name], categories[name] = _encode([row.get(name) for row in rows])
+        for name in strings:
+            columns[name] = _strings([row.get(name) for row in rows])
+        return cls(columns, categories)
+
+    @classmethod
+    def fetch(cls, client, ids, locale='uk', max_workers=None, **kwargs):
+        'frame of the companies with ids, requested concurrently'
+        endpoints = ['{0}/companies/{1}'.format(locale, id) for id in ids]
+        return cls.from_payloads(client.get_many(endpoints, max_workers=max_workers), **kwargs)
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        'the column, categorical columns as codes'
+        return self.columns[name]
+
+    @property
+    def names(self):
+        return sorted(self.columns)
+
+    def code(self, name, value):
+        'the code of value in the categorical column name, -1 if it does not occur'
+        try:
+            return self.categories[name].index(six.text_type(value))
+        except ValueError:
+            return -1
+
+    def decoded(self, name):
+        'a categorical column as an object array of its values'
+        codes = self.columns[name]
+        values = np.empty(len(self.categories[name]) + 1, dtype=object)
+        values[:-1] = self.categories[name]
+        # -1 picks the trailing None
+        return values[codes]
+
+    def isin(self, name, values):
+        'mask of the rows whose value of column name is one of values'
+        column = self.columns[name]
+        if name in self.categories:
+            codes = [self.code(name, value) for value in values]
+            # values that do not occur must not match the missing rows
+            return np.isin(column, [code for code in codes if code >= 0])
+        return np.isin(column, list(values))
+
+    def take(self, indices):
+        'new frame of the rows at indices, or where a boolean mask is set'
+        return self.__class__(dict((name, column[indices]) for name, column in self.columns.items()),
+                              self.categories)
+
+    def filter(self, mask=None, **equals):
+        '''
+        frame of the rows where mask is set and every name=value given in
+        equals matches, e.g. frame.filter(frame['accounts_turnover'] > 1e6, status='Active')
+        '''
+        selected = np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        for name, value in equals.items():
+            selected = selected & self.isin(name, [value])
+        return self.take(selected)
+
+    def sort(self, by, ascending=True):
+        'frame sorted on column by, stable, missing values last either way'
+        column = self.columns[by]
+        if column.dtype == np.float64:
+            missing = np.isnan(column)
+            keys = -column if not ascending else column
+        elif by in self.categories:
+            missing = column < 0
+            keys = -column if not ascending else column
+        elif column.dtype.kind == 'M':
+            missing = np.isnat(column)
+            keys = column.astype(np.int64)
+            keys = -keys if not ascending else keys
+        else:
+            missing = np.array([v is None for v in column], dtype=bool)
+            ranks = np.unique(column[~missing], return_inverse=True)[1]
+            keys = np.zeros(len(column), dtype=np.int64)
+            keys[~missing] = -ranks if not ascending else ranks
+        order = np.lexsort((keys, missing))
+        return self.take(order)
+
+    def group_by(self, by):
+        return GroupBy(self, by)
+
+    def to_pandas(self):
+        'pandas.DataFrame, categorical columns become pandas Categoricals'
+        import pandas as pd
+        data = {}
+        for name in self.names:
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(self.columns[name], self.categories[name])
+            else:
+                data[name] = self.columns[name]
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        'pyarrow.Table, categorical columns become dictionary arrays'
+        import pyarrow as pa
+        arrays = []
+        for name in self.names:
+            column = self.columns[name]
+            if name in self.categories:
+                indices = pa.array(column, mask=column < 0)
+                arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(self.categories[name],
+                                                                               type=pa.string())))
+            elif column.dtype == object:
+                arrays.append(pa.array(column, type=pa.string()))
+            else:
+                arrays.append(pa.array(column))
+        return pa.Table.from_arrays(arrays, names=self.names)
+
+
+class GroupBy(object):
+    '''
+    Rows of a CompanyFrame grouped on one column. Aggregates ignore NaN,
+    a group without values aggregates to NaN
+    '''
+
+    aggregations = ('count', 'sum', 'mean', 'min', 'max')
+
+    def __init__(self, frame, by):
+        self.frame = frame
+        self.by = by
+        column = frame[by]
+        if by in frame.categories:
+            present = column >= 0
+            self.keys, self.groups = np.unique(column[present], return_inverse=True)
+        elif column.dtype == np.float64:
+            present = ~np.isnan(column)
+            self.keys, self.groups = np.unique(column[present], return_inverse=True)
+        elif column.dtype.kind == 'M':
+            present = ~np.isnat(column)
+            self.keys, self.groups = np.unique(column[present], return_inverse=True)
+        else:
+            present = np.array([v is not None for v in column], dtype=bool)
+            self.keys, self.groups = np.unique(column[present].astype(six.text_type), return_inverse=True)
+        # rows without a key belong to no group
+        self.present = present
+
+    def __len__(self):
+        return len(self.keys)
+
+    def size(self):
+        return np.bincount(self.groups, minlength=len(self.keys))
+
+    def aggregate(self, name, how):
+        if how not in self.aggregations:
+            raise ValueError('how must be one of {0}'.format(', '.join(self.aggregations)))
+        values = self.frame[name][self.present]
+        valid = ~np.isnan(values)
+        groups = self.groups[valid]
+        values = values[valid]
+        size = len(self.keys)
+        count = np.bincount(groups, minlength=size)
+        if how == 'count':
+            return count
+        if how in ('sum', 'mean'):
+            total = np.bincount(groups, weights=values, minlength=size)
+            if how == 'sum':
+                total[count == 0] = np.nan
+                return total
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        out = np.full(size, np.inf if how == 'min' else -np.inf)
+        (np.minimum if how == 'min' else np.maximum).at(out, groups, values)
+        out[count == 0] = np.nan
+        return out
+
+    def agg(self, **aggregations):
+        '''
+        CompanyFrame with one row per group, the key column and a column
+        per keyword, e.g. agg(turnover=('accounts_turnover', 'sum'))
+        '''
+        columns = {}
+        categories = {}
+        if self.by in self.frame.categories:
+            columns[self.by] = self.keys.astype(np.int32)
+            categories[self.by] = self.frame.categories[self.by]
+        else:
+            columns[self.by] = self.keys
+        for output, (name, how) in aggregations.items():
+            columns[output] = self.aggregate(name, how)
+        return CompanyFrame(columns, categories)
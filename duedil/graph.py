@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+import json
+import os
+
+import six
+
+from .crawler import Edge, Node, DIRECTOR_OF, PARENT_OF, SHAREHOLDER_OF
+
+try:  # pragma: no cover
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+RELATIONS = (DIRECTOR_OF, SHAREHOLDER_OF, PARENT_OF)
+KIND_CODES = ('company', 'director', 'shareholder')
+LOCALE_CODES = ('uk', 'roi')
+
+
+class GraphBuilder(object):
+    '''
+    Collects crawl output into a CompanyGraph.
+
+    Node keys are interned to consecutive integers as they arrive, edges
+    are kept as integer pairs per relation, and the attributes named in
+    attributes are read from the node resources as they are added, so
+    the resources themselves need not be kept.
+    '''
+
+    def __init__(self, attributes=('name',)):
+        if np is None:
+            raise ImportError('numpy is required for graph export, pip install duedil[numpy]')
+        self.attributes = tuple(attributes)
+        self._ids = {}
+        self._keys = []
+        self._columns = dict((name, []) for name in self.attributes)
+        self._edges = dict((relation, ([], [])) for relation in RELATIONS)
+
+    def node(self, key, resource=None):
+        'integer id of the (kind, locale, id) node key, interning it if new'
+        key = tuple(key)
+        try:
+            return self._ids[key]
+        except KeyError:
+            index = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            for name in self.attributes:
+                value = None
+                if resource is not None and name in resource.attribute_names:
+                    # only what is already there, exporting must not load anything
+                    value = resource.__dict__.get(name)
+                self._columns[name].append(value)
+            return index
+
+    def add(self, event):
+        'add a Node or Edge from Crawler.crawl'
+        if isinstance(event, Node):
+            self.node((event.kind, event.locale, event.id), event.resource)
+        elif isinstance(event, Edge):
+            sources, targets = self._edges[event.relation]
+            sources.append(self.node(event.source))
+            targets.append(self.node(event.target))
+        return self
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+        return self
+
+    def build(self):
+        size = len(self._keys)
+        edges = {}
+        for relation, (sources, targets) in self._edges.items():
+            edges[relation] = _csr(np.asarray(sources, dtype=np.int64),
+                                   np.asarray(targets, dtype=np.int64), size)
+        columns = {}
+        for name, values in self._columns.items():
+            columns[name] = _column(values)
+        kinds = np.array([KIND_CODES.index(key[0]) for key in self._keys], dtype=np.int8)
+        locales = np.array([LOCALE_CODES.index(key[1]) for key in self._keys], dtype=np.int8)
+        ids = np.array([key[2] for key in self._keys], dtype=np.str_)
+        return CompanyGraph(kinds, locales, ids, edges, columns)
+
+
+def _csr(sources, targets, size):
+    order = np.argsort(sources, kind='mergesort')
+    counts = np.bincount(sources, minlength=size)
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, targets[order].astype(np.int32 if size < 2 ** 31 else np.int64)
+
+
+def _column(values):
+    numbers = [v for v in values if v is not None]
+    if numbers and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in numbers):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(['' if v is None else six.text_type(v) for v in values], dtype=np.str_)
+
+
+class CompanyGraph(object):
+    '''
+    Compact company / director network.
+
+    Nodes are integers 0..n-1; kinds and locales hold indexes into
+    KIND_CODES and LOCALE_CODES and ids the duedil id of each node. For
+    each relation the edges are stored as CSR arrays: the targets of node
+    i are indices[indptr[i]:indptr[i + 1]]. Node attributes are numpy
+    columns. save() writes plain .npy files that load() maps back into
+    memory without reading them.
+    '''
+
+    def __init__(self, kinds, locales, ids, edges, columns):
+        self.kinds = kinds
+        self.locales = locales
+        self.ids = ids
+        self.edges = edges
+        self.columns = columns
+        self._index = None
+
+    @classmethod
+    def from_crawl(cls, events, attributes=('name',)):
+        return GraphBuilder(attributes).extend(events).build()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def key(self, node):
+        'the (kind, locale, id) key of integer node'
+        return (KIND_CODES[self.kinds[node]], LOCALE_CODES[self.locales[node]],
+                six.text_type(self.ids[node]))
+
+    def node_id(self, key):
+        'integer node of a (kind, locale, id) key, the lookup table is built on first use'
+        if self._index is None:
+            self._index = dict((self.key(i), i) for i in range(len(self)))
+        kind, locale, id = key
+        return self._index[(kind, locale, six.text_type(id))]
+
+    def neighbours(self, node, relation):
+        indptr, indices = self.edges[relation]
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def edge_count(self, relation=None):
+        relations = [relation] if relation else self.edges.keys()
+        return sum(len(self.edges[r][1]) for r in relations)
+
+    def to_scipy(self, relation):
+        'the relation as a scipy.sparse.csr_matrix adjacency matrix'
+        from scipy.sparse import csr_matrix
+        indptr, indices = self.edges[relation]
+        data = np.ones(len(indices), dtype=np.int8)
+        return csr_matrix((data, indices, indptr), shape=(len(self), len(self)))
+
+    def save(self, path):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        np.save(os.path.join(path, 'kinds.npy'), self.kinds)
+        np.save(os.path.join(path, 'locales.npy'), self.locales)
+        np.save(os.path.join(path, 'ids.npy'), self.ids)
+        for relation, (indptr, indices) in self.edges.items():
+            np.save(os.path.join(path, '{0}.indptr.npy'.format(relation)), indptr)
+            np.save(os.path.join(path, '{0}.indices.npy'.format(relation)), indices)
+        for name, column in self.columns.items():
+            np.save(os.path.join(path, 'column.{0}.npy'.format(name)), column)
+        meta = {
+            'relations': sorted(self.edges.keys()),
+            'columns': sorted(self.columns.keys()),
+        }
+        with open(os.path.join(path, 'graph.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        with open(os.path.join(path, 'graph.json')) as meta_file:
+            meta = json.load(meta_file)
+        edges = dict((relation, (array('{0}.indptr.npy'.format(relation)),
+                                 array('{0}.indices.npy'.format(relation))))
+                     for relation in meta['relations'])
+        columns = dict((name, array('column.{0}.npy'.format(name))) for name in meta['columns'])
+        return cls(array('kinds.npy'), array('locales.npy'), array('ids.npy'), edges, columns)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import namedtuple
+
+import six
+
+from .concurrency import DEFAULT_MAX_WORKERS
+from .resources import prefetch_related
+
+Group = namedtuple('Group', ['company', 'ultimate_parent', 'depth', 'cyclic'])
+GroupTree = namedtuple('GroupTree', ['company', 'subsidiaries'])
+
+
+def _key(company):
+    return company.locale, six.text_type(company.id)
+
+
+class GroupResolver(object):
+    '''
+    Ultimate parents and group trees for many companies at once.
+
+    Parent lookups are made a level at a time for every company still
+    climbing, all requests of a level concurrently. Each parent hop is
+    remembered, and so is the ultimate parent of every company on a
+    resolved path, so companies of the same group stop climbing as soon
+    as they reach a company already resolved. A parent chain that comes
+    back to itself is reported as cyclic instead of looping forever.
+    '''
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._companies = {}
+        # key -> parent key, None for companies without a parent
+        self._parents = {}
+        # key -> (ultimate parent key, depth, cyclic)
+        self._resolved = {}
+        self._trees = {}
+
+    def _remember(self, company):
+        return self._companies.setdefault(_key(company), company)
+
+    def _unknown_hop(self, key):
+        'the first company up the known chain from key whose parent is not known yet'
+        seen = set()
+        while key is not None and key not in self._resolved and key not in seen:
+            if key not in self._parents:
+                return key
+            seen.add(key)
+            key = self._parents[key]
+        return None
+
+    def _climb(self, keys):
+        'fetch parent hops level by level until every chain from keys ends'
+        climbing = set(self._unknown_hop(key) for key in keys) - set([None])
+        while climbing:
+            level = [self._companies[key] for key in climbing]
+            prefetch_related(level, 'parent', max_workers=self.max_workers)
+            for company in level:
+                # read the slot, a company without a parent is not cached by the property
+                parent = getattr(company, '_parent', None)
+                if parent is None:
+                    self._parents[_key(company)] = None
+                else:
+                    self._parents[_key(company)] = _key(self._remember(parent))
+            climbing = set(self._unknown_hop(key) for key in climbing) - set([None])
+
+    def _ultimate(self, key):
+        if key in self._resolved:
+            return self._resolved[key]
+        path = []
+        seen = set()
+        current = key
+        cyclic = False
+        while True:
+            if current in self._resolved:
+                top, depth, cyclic = self._resolved[current]
+                break
+            parent = self._parents.get(current)
+            if parent is None:
+                top, depth = current, 0
+                break
+            if current in seen:
+                # the chain came back round, the company closing the loop is the top
+                top, depth, cyclic = current, 0, True
+                break
+            seen.add(current)
+            path.append(current)
+            current = parent
+        # every company on the path shares the answer, at its own depth
+        for offset, node in enumerate(reversed(path)):
+            self._resolved.setdefault(node, (top, depth + offset + 1, cyclic))
+        self._resolved.setdefault(current, (top, depth, cyclic))
+        return self._resolved[key]
+
+    def resolve(self, companies):
+        'a Group (company, ultimate_parent, depth, cyclic) for every company, in order'
+        companies = [self._remember(company) for company in companies]
+        self._climb(_key(company) for company in companies)
+        groups = []
+        for company in companies:
+            top, depth, cyclic = self._ultimate(_key(company))
+            groups.append(Group(company, self._companies[top], depth, cyclic))
+        return groups
+
+    def ultimate_parent(self, company):
+        return self.resolve([company])[0].ultimate_parent
+
+    def tree(self, root):
+        '''
+        The GroupTree below root, subsidiaries are fetched a level at a time
+        with all companies of a level concurrently; each company appears once
+        '''
+        root = self._remember(root)
+        key = _key(root)
+        if key in self._trees:
+            return self._trees[key]
+        trees = {key: GroupTree(root, [])}
+        level = [root]
+        while level:
+            prefetch_related(level, 'subsidiaries', max_workers=self.max_workers)
+            next_level = []
+            for company in level:
+                for subsidiary in getattr(company, '_subsidiaries', None) or []:
+                    subsidiary = self._remember(subsidiary)
+                    sub_key = _key(subsidiary)
+                    if sub_key in trees:
+                        continue
+                    trees[sub_key] = GroupTree(subsidiary, [])
+                    trees[_key(company)].subsidiaries.append(trees[sub_key])
+                    next_level.append(subsidiary)
+            level = next_level
+        self._trees[key] = trees[key]
+        return trees[key]
+
+    def group_trees(self, companies):
+        'the tree of the ultimate parent of each company, built once per group'
+        return [self.tree(group.ultimate_parent) for group in self.resolve(companies)]
+
+
+def resolve_groups(companies, **kwargs):
+    'see GroupResolver.resolve'
+    return GroupResolver(**kwargs).resolve(companies)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Hedged requests, Client(hedging=HedgingPolicy()).
+
+A request that has not been answered by the time most requests of its
+endpoint class are, the 95th percentile of the latencies seen, is sent a
+second time and whichever response comes first is used. Hedges are
+limited to max_ratio of the requests, take a token from the client's
+rate limiter, without waiting for one, and are counted in the client's
+metrics as duedil_hedged_requests_total by outcome: won or lost against
+the first request, or over_budget and rate_limited when not sent.
+'''
+from __future__ import unicode_literals
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+
+from . import deadlines
+from .concurrency import bind
+from .metrics import HEDGES, endpoint_class
+
+
+class _Latencies(object):
+    'the last window latencies of an endpoint class, the percentile recomputed as they come'
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.fresh = 0
+        self.value = None
+
+
+class HedgingPolicy(object):
+    '''
+    Hedge at the percentile of the latencies of each endpoint class once
+    min_samples of them were seen, over the last window responses; never
+    sooner than min_delay seconds and for no more than max_ratio of the
+    requests. Requests and their hedges run on a pool of max_workers
+    threads, the calling thread waits for the first to answer; requests
+    that find every worker busy are sent by the calling thread, unhedged,
+    rather than waiting for one.
+    '''
+
+    def __init__(self, percentile=95, max_ratio=0.05, min_samples=20, window=500,
+                 min_delay=0.0, max_workers=32):
+        if not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100')
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+
+    def observe(self, endpoint, seconds):
+        'a response of endpoint class endpoint that took seconds'
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = _Latencies(self.window)
+            latencies.samples.append(seconds)
+            latencies.fresh += 1
+            # sorting the window for every response would cost more than the request
+            if latencies.value is None or latencies.fresh * 10 >= len(latencies.samples):
+                if len(latencies.samples) >= self.min_samples:
+                    ordered = sorted(latencies.samples)
+                    latencies.value = ordered[int(len(ordered) * self.percentile / 100.0)]
+                    latencies.fresh = 0
+
+    def delay(self, endpoint):
+        'seconds to wait for a response of endpoint class endpoint before hedging, None for no hedging'
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or latencies.value is None:
+                return None
+            return max(latencies.value, self.min_delay)
+
+    def _budget(self):
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _reserve(self):
+        'a worker for a request, False when all of them are busy'
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _submit(self, endpoint, transport, url, params, timeout):
+        send = bind(lambda: transport.send(url, params, timeout))
+
+        def run():
+            # the latency of the request, not of its wait in the queue
+            start = time.time()
+            try:
+                response = send()
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+            self.observe(endpoint, time.time() - start)
+            return response
+        return self.executor.submit(run)
+
+    def send(self, client, transport, url, params, timeout):
+        'send through transport for client, hedged once the request is slower than the percentile'
+        endpoint = endpoint_class(url, client.base_url)
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(endpoint)
+        if delay is None or not self._reserve():
+            start = time.time()
+            response = transport.send(url, params, timeout)
+            self.observe(endpoint, time.time() - start)
+            return response
+
+        first = self._submit(endpoint, transport, url, params, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        try:
+            # the hedge gets what is left of the deadline
+            timeout = deadlines.timeout(timeout)
+        except deadlines.DeadlineExceeded:
+            return first.result()
+        if not self._budget():
+            return self._outcome(client, endpoint, 'over_budget', first)
+        if client.rate_limiter is not None and not client.rate_limiter.try_acquire():
+            with self._lock:
+                self.hedges -= 1
+            return self._outcome(client, endpoint, 'rate_limited', first)
+        with self._lock:
+            # hedges are few, they may wait for a worker
+            self._in_flight += 1
+        hedge = self._submit(endpoint, transport, url, params, timeout)
+        done, pending = wait([first, hedge], return_when=FIRST_COMPLETED)
+        winner = next(iter(done))
+        if winner.exception() is not None and pending:
+            # the other one may still make it
+            other = next(iter(pending))
+            wait([other])
+            if other.exception() is None:
+                winner = other
+        if winner is hedge:
+            with self._lock:
+                self.wins += 1
+        return self._outcome(client, endpoint, 'won' if winner is hedge else 'lost', winner)
+
+    @staticmethod
+    def _outcome(client, endpoint, outcome, future):
+        if client.metrics is not None:
+            client.metrics.increment(HEDGES, endpoint=endpoint, outcome=outcome)
+        return future.result()
+
+    def stats(self):
+        'requests, hedges sent, hedges answering first and the hedging delay per endpoint class'
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'wins': self.wins,
+                'delays': dict((endpoint, latencies.value) for endpoint, latencies in self._latencies.items()
+                               if latencies.value is not None),
+            }
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+HTTP/2 for the clients, on httpx (Python 3, pip install duedil[http2]).
+
+HTTP2Transport multiplexes the concurrent requests of a client over a few
+connections, whether they come from the thread pools of get_many,
+prefetch_related and the crawler:
+
+    client = ProClient(api_key, transport=HTTP2Transport())
+
+or from asyncio, through aget and aget_many of duedil.aio (Python 3.5+).
+'''
+from __future__ import unicode_literals
+
+import threading
+
+from requests.exceptions import ConnectTimeout, ReadTimeout
+
+from .transport import Transport, build_response
+
+try:  # pragma: no cover
+    import asyncio
+    import httpx
+except ImportError:  # pragma: no cover
+    asyncio = httpx = None
+
+
+def _response(response):
+    'the requests.Response Client._result expects for an httpx response'
+    # httpx makes a reason phrase up for HTTP/2, which has none
+    reason = response.reason_phrase if response.http_version.startswith('HTTP/1') else None
+    return build_response(str(response.url), response.status_code, response.content,
+                          reason, response.headers, response.elapsed.total_seconds())
+
+
+def _timeout(timeout):
+    'the httpx timeout of a requests one, seconds or (connect, read)'
+    if timeout is None:
+        return httpx.USE_CLIENT_DEFAULT
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _timed_out(error):
+    'the requests exception of an httpx timeout, as RequestsTransport raises'
+    if isinstance(error, httpx.ConnectTimeout):
+        return ConnectTimeout(error)
+    return ReadTimeout(error)
+
+
+class HTTP2Transport(Transport):
+    '''
+    A transport sending over HTTP/2 connections, at most max_connections
+    of them however many requests are in flight; timeout is in seconds,
+    one number or (connect, read), for the requests sent without one and
+    None waits forever. duedil is HTTP/1.1 unless it negotiates HTTP/2
+    over TLS; with prior_knowledge HTTP/2 is spoken straight away, for
+    servers like StubH2Server that only speak HTTP/2 in cleartext.
+
+    The requests of the threads are all sent from one event loop, on a
+    thread of the transport: the stream ids of httpx.Client are taken and
+    sent without a lock, so threads sharing a connection could open the
+    streams out of order, which servers answer with a GOAWAY.
+    '''
+
+    def __init__(self, max_connections=2, timeout=None, prior_knowledge=False, verify=True):
+        if httpx is None:
+            raise ImportError('httpx is required for HTTP2Transport, pip install duedil[http2]')
+        super(HTTP2Transport, self).__init__()
+        self.options = {
+            'http1': not prior_knowledge,
+            'http2': True,
+            'timeout': None if timeout is None else _timeout(timeout),
+            'verify': verify,
+            'limits': httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections),
+        }
+        self._client = None
+        self._loop = None
+        self._thread = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    @property
+    def loop(self):
+        'the event loop the requests of the threads are sent from'
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name='duedil-http2')
+                    self._thread.daemon = True
+                    self._thread.start()
+                    self._client = httpx.AsyncClient(**self.options)
+                    self._loop = loop
+        return self._loop
+
+    @property
+    def async_client(self):
+        'the httpx.AsyncClient, bound to the event loop that first uses it'
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self.options)
+        return self._async_client
+
+    def _count(self, response):
+        with self._lock:
+            self._versions[response.http_version] = self._versions.get(response.http_version, 0) + 1
+        return _response(response)
+
+    def _send(self, url, params, timeout):
+        loop = self.loop
+        request = self._client.get(url, params=params, timeout=_timeout(timeout))
+        try:
+            return self._count(asyncio.run_coroutine_threadsafe(request, loop).result())
+        except httpx.TimeoutException as error:
+            raise _timed_out(error)
+
+    def asend(self, url, params=None, timeout=None):
+        'send on the event loop, a coroutine of duedil.aio (Python 3.5+)'
+        from .aio import asend
+        return asend(self, url, params, timeout)
+
+    def connection_stats(self):
+        stats = self.stats.snapshot()
+        with self._lock:
+            stats['responses_by_http_version'] = dict(self._versions)
+        return stats
+
+    def close(self):
+        with self._lock:
+            client, loop, thread = self._client, self._loop, self._thread
+            self._client = self._loop = self._thread = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def aclose(self):
+        'close the connections of the threads and of the event loop, a coroutine of duedil.aio'
+        from .aio import aclose
+        return aclose(self)
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from bisect import bisect_left
+import re
+import threading
+import time
+import weakref
+
+import six
+
+REQUESTS = 'duedil_requests_total'
+DURATION = 'duedil_request_duration_seconds'
+RESPONSE_BYTES = 'duedil_response_bytes_total'
+RETRIES = 'duedil_retries_total'
+NOT_FOUND = 'duedil_not_found_total'
+CACHE = 'duedil_cache_requests_total'
+HEDGES = 'duedil_hedged_requests_total'
+
+HELP = {
+    REQUESTS: 'Requests sent to duedil by endpoint class and status code',
+    DURATION: 'Time from sending a request to duedil to its response',
+    RESPONSE_BYTES: 'Response body bytes received from duedil',
+    RETRIES: 'Requests rejected for going over the QPS limit and retried',
+    NOT_FOUND: 'Requests answered with 404',
+    CACHE: 'Lookups per cache tier and result',
+    HEDGES: 'Slow requests sent a second time by outcome, or why they were not',
+}
+
+# seconds, the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LOCALES = ('uk', 'roi')
+_FORMAT = re.compile(r'\.json$')
+
+
+def endpoint_class(endpoint, base_url=None):
+    '''
+    The endpoint with ids replaced, so requests of one kind share metrics:
+    uk/companies/06999618/directors is {locale}/companies/{id}/directors
+    '''
+    if base_url and endpoint.startswith(base_url):
+        endpoint = endpoint[len(base_url):]
+    parts = _FORMAT.sub('', endpoint.split('?', 1)[0]).strip('/').split('/')
+    if parts and parts[0] in LOCALES:
+        # collection, id, collection, id...
+        parts = ['{locale}'] + [part if i % 2 == 0 else '{id}' for i, part in enumerate(parts[1:])]
+    return '/'.join(parts)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class _Shard(object):
+    'the counters of one thread, only ever written by that thread'
+
+    def __init__(self, thread=None):
+        self.thread = weakref.ref(thread) if thread is not None else None
+        self.counters = {}
+        self.histograms = {}
+        self.requests = 0
+
+    @property
+    def retired(self):
+        'True once the thread is gone and nothing writes to the shard any more'
+        thread = self.thread() if self.thread is not None else None
+        return thread is None or not thread.is_alive()
+
+    def merge(self, counters, histograms):
+        'add counters and histograms, in the shapes of the shard, to these'
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, histogram in histograms.items():
+            total = self.histograms.setdefault(key, [0] * len(histogram))
+            for i, value in enumerate(histogram):
+                total[i] += value
+
+
+class Metrics(object):
+    '''
+    Request metrics of duedil clients.
+
+    Every thread writes to counters of its own, so recording takes no
+    lock; snapshot() adds the threads' counters up. The counters of threads
+    that have ended are folded into one shard, so thread pools coming and
+    going do not make metrics grow. Counters and
+    histograms are keyed by name and labels, snapshot() returns them as a
+    dict and prometheus() in the Prometheus text exposition format.
+
+    Give a client metrics=Metrics() and it records per endpoint class the
+    requests by status, their latency and response bytes, QPS retries and
+    404s, hits and misses of the dogpile cache, the session and the
+    local query engine, and the hedged requests.
+    '''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    @property
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._retire()
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self):
+        'fold the shards of the threads that ended into the retired one, under the lock'
+        live = []
+        for shard in self._shards:
+            if shard.retired:
+                self._retired.merge(shard.counters, shard.histograms)
+            else:
+                live.append(shard)
+        self._shards = live
+
+    def increment(self, name, amount=1, **labels):
+        counters = self._shard.counters
+        key = (name, _labels(labels))
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        histograms = self._shard.histograms
+        key = (name, _labels(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # a count per bucket and the +Inf bucket, then the sum
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def cache(self, tier, hit):
+        self.increment(CACHE, tier=tier, result='hit' if hit else 'miss')
+
+    # client hooks
+
+    def request_started(self, url):
+        'count the request, its start to be handed to request_finished'
+        self._shard.requests += 1
+        return time.time()
+
+    def request_finished(self, response, base_url=None, throttled=False, started=None):
+        # the start goes with the request, a thread may have many in flight on an event loop
+        elapsed = time.time() - started if started is not None else 0.0
+        endpoint = endpoint_class(response.url or '', base_url)
+        self.increment(REQUESTS, endpoint=endpoint, status=six.text_type(response.status_code))
+        self.observe(DURATION, elapsed, endpoint=endpoint)
+        self.increment(RESPONSE_BYTES, len(response.content or b''), endpoint=endpoint)
+        if response.status_code == 404:
+            self.increment(NOT_FOUND, endpoint=endpoint)
+        if throttled:
+            self.increment(RETRIES, endpoint=endpoint)
+
+    @property
+    def requests_made(self):
+        'requests sent by the current thread, to tell cache hits from misses'
+        return self._shard.requests
+
+    # export
+
+    def snapshot(self):
+        '''
+        {'counters': {name: {labels: value}}, 'histograms': {name: {labels:
+        {'buckets': {le: cumulative count}, 'sum': s, 'count': n}}}} where
+        labels is a tuple of (label, value) pairs
+        '''
+        counters = {}
+        histograms = {}
+        with self._lock:
+            self._retire()
+            shards = list(self._shards)
+            # copied under the lock, _retire adds to it
+            retired = _Shard()
+            retired.merge(self._retired.counters, self._retired.histograms)
+        for shard in shards + [retired]:
+            # copying a dict is atomic, the owning thread may be writing to it
+            for (name, labels), value in dict(shard.counters).items():
+                series = counters.setdefault(name, {})
+                series[labels] = series.get(labels, 0) + value
+            for key, histogram in dict(shard.histograms).items():
+                total = histograms.setdefault(key, [0] * len(histogram))
+                for i, value in enumerate(list(histogram)):
+                    total[i] += value
+        result = {'counters': counters, 'histograms': {}}
+        for (name, labels), histogram in histograms.items():
+            cumulative = 0
+            buckets = {}
+            for le, count in zip(self.buckets + (float('inf'),), histogram[:-1]):
+                cumulative += count
+                buckets[le] = cumulative
+            result['histograms'].setdefault(name, {})[labels] = {
+                'buckets': buckets, 'sum': histogram[-1], 'count': cumulative,
+            }
+        return result
+
+    def counter(self, name, **labels):
+        'the current value of one counter'
+        return self.snapshot()['counters'].get(name, {}).get(_labels(labels), 0)
+
+    def prometheus(self):
+        'the snapshot in the Prometheus text exposition format'
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted(snapshot['counters']):
+            lines.append('# HELP {0} {1}'.format(name, HELP.get(name, name)))
+            lines.append('# TYPE {0} counter'.format(name))
+            for labels, value in sorted(snapshot['counters'][name].items()):
+                lines.append('{0}{1} {2}'.format(name, _format_labels(labels), _format_value(value)))
+        for name in sorted(snapshot['histograms']):
+            lines.append('# HELP {0} {1}'.format(name, HELP.get(name, name)))
+            lines.append('# TYPE {0} histogram'.format(name))
+            for labels, histogram in sorted(snapshot['histograms'][name].items()):
+                for le, count in sorted(histogram['buckets'].items()):
+                    le = '+Inf' if le == float('inf') else _format_value(le)
+                    lines.append('{0}_bucket{1} {2}'.format(name, _format_labels(labels + (('le', le),)), count))
+                lines.append('{0}_sum{1} {2}'.format(name, _format_labels(labels), _format_value(histogram['sum'])))
+                lines.append('{0}_count{1} {2}'.format(name, _format_labels(labels), histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.counters = {}
+                shard.histograms = {}
+            self._retired = _Shard()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = ('{0}="{1}"'.format(key, six.text_type(value).replace('\\', '\\\\').replace('"', '\\"'))
+               for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else six.text_type(value)
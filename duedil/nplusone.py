@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import deque
+import threading
+import time
+import warnings
+
+from .tracing import Tracer
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def suggestion(klass, attribute):
+    'the batch API that loads attribute of many klass resources at once'
+    from .search import SearchResource
+    if klass is None:
+        return 'load the resources together with Client.get_many'
+    if issubclass(klass, SearchResource):
+        return 'call duedil.search.hydrate(results) before the loop'
+    related = getattr(klass, 'related_resources', None) or {}
+    if attribute in related or attribute == 'details':
+        return "call duedil.resources.prefetch_related(resources, '{0}') before the loop".format(attribute)
+    return 'load the resources together with Client.get_many, or hydrate the search results they come from'
+
+
+class NPlusOneDetector(Tracer):
+    '''
+    Reports lazy loads repeated one by one from the same place.
+
+    Entered like a Tracer. When threshold calls triggered by the same
+    attribute of the same resource class come from the same line of code
+    within window seconds (within the whole block when window is None)
+    the pattern is reported once: as an NPlusOneWarning with mode='warn',
+    by raising NPlusOneError from the offending access with mode='raise',
+    and in either case appended to found. Calls made from the concurrency
+    helpers - prefetch_related, hydrate, get_many - are batches, not N+1.
+    '''
+
+    def __init__(self, threshold=5, window=None, mode='warn', **kwargs):
+        if mode not in ('warn', 'raise'):
+            raise ValueError('mode must either be "warn" or "raise"')
+        kwargs.setdefault('stack_limit', 1)
+        super(NPlusOneDetector, self).__init__(capture_stack=True, **kwargs)
+        self.threshold = threshold
+        self.window = window
+        self.mode = mode
+        self.found = []
+        self._calls = {}
+        self._reported = set()
+        self._detector_lock = threading.Lock()
+
+    def finish(self, span, error=None):
+        super(NPlusOneDetector, self).finish(span, error)
+        attributes = span.attributes
+        if attributes['duedil.batched'] or attributes['duedil.attribute'] is None:
+            return
+        site = span.stack[-1] if span.stack else None
+        key = (span.resource_class, attributes['duedil.attribute'],
+               site[0] if site else None, site[1] if site else None)
+        now = time.time()
+        with self._detector_lock:
+            if key in self._reported:
+                return
+            calls = self._calls.setdefault(key, deque())
+            calls.append(now)
+            if self.window is not None:
+                while calls and now - calls[0] > self.window:
+                    calls.popleft()
+            if len(calls) < self.threshold:
+                return
+            self._reported.add(key)
+            del self._calls[key]
+        message = self.message(span, site, len(calls))
+        self.found.append(message)
+        if self.mode == 'raise':
+            raise NPlusOneError(message)
+        warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+    @staticmethod
+    def message(span, site, count):
+        attributes = span.attributes
+        where = '{0}:{1}'.format(site[0], site[1]) if site else 'an unknown place'
+        return ('N+1 lazy loads: {0}.{1} was loaded one at a time {2} times at {3} ({4}); {5}'
+                .format(attributes['duedil.resource'], attributes['duedil.attribute'], count, where,
+                        span.name, suggestion(span.resource_class, attributes['duedil.attribute'])))
+
+
+def detect_n_plus_one(threshold=5, window=None, mode='warn'):
+    'an NPlusOneDetector, to be entered: with detect_n_plus_one(mode="raise"): ...'
+    return NPlusOneDetector(threshold=threshold, window=window, mode=mode)
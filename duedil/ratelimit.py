@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Client side rate limiting, Client(rate_limiter=TokenBucket(10)) sends at
+most 10 requests a second, retries and hedged requests included, instead
+of going over duedil's QPS limit and waiting out the 403s.
+'''
+from __future__ import unicode_literals
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    '''
+    rate tokens a second, at most burst of them saved up, rate by default.
+    Tokens are handed out in the order they are asked for: a thread taking
+    one before it is there reserves it and sleeps until it is due.
+    '''
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self, timeout=None):
+        '''
+        take a token due in the seconds returned, for callers that wait for
+        it themselves like asyncio tasks; None straight away, nothing taken,
+        when it would not come within timeout seconds
+        '''
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if timeout is not None and wait > timeout:
+                return None
+            self._tokens -= 1
+        return wait
+
+    def acquire(self, timeout=None):
+        '''
+        take a token, waiting for it as long as it takes or up to timeout
+        seconds; False straight away, nothing taken, when it would not
+        come in time
+        '''
+        wait = self.reserve(timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def try_acquire(self):
+        'take a token when one is there, without waiting'
+        return self.acquire(0)
+
+    @property
+    def available(self):
+        'the tokens there are now, negative while threads wait for reserved ones'
+        with self._lock:
+            return min(self.burst, self._tokens + (time.time() - self._updated) * self.rate)
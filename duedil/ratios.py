@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import six
+
+from .frame import CompanyFrame, _number, _payload
+from .resources import Resource
+from .resources.pro.company.accounts.timeline import FIELD_ALIASES, parse_date
+
+try:  # pragma: no cover
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# the figures the ratios are computed from, by their statutory names
+INPUTS = (
+    'assets_total', 'assets_total_current', 'assets_total_fix', 'bank_overdraft',
+    'capital_employed', 'cash', 'cost_of_sales', 'gross_profit', 'liabilities_current',
+    'lt_loans', 'pre_tax_profit', 'profit_after_tax', 'shareholder_funds',
+    'short_term_loans', 'stock', 'trade_debtors', 'turnover',
+)
+
+
+def _divide(numerator, denominator, scale=1.0):
+    'numerator / denominator * scale, NaN where either is missing or the denominator is 0'
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator * scale
+    result[denominator == 0] = np.nan
+    return result
+
+
+def _fill(value, fallback):
+    'value where it is known, fallback elsewhere'
+    return np.where(np.isnan(value), fallback, value)
+
+
+def _debt(c):
+    'the loans and overdraft, NaN when none of them is known'
+    lines = (c['lt_loans'], c['short_term_loans'], c['bank_overdraft'])
+    # a missing line next to known ones is no borrowing of that kind
+    debt = np.nan_to_num(lines[0]) + np.nan_to_num(lines[1]) + np.nan_to_num(lines[2])
+    debt[np.isnan(lines[0]) & np.isnan(lines[1]) & np.isnan(lines[2])] = np.nan
+    return debt
+
+
+def _assets_total(c):
+    return _fill(c['assets_total'], c['assets_total_current'] + c['assets_total_fix'])
+
+
+def _capital_employed(c):
+    return _fill(c['capital_employed'], _assets_total(c) - c['liabilities_current'])
+
+
+# ratio name, as in CompanySearchResult.range_filters and AccountDetailsStatutory -> function
+RATIOS = OrderedDict([
+    ('current_ratio', lambda c: _divide(c['assets_total_current'], c['liabilities_current'])),
+    ('liquidity_ratio', lambda c: _divide(c['assets_total_current'] - c['stock'], c['liabilities_current'])),
+    ('cash_to_current_liabilities_ratio', lambda c: _divide(c['cash'], c['liabilities_current'])),
+    ('cash_to_total_assets_ratio', lambda c: _divide(c['cash'], _assets_total(c))),
+    ('gearing', lambda c: _divide(_debt(c), c['shareholder_funds'], 100.0)),
+    ('debt_to_capital_ratio', lambda c: _divide(_debt(c), _debt(c) + c['shareholder_funds'])),
+    ('return_on_capital_employed', lambda c: _divide(c['pre_tax_profit'], _capital_employed(c), 100.0)),
+    ('return_on_assets_ratio', lambda c: _divide(c['pre_tax_profit'], _assets_total(c), 100.0)),
+    ('gross_margin_ratio', lambda c: _divide(_fill(c['gross_profit'], c['turnover'] - c['cost_of_sales']),
+                                             c['turnover'], 100.0)),
+    ('profit_ratio', lambda c: _divide(c['pre_tax_profit'], c['turnover'], 100.0)),
+    ('net_profitability', lambda c: _divide(c['profit_after_tax'], c['turnover'], 100.0)),
+    ('inventory_turnover_ratio', lambda c: _divide(c['cost_of_sales'], c['stock'])),
+    ('debtor_days', lambda c: _divide(c['trade_debtors'], c['turnover'], 365.0)),
+])
+
+
+def _value(record, name):
+    'the figure called name in a details resource or payload, by statutory name or alias'
+    values = record.__dict__ if isinstance(record, Resource) else _payload(record)
+    if name in values:
+        return values[name]
+    for alias in FIELD_ALIASES.get(name, ()):
+        if alias in values:
+            return values[alias]
+    return None
+
+
+def account_columns(records, names=INPUTS):
+    '''
+    Columns of account details records, AccountDetails resources or their
+    payloads of any accounts type: a float64 column per name, 'company'
+    and 'date' (datetime64[D], NaT when missing)
+    '''
+    if np is None:
+        raise ImportError('numpy is required for ratios, pip install duedil[numpy]')
+    records = list(records)
+    columns = {}
+    for name in names:
+        columns[name] = np.fromiter((_number(_value(record, name)) for record in records),
+                                    dtype=np.float64, count=len(records))
+    companies = np.empty(len(records), dtype=object)
+    companies[:] = [None if _value(r, 'company') is None else six.text_type(_value(r, 'company'))
+                    for r in records]
+    columns['company'] = companies
+    columns['date'] = np.array([parse_date(_value(record, 'date')) or 'NaT' for record in records],
+                               dtype='datetime64[D]')
+    return columns
+
+
+def compute_ratios(columns, names=None):
+    '''
+    dict of ratio name -> float64 array for columns holding the INPUTS
+    arrays, figures absent from columns count as missing. A ratio is NaN
+    where any figure it needs is missing or its denominator is 0
+    '''
+    if np is None:
+        raise ImportError('numpy is required for ratios, pip install duedil[numpy]')
+    size = len(next(iter(columns.values()))) if columns else 0
+    inputs = dict((name, np.asarray(columns[name], dtype=np.float64) if name in columns
+                   else np.full(size, np.nan)) for name in INPUTS)
+    return OrderedDict((name, RATIOS[name](inputs)) for name in (names or RATIOS))
+
+
+def previous(companies, dates):
+    '''
+    index of the previous filing of the same company for every row, -1
+    for a company's first filing. Rows need not be sorted
+    '''
+    order = np.lexsort((dates, companies.astype(six.text_type)))
+    sorted_companies = companies[order]
+    result = np.full(len(order), -1, dtype=np.int64)
+    if len(order) > 1:
+        same = sorted_companies[1:] == sorted_companies[:-1]
+        # records without a company are never each other's previous filing
+        same &= np.not_equal(sorted_companies[1:], None)
+        result[order[1:][same]] = order[:-1][same]
+    return result
+
+
+def deltas(columns, names, company='company', date='date'):
+    '''
+    name_delta and name_delta_percentage arrays for every name, the change
+    from the previous filing of the same company; NaN for first filings,
+    missing figures and percentages of a previous value of 0
+    '''
+    before = previous(columns[company], columns[date])
+    has_previous = before >= 0
+    result = OrderedDict()
+    for name in names:
+        values = np.asarray(columns[name], dtype=np.float64)
+        last = np.where(has_previous, values[before], np.nan)
+        delta = values - last
+        result[name + '_delta'] = delta
+        result[name + '_delta_percentage'] = _divide(delta, np.abs(last), 100.0)
+    return result
+
+
+def ratio_frame(records, names=None, with_deltas=True):
+    '''
+    CompanyFrame of the ratios of account details records, one row per
+    record with company and date, plus the year on year deltas of every
+    ratio when with_deltas is set
+    '''
+    columns = account_columns(records)
+    frame = dict(compute_ratios(columns, names))
+    ratio_names = list(frame)
+    frame['company'] = columns['company']
+    frame['date'] = columns['date']
+    if with_deltas:
+        frame.update(deltas(frame, ratio_names))
+    return CompanyFrame(frame)
@@ -19,11 +19,15 @@
 from __future__ import unicode_literals
 
 import sys
+import threading
 import six
-from collections import Mapping
+from collections import Mapping, Sequence
 from abc import ABCMeta
 
 from ..api import LiteClient, ProClient  # , InternationalClient
+from ..concurrency import background, map_concurrently
+from .. import deadlines, tracing
+from ..search.pro import MAX_PAGE_SIZE
 
 
 class Resource(Mapping):
@@ -53,6 +57,17 @@ class Resource(Mapping):
         if kwargs:
             self._set_attributes(**kwargs)
 
+    @classmethod
+    def instance(cls, client, id, locale='uk', **kwargs):
+        '''
+        Build the resource for client, through the client's session when it
+        has one so each entity is only materialised once
+        '''
+        session = getattr(client, 'session', None)
+        if session is None:
+            return cls(id=id, client=client, locale=locale, **kwargs)
+        return session.resource(cls, id, client=client, locale=locale, **kwargs)
+
     def _set_attributes(self, missing=False, **kwargs):
         for k, v in kwargs.items():
             if k in self.attribute_names:
@@ -64,7 +79,11 @@ class Resource(Mapping):
                     self.__setattr__(allowed, None)
 
     def load(self):
-        self._result = self.client.get(self.endpoint)
+        self._set_result(self.client.get(self.endpoint))
+
+    def _set_result(self, result):
+        'fill the resource from a payload of its endpoint'
+        self._result = result
         self.loaded = True
         self._set_attributes(**self._result)
 
@@ -75,7 +94,8 @@ class Resource(Mapping):
         if name in self.attribute_names:
             if not self.loaded:
                 try:
-                    self.load()
+                    with tracing.trigger(self, name):
+                        self.load()
                 except ValueError:
                     pass
             return super(Resource, self).__getattribute__(name)
@@ -142,11 +162,8 @@ class ProResource(Resource):
     client_class = ProClient
     full_endpoint = False
 
-    def load(self):
-        """
-        get results from duedil
-        """
-        self._result = self.client.get(self.endpoint)
+    def _set_result(self, result):
+        self._result = result
         self.loaded = True
         self._set_attributes(**self._result.get('response', {}))
 
@@ -189,13 +206,8 @@ class RelatedResourceMeta(ABCMeta):
 
             @resource_property(ep)
             def getter(self, endpoint):
-                resource = self.related_resources[endpoint]
-
-                if isinstance(resource, six.string_types):
-                    module, resource = resource.rsplit('.', 1)
-                    resource = getattr(sys.modules['duedil.resources.{0!s}'.format(module)], resource)
-
-                return self.load_related(endpoint, resource, self.full_endpoint)
+                with tracing.trigger(self, endpoint):
+                    return self.load_related(endpoint, self.related_class(endpoint), self.full_endpoint)
 
             attr_name = ep.replace('-', '_')
             setattr(cls, attr_name,
@@ -206,54 +218,231 @@ class SearchableRelatedResourceMeta(SearchableResourceMeta, RelatedResourceMeta)
     pass
 
 
+def prefetch_related(resources, *keys, **kwargs):
+    '''
+    Load the related resources named by keys for every resource in
+    resources, issuing all requests concurrently and filling the slots
+    the related properties read from. Keys already loaded are skipped,
+    as are those a partial deadline ran out before.
+
+    max_workers bounds the number of requests in flight.
+    '''
+    max_workers = kwargs.pop('max_workers', None)
+    if kwargs:
+        raise TypeError('unexpected keyword arguments: {0}'.format(', '.join(kwargs)))
+    jobs = []
+    for resource in resources:
+        for key in keys:
+            key = key.replace('_', '-')
+            klass = resource.related_class(key)
+            if getattr(resource, resource._related_internal_key(key), None) is None:
+                jobs.append((resource, key, klass))
+
+    def fetch(job):
+        resource, key, _klass = job
+        full_endpoint = resource.full_endpoint
+        with tracing.trigger(resource, key):
+            return resource._get(key, full_endpoint, resource._related_params(full_endpoint))
+
+    results = map_concurrently(deadlines.partial_results(fetch), jobs, max_workers=max_workers)
+    for (resource, key, klass), result in zip(jobs, results):
+        if result:
+            related = resource._build_related(key, klass, result, resource.full_endpoint)
+            setattr(resource, resource._related_internal_key(key), related)
+    return resources
+
+
+class RelatedResourceList(Sequence):
+    '''
+    A related collection (directors, shareholders, mortgages...) read page
+    by page.
+
+    Pages are requested at the largest size duedil allows and only when
+    indexing or iteration gets to them; while a page is being iterated the
+    next one is already fetched in the background. The length is the
+    total duedil reports, so len() never loads the items.
+    '''
+
+    def __init__(self, parent, key, klass, result, full_endpoint=False):
+        self.parent = parent
+        self.key = key
+        self.klass = klass
+        self.full_endpoint = full_endpoint
+        self._rows = []
+        self._objects = []
+        self._length = 0
+        self._prefetch_at = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._add_page(result)
+
+    def _add_page(self, result):
+        response = (result or {}).get('response', {})
+        rows = response.get('data') or []
+        # the next page is fetched once iteration is half way through this one,
+        # readers stopping early on big collections don't pay for it
+        self._prefetch_at = len(self._rows) + len(rows) // 2
+        self._rows.extend(rows)
+        self._objects.extend([None] * len(rows))
+        total = (response.get('pagination') or {}).get('total')
+        if total is None or not rows:
+            # no pagination, or duedil ran out before the advertised total
+            total = len(self._rows)
+        self._length = max(total, len(self._rows))
+
+    def _fetch_page(self, offset):
+        with tracing.trigger(self.parent, self.key):
+            return self.parent._get(self.key, self.full_endpoint,
+                                    data={'offset': offset, 'limit': MAX_PAGE_SIZE})
+
+    def _prefetch(self):
+        with self._lock:
+            if self._pending is None and not self.fetched_all():
+                self._pending = background(self._fetch_page, len(self._rows))
+
+    def _next_page(self):
+        with self._lock:
+            if self.fetched_all():
+                return
+            pending, self._pending = self._pending, None
+            result = None
+            if pending is not None:
+                try:
+                    result = pending.result()
+                except deadlines.DeadlineExceeded:
+                    # the prefetch ran out of the deadline it started under, not necessarily of ours
+                    pending = None
+            if pending is None:
+                result = self._fetch_page(len(self._rows))
+            self._add_page(result)
+
+    def fetched_all(self):
+        return len(self._rows) >= self._length
+
+    def _materialize(self, index):
+        obj = self._objects[index]
+        if obj is None:
+            row = dict(self._rows[index])
+            if self.klass is None:
+                return row
+            locale = row.pop('locale', None) or self.parent.locale
+            obj = self._objects[index] = self.klass.instance(self.parent.client, row.pop('id'), locale=locale, **row)
+        return obj
+
+    @property
+    def rows(self):
+        'the raw dictionaries of the items fetched so far'
+        return self._rows
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(key)
+        while key >= len(self._rows) and not self.fetched_all():
+            self._next_page()
+        if key >= len(self._rows):
+            raise IndexError(key)
+        return self._materialize(key)
+
+    def __iter__(self):
+        index = 0
+        while True:
+            if index >= len(self._rows):
+                if self.fetched_all():
+                    return
+                self._next_page()
+                continue
+            if index >= self._prefetch_at:
+                self._prefetch()
+            yield self._materialize(index)
+            index += 1
+
+    def __str__(self):
+        return '{0} {1} of {2}'.format(len(self), self.key, self.parent)
+
+
 class RelatedResourceMixin(six.with_metaclass(RelatedResourceMeta, object)):
     related_resources = None
 
-    def _get(self, resource, full_endpoint=False):
+    def _get(self, resource, full_endpoint=False, data=None):
         if not full_endpoint:
             uri = '{endpoint}/{resource}'.format(endpoint=self.endpoint,
                                                  resource=resource)
         else:
             uri = self.endpoint
-        return self.client.get(uri)
+        return self.client.get(uri, data)
+
+    def related_class(self, key):
+        'the resource class related_resources maps key to'
+        try:
+            resource = self.related_resources[key]
+        except (KeyError, TypeError):
+            raise ValueError('{0!s} is not a related resource of {1}'.format(key, self.__class__.__name__))
+        if isinstance(resource, six.string_types):
+            module, resource = resource.rsplit('.', 1)
+            resource = getattr(sys.modules['duedil.resources.{0!s}'.format(module)], resource)
+        return resource
+
+    @staticmethod
+    def _related_internal_key(key):
+        return '_' + key.replace('-', '_')
+
+    @staticmethod
+    def _related_params(full_endpoint):
+        # ask for full pages up front, single resources ignore the limit
+        return None if full_endpoint else {'limit': MAX_PAGE_SIZE}
 
-# need to deal with pagination...
     def load_related(self, key, klass=None, full_endpoint=False):
-        internal_key = '_' + key.replace('-', '_')
+        internal_key = self._related_internal_key(key)
 
         related = getattr(self, internal_key, None)
 
         if related is None:
-            result = self._get(key, full_endpoint)
+            result = self._get(key, full_endpoint, self._related_params(full_endpoint))
             if result:
-                response = result['response']
-                related = None
-                if 'data' in response and isinstance(response['data'], (list, tuple)):
-                    related = []
-                    for r in result['response']['data']:
-                        r['locale'] = r.get('locale', self.locale)
-                        related.append(
-                            klass(client=self.client, id=r.pop('id'), **r) if klass else None
-                        )
-                elif result:
-                    locale = response.get('locale')
-                    # HACK: for locale switching when traversing companies...
-                    # XXX: this will need to be revisited!!!
-                    if locale is None and 'company_url' in response:
-                        path_components = response['company_url'][len(self.client.base_url):].split('/')
-                        if 'uk' in path_components:
-                            locale = 'uk'
-                        elif 'roi' in path_components:
-                            locale = 'roi'
-                        else:
-                            locale = 'uk'
-                    else:
-                        locale = self.locale
-                    response['locale'] = locale
-                    if klass:
-                        related = klass(client=self.client, id=response.pop('id'), **response)
+                related = self._build_related(key, klass, result, full_endpoint)
                 setattr(self, internal_key, related)
         return related
 
+    def prefetch_related(self, *keys, **kwargs):
+        '''
+        Load several related resources at once, e.g.
+        company.prefetch_related('directors', 'accounts', 'registered-address'),
+        the requests are made concurrently. Returns the resource.
+        '''
+        prefetch_related([self], *keys, **kwargs)
+        return self
+
+    def _build_related(self, key, klass, result, full_endpoint=False):
+        response = result['response']
+        related = None
+        if 'data' in response and isinstance(response['data'], (list, tuple)):
+            related = RelatedResourceList(self, key, klass, result, full_endpoint)
+        else:
+            locale = response.get('locale')
+            # HACK: for locale switching when traversing companies...
+            # XXX: this will need to be revisited!!!
+            if locale is None and 'company_url' in response:
+                path_components = response['company_url'][len(self.client.base_url):].split('/')
+                if 'uk' in path_components:
+                    locale = 'uk'
+                elif 'roi' in path_components:
+                    locale = 'roi'
+                else:
+                    locale = 'uk'
+            else:
+                locale = self.locale
+            if klass:
+                response = dict(response)
+                response.pop('locale', None)
+                related = klass.instance(self.client, response.pop('id'), locale=locale, **response)
+        return related
+
     def __len__(self):
         return len(self.attribute_names + self.related_resources.keys())
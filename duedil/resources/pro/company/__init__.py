@@ -6,6 +6,7 @@ from .accounts.gaap import AccountDetailsGAAP
 from .accounts.ifrs import AccountDetailsIFRS
 from .accounts.insurance import AccountDetailsInsurance
 from .accounts.statutory import AccountDetailsStatutory
+from .accounts.timeline import AccountsTimeline
 from .bank_account import BankAccount
 from .company import Company
 from .director import Director
@@ -21,7 +22,7 @@ from .company_keywords import Keywords
 
 __all__ = ['AccountDetailsFinancial', 'AccountDetailsGAAP',
            'AccountDetailsIFRS', 'AccountDetailsInsurance',
-           'AccountDetailsStatutory', 'BankAccount',
+           'AccountDetailsStatutory', 'AccountsTimeline', 'BankAccount',
            'Company', 'Director', 'Directorship', 'Document',
            'Industry', 'Mortgage', 'Keywords',
            'PreviousCompanyName', 'RegisteredAddress',
@@ -30,13 +30,24 @@ class Account(RelatedResourceMixin, ProResource):
         return self.uri.split('/', 5)[-1].rsplit('/', 1)[0]
 
     @property
-    def details(self):
+    def details_class(self):
+        'the AccountDetails class for the type of these accounts'
         resource = self.account_classes[self.type]
 
         if isinstance(resource, six.string_types):
             module, resource = resource.rsplit('.', 1)
             resource = getattr(sys.modules['duedil.resources.{0!s}'.format(module)], resource)
-        resource_obj = self.load_related('details', resource, self.full_endpoint)
+        return resource
+
+    def related_class(self, key):
+        # details are the only related resource, so prefetch_related can batch them
+        if key == 'details':
+            return self.details_class
+        return super(Account, self).related_class(key)
+
+    @property
+    def details(self):
+        resource_obj = self.load_related('details', self.details_class, self.full_endpoint)
         resource_obj.path = '{0}'.format(self.path)
         resource_obj.loaded = True
         return resource_obj
@@ -0,0 +1,109 @@
+'Accounts timeline'
+from __future__ import unicode_literals
+
+from collections import namedtuple, Sequence
+from datetime import datetime
+
+from .... import prefetch_related
+
+# statutory field name -> names of the same figure in the other accounts types,
+# fields with the same name in every type need no entry
+FIELD_ALIASES = {
+    'assets_other_current': ('assets_misc_current',),
+    'assets_total_fix': ('assets_total_fixed', 'assets_total_non_current'),
+    'audit_fees': ('auditor_fees',),
+    'cash': ('cash_equivalents', 'cash_and_cash_equivalents'),
+    'consolidated': ('consolidated_accounts',),
+    'directors_emoluments': ('directors_remuneration',),
+    'increase_in_cash': ('cash_increase_decrease', 'net_change_in_cash'),
+    'liabilities_current': ('liabilities_total_current', 'total_current_liabilities'),
+    'liabilities_lt': ('liabilities_total_lt', 'liabilities_total_non_current', 'total_lt_liabilities'),
+    'lt_loans': ('total_lt_loans',),
+    'net_cashflow_from_financing': ('financing_net_cashflow', 'financing_activities'),
+    'no_of_employees': ('employee_numbers',),
+    'operating_profits': ('operating_profit',),
+    'operations_net_cashflow': ('net_operations_cashflow', 'operating_activities'),
+    'paid_up_equity': ('total_called_issued_capital',),
+    'pandl_account_reserve': ('pandl_revenue_reserve',),
+    'shareholder_funds': ('total_shareholders_funds', 'total_shareholder_funds'),
+    'stock': ('stocks_and_work_in_progress', 'stocks_work_in_progress', 'inventories'),
+    'taxation': ('tax',),
+}
+
+TimelineEntry = namedtuple('TimelineEntry', ['date', 'type', 'account', 'details'])
+
+
+def parse_date(value):
+    'the datetime.date of a duedil date or dateTime string, None if it is not one'
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def field_name(klass, name):
+    'the attribute of AccountDetails class klass holding the figure called name'
+    if name in klass.attribute_names:
+        return name
+    for alias in FIELD_ALIASES.get(name, ()):
+        if alias in klass.attribute_names:
+            return alias
+    return None
+
+
+class AccountsTimeline(Sequence):
+    '''
+    The filed accounts of a company oldest first, one TimelineEntry
+    (date, type, account, details) each, details being the
+    AccountDetails class for the type of the accounts.
+
+    field() reads a figure across entries of different types, using the
+    statutory name of the figure, so no_of_employees is also read from
+    the employee_numbers of gaap and ifrs accounts.
+    '''
+
+    def __init__(self, accounts):
+        entries = []
+        for account in accounts:
+            # details that could not be loaded stay None instead of being requested again
+            details = account.details if getattr(account, '_details', None) is not None else None
+            entries.append(TimelineEntry(parse_date(account.date), account.type, account, details))
+        # undated accounts first, the order between accounts of one date is kept
+        self.entries = sorted(entries, key=lambda entry: (entry.date is not None, entry.date))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    @property
+    def dates(self):
+        return [entry.date for entry in self.entries]
+
+    def value(self, entry, name):
+        'the figure called name in entry, None if its accounts type has no such figure'
+        if entry.details is None:
+            return None
+        attribute = field_name(entry.details.__class__, name)
+        if attribute is None:
+            return None
+        return getattr(entry.details, attribute, None)
+
+    def field(self, name):
+        'the figure called name of every entry, in date order'
+        return [self.value(entry, name) for entry in self.entries]
+
+    def fields(self, *names):
+        'dict of name -> field(name)'
+        return dict((name, self.field(name)) for name in names)
+
+
+def accounts_timeline(company, max_workers=None):
+    '''
+    The AccountsTimeline of company, the details of all its accounts are
+    requested concurrently
+    '''
+    accounts = list(company.accounts or [])
+    prefetch_related(accounts, 'details', max_workers=max_workers)
+    return AccountsTimeline(accounts)
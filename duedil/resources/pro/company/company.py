@@ -2,6 +2,7 @@
 from __future__ import unicode_literals
 
 from ... import (ProResource, RelatedResourceMixin)
+from .accounts.timeline import accounts_timeline
 
 
 class Company(RelatedResourceMixin, ProResource):
@@ -250,3 +251,10 @@ class Company(RelatedResourceMixin, ProResource):
         'subsidiaries': 'pro.company.Company',
         'keywords': 'pro.company.Keywords',
     }
+
+    def accounts_timeline(self, max_workers=None):
+        '''
+        All accounts of the company oldest first with their details, the
+        details are requested concurrently, see AccountsTimeline
+        '''
+        return accounts_timeline(self, max_workers=max_workers)
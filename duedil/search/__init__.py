@@ -3,6 +3,9 @@ from importlib import import_module
 from collections import Sequence
 from copy import deepcopy
 
+from ..concurrency import DEFAULT_MAX_WORKERS
+from .. import tracing
+
 
 class SearchResource(object):
     attribute_names = None
@@ -20,6 +23,7 @@ class SearchResource(object):
         assert(locale in ['uk', 'roi'])
         self.locale = locale
         self.client = client
+        self._hydrated = {}
         self.should_load = True if load else False
         if load:
             self.load()
@@ -58,19 +62,44 @@ class SearchResource(object):
             return super(SearchResource, self).__getattribute__(name)
         except AttributeError:
             if name in self.attribute_names:
-                self.load()
+                with tracing.trigger(self, name):
+                    self.load()
                 return super(SearchResource, self).__getattribute__(name)
             elif name in self.result_obj.keys():
-                # Assumes subclass has dict defined called result_obj, this maps attribute name to
-                # string of module path including class to be instaniated.
-                # The below dynamically imports the module and then gets the class, then returns and instance of the class
-                mod_path, klass_str = self.result_obj[name].rsplit('.', 1)
-                mod = import_module(mod_path)
-                klass = getattr(mod, klass_str)
-                return klass(self.id, client=self.client, locale=self.locale, load=self.should_load)
+                return self.hydrated(name)
             else:
                 raise
 
+    @classmethod
+    def result_class(cls, name):
+        '''
+        The resource class result_obj maps name to. The dotted path is only
+        imported the first time, after that the class is looked up per class.
+        '''
+        resolved = cls.__dict__.get('_resolved_result_obj')
+        if resolved is None:
+            resolved = {}
+            setattr(cls, '_resolved_result_obj', resolved)
+        try:
+            return resolved[name]
+        except KeyError:
+            mod_path, klass_str = cls.result_obj[name].rsplit('.', 1)
+            klass = resolved[name] = getattr(import_module(mod_path), klass_str)
+            return klass
+
+    def hydrated(self, name):
+        '''
+        The full resource behind this result, built once and kept on the
+        result so further access neither rebuilds nor refetches it
+        '''
+        try:
+            return self._hydrated[name]
+        except KeyError:
+            klass = self.result_class(name)
+            resource = self._hydrated[name] = klass.instance(self.client, self.id, locale=self.locale,
+                                                             load=self.should_load)
+            return resource
+
     def __eq__(self, other):
         if hasattr(other, 'id'):
             return self.id == other.id
@@ -81,28 +110,64 @@ class SearchResource(object):
 
 
 
+def hydrate(results, fields=None, max_workers=DEFAULT_MAX_WORKERS):
+    '''
+    Load the full resources behind many search results concurrently.
+
+    fields names the result_obj targets to hydrate, e.g. ['company'], by
+    default all of them. Returns the loaded resources in result order.
+    '''
+    resources = []
+    for result in results:
+        for name in (fields or sorted(result.result_obj.keys())):
+            if name in result.result_obj:
+                resources.append(result.hydrated(name))
+    pending = [resource for resource in resources if not resource.loaded]
+    if pending:
+        client = pending[0].client
+        payloads = client.get_many([resource.endpoint for resource in pending], max_workers=max_workers)
+        for resource, payload in zip(pending, payloads):
+            resource._set_result(payload)
+    return resources
+
+
 class SearchResouceList(Sequence):
+    '''
+    Search results backed by the raw rows of the pages duedil returned.
+
+    A result_klass object is only built when a result is indexed or
+    iterated over, and then kept; rows gives the raw dictionaries without
+    building any.
+    '''
 
     def __init__(self, results, result_klass, client):
-        self._result_list = []
+        self._rows = []
+        self._objects = []
         self.result_klass = result_klass
         self.client = client
         self.result_list = results
 
     def __len__(self):
-        return len(self.result_list)
+        return len(self._rows)
 
     def __getitem__(self, key):
-        return self.result_list[key]
+        if isinstance(key, slice):
+            return [self._materialize(i) for i in range(*key.indices(len(self._rows)))]
+        if key < 0:
+            key += len(self._rows)
+        if not 0 <= key < len(self._rows):
+            raise IndexError(key)
+        return self._materialize(key)
 
     def __iter__(self):
-        return iter(self.result_list)
+        for index in range(len(self._rows)):
+            yield self._materialize(index)
 
     def __contains__(self, result):
-        return result in self.result_list
+        return self._row_index(result) is not None
 
     def __eq__(self, other):
-        rlist = self.result_list == other.result_list
+        rlist = self._rows == other._rows
         client = self.client == other.client
         rclass = self.result_klass == other.result_klass
         return rlist and client and rclass
@@ -115,14 +180,32 @@ class SearchResouceList(Sequence):
     def __radd__(self, other):
         return self.__add__(other)
 
+    def _materialize(self, index):
+        obj = self._objects[index]
+        if obj is None:
+            obj = self._objects[index] = self.result_klass(self.client, **self._rows[index])
+        return obj
+
+    def _row_index(self, result):
+        # match on the id like SearchResource.__eq__ does, without building objects
+        result_id = getattr(result, 'id', result)
+        for index, row in enumerate(self._rows):
+            if row.get('id', row.get('company_number')) == result_id:
+                return index
+        return None
+
+    @property
+    def rows(self):
+        'the raw result dictionaries fetched so far, no result objects are built'
+        return self._rows
+
     @property
     def result_list(self):
-        return self._result_list
+        return [self._materialize(i) for i in range(len(self._rows))]
 
     @result_list.setter
     def result_list(self, value):
-        temp = [self.result_klass(self.client, **r) for r in value.get('response',{}).get('data', {})]
-        if not self._result_list:
-            self._result_list = temp
-        else:
-            self._result_list.extend(temp)
+        # this extends the results with the rows of another page
+        rows = value.get('response', {}).get('data', [])
+        self._rows.extend(rows)
+        self._objects.extend([None] * len(rows))
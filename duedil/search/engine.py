@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import threading
+import time
+
+import six
+
+from ..cache import dp_region
+
+try:  # pragma: no cover
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _as_float(value):
+    if isinstance(value, bool) or value is None:
+        return float('nan')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _as_term(value):
+    if value is None:
+        return None
+    return six.text_type(value).lower()
+
+
+class ResultIndex(object):
+    '''
+    The complete result set of one SearchQuery.
+
+    Columns are built once per field on first use: numeric fields as float
+    arrays (missing values are NaN and never match a range) and term fields,
+    to order by, as lower cased object arrays, so filtering is a handful of
+    array comparisons rather than a loop over the rows.
+    '''
+
+    def __init__(self, query, rows):
+        self.query = query
+        self.rows = list(rows)
+        self.created = time.time()
+        self._numeric = {}
+        self._terms = {}
+        self._fields = set()
+        for row in self.rows:
+            self._fields.update(row.keys())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def has_field(self, field):
+        return field in self._fields
+
+    def numeric_column(self, field):
+        try:
+            return self._numeric[field]
+        except KeyError:
+            column = np.fromiter((_as_float(r.get(field)) for r in self.rows),
+                                 dtype=np.float64, count=len(self.rows))
+            self._numeric[field] = column
+            return column
+
+    def term_column(self, field):
+        try:
+            return self._terms[field]
+        except KeyError:
+            column = np.empty(len(self.rows), dtype=object)
+            column[:] = [_as_term(r.get(field)) for r in self.rows]
+            self._terms[field] = column
+            return column
+
+    def covers(self, query):
+        '''
+        True when every result of query is in this result set and the extra
+        restrictions can be evaluated on the fetched rows: the same term
+        filters, narrower or extra ranges, any order
+        '''
+        broad = self.query
+        if query.endpoint != broad.endpoint:
+            return False
+        # how duedil matches terms, by word or prefix, cannot be told from the rows
+        if set(query.term_filters) != set(broad.term_filters):
+            return False
+        ranges = dict(query.range_filters)
+        for field, (low, high) in broad.range_filters:
+            if field not in ranges:
+                return False
+            narrow_low, narrow_high = ranges[field]
+            if narrow_low < low or narrow_high > high:
+                return False
+        for field, bounds in query.range_filters:
+            if (field, bounds) not in broad.range_filters and not self.has_field(field):
+                return False
+        if query.order_by and query.order_by != broad.order_by:
+            if not self.has_field(query.order_by[0]):
+                return False
+        return True
+
+    def select(self, query):
+        'positions of the rows matching query, in the order query asks for'
+        mask = np.ones(len(self.rows), dtype=bool)
+        for field, (low, high) in query.range_filters:
+            if (field, (low, high)) in self.query.range_filters:
+                continue
+            column = self.numeric_column(field)
+            mask &= (column >= low) & (column <= high)
+        positions = np.flatnonzero(mask)
+
+        if query.order_by and query.order_by != self.query.order_by:
+            field, direction = query.order_by
+            if self._is_numeric(field):
+                keys = self.numeric_column(field)[positions]
+                # NaN sorts last either way
+                if direction == 'desc':
+                    keys = -keys
+                order = np.argsort(keys, kind='mergesort')
+            else:
+                keys = self.term_column(field)[positions]
+                keys = np.array(['' if k is None else k for k in keys], dtype=object)
+                order = np.argsort(keys, kind='mergesort')
+                if direction == 'desc':
+                    order = order[::-1]
+            positions = positions[order]
+        return positions
+
+    def _is_numeric(self, field):
+        column = self.numeric_column(field)
+        return bool(len(column)) and not np.isnan(column).all()
+
+
+class LocalQueryEngine(object):
+    '''
+    Answers searches from fully fetched result sets of broader searches.
+
+    Register complete result sets with add(); page() then returns a
+    response shaped like duedil's for any query that one of them covers,
+    or None when the search has to go to duedil.
+
+    Result sets expire after expiration_time seconds, by default those of
+    the dogpile region once it is configured, so the engine serves nothing
+    the cache would have fetched again.
+
+    Only range filters and order_by narrow a result set: duedil may match
+    terms by word or prefix, so a search with other term filters than the
+    broader one goes to duedil.
+    '''
+
+    def __init__(self, max_results=32, expiration_time=None):
+        if np is None:
+            raise ImportError('numpy is required for the local query engine, pip install duedil[numpy]')
+        self.max_results = max_results
+        self.expiration_time = expiration_time
+        self._indexes = OrderedDict()
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, query, rows):
+        'register the complete result set of query'
+        index = ResultIndex(query, rows)
+        with self._lock:
+            self._indexes.pop(query, None)
+            self._indexes[query] = index
+            while len(self._indexes) > self.max_results:
+                self._indexes.popitem(last=False)
+            self._selections.clear()
+        return index
+
+    def _expired(self, index):
+        expiration_time = self.expiration_time
+        if expiration_time is None and dp_region.is_configured:
+            expiration_time = dp_region.expiration_time
+        return expiration_time is not None and expiration_time >= 0 \
+            and time.time() - index.created > expiration_time
+
+    def _evict(self):
+        'drop the expired result sets and the selections made from them'
+        with self._lock:
+            for query, index in list(self._indexes.items()):
+                if self._expired(index):
+                    del self._indexes[query]
+            for query, (index, _positions) in list(self._selections.items()):
+                if self._expired(index):
+                    del self._selections[query]
+
+    def find(self, query):
+        'the smallest registered result set covering query, if any'
+        self._evict()
+        with self._lock:
+            indexes = list(self._indexes.values())
+        candidates = [index for index in indexes if index.covers(query)]
+        if not candidates:
+            return None
+        return min(candidates, key=len)
+
+    def _select(self, query):
+        with self._lock:
+            selection = self._selections.get(query)
+        if selection is not None and not self._expired(selection[0]):
+            return selection
+        index = self.find(query)
+        if index is None:
+            return None
+        selection = index, index.select(query)
+        with self._lock:
+            self._selections[query] = selection
+            while len(self._selections) > self.max_results:
+                self._selections.popitem(last=False)
+        return selection
+
+    def answer(self, query):
+        'all rows matching query, None if it cannot be answered locally'
+        selection = self._select(query)
+        if selection is None:
+            return None
+        index, positions = selection
+        return [index.rows[i] for i in positions]
+
+    def page(self, query, offset=None, limit=None):
+        'one page of query in the shape of a duedil search response'
+        selection = self._select(query)
+        if selection is None:
+            return None
+        index, positions = selection
+        start = offset or 0
+        stop = start + limit if limit else None
+        return {'response': {
+            'data': [index.rows[i] for i in positions[start:stop]],
+            'pagination': {'total': int(len(positions))},
+        }}
@@ -1,8 +1,10 @@
 from .company import CompanySearchResult
 from .director import DirectorSearchResult
 from .. import SearchResouceList
+from ...concurrency import run_concurrently
 
 from collections import Sequence
+from functools import total_ordering
 try:
     from urllib import urlencode
     import urlparse
@@ -10,15 +12,24 @@ except ImportError:
     from urllib.parse import urlencode
     from urllib import parse as urlparse
 
+# Duedil will not return more than this many results per page
+MAX_PAGE_SIZE = 100
+
+
 class ProSearchResourceList(SearchResouceList):
 
-    def __init__(self, results, result_klass, client):
+    def __init__(self, results, result_klass, client, query=None):
         super(ProSearchResourceList, self).__init__(results, result_klass, client)
+        # with a SearchQuery every page is requested with canonical parameters,
+        # otherwise we follow the next_url duedil hands back
+        self.query = query
+        self._page_size = (query and query.limit) or len(self._rows) or None
         self._next_url = None
         # look at the property below
         self.next_url = results
         page = results.get('response', {}).get('pagination', {})
-        self._length = page.get('total', len(self.result_list))
+        self._length = page.get('total', len(self._rows))
+        self._register_complete()
 
     def __str__(self):
         return "Pro Search Result List - total: {0}".format(len(self))
@@ -36,18 +47,48 @@ class ProSearchResourceList(SearchResouceList):
             self._next_url = ''
 
 
-    def next(self):
+    def next(self, limit=None):
         # should get the next set of results
         # update the internal list
         if not self.fetched_all_results():
-            next_set = self.client.get(*self.parse_next_url())
+            if self.query is not None:
+                offset = (self.query.offset or 0) + len(self._rows)
+                next_set = self.client._search_page(self.query, offset=offset,
+                                                    limit=limit or self._page_size)
+            else:
+                if limit:
+                    self._update_next_url(limit=limit)
+                next_set = self.client.get(*self.parse_next_url())
+            before = len(self._rows)
             # check the property - this does a .extend()!
             self.result_list = next_set
             # update the next_url
             self.next_url = next_set
+            if len(self._rows) == before:
+                # duedil ran out of results before the advertised total
+                self._length = before
+            self._register_complete()
         else:
             raise StopIteration
 
+    def fetch_all(self):
+        '''
+        page through every remaining result, the largest pages duedil allows
+        are requested
+        '''
+        while not self.fetched_all_results():
+            self.next(limit=MAX_PAGE_SIZE)
+        return self
+
+    def _register_complete(self):
+        # a complete result set from the first result on can answer narrower searches
+        engine = getattr(self.client, 'query_engine', None)
+        if (engine is None or self.query is None or self.query.offset
+                or not self.fetched_all_results()):
+            return
+        if engine.find(self.query) is None:
+            engine.add(self.query, self.rows)
+
     def __len__(self):
         return self._length
 
@@ -58,13 +99,12 @@ class ProSearchResourceList(SearchResouceList):
                 key = self._length + key
             if key >= self._length:
                 raise IndexError()
-            try:
-                return self.result_list[key]
-            except IndexError:
-                # key is not in current cut of data
-                # therefore loop with .next until result?
-                self._update_next_url(1, key)
-                return self.client.get(*self.parse_next_url())
+            # key is not in current cut of data, page forward until it is
+            while key >= len(self._rows) and not self.fetched_all_results():
+                self.next()
+            if key >= len(self._rows):
+                raise IndexError()
+            return self._materialize(key)
         elif type(key) is slice:
             # this needs to be done to limit for loop iteration...
             raise NotImplementedError("Results don't support slicing at this time")
@@ -72,28 +112,23 @@ class ProSearchResourceList(SearchResouceList):
             raise TypeError()
 
     def __iter__(self):
-        for result in self.result_list:
-            yield result
-            # get the last one and extend the list
-            # if self.result_list[-1] is result:
-            #     self.next()
-
+        for index in range(len(self._rows)):
+            yield self._materialize(index)
 
     def __contains__(self, result):
-        while not self.fetched_all_results():
-            if result in self.result_list:
-                return True
-            # this could be hugely expensive, so get as many as possible. Duedil only allow upto a limit of 100
-            self._update_next_url(limit=100)
-            self.next()
-        return False
+        while self._row_index(result) is None:
+            if self.fetched_all_results():
+                return False
+            # this could be hugely expensive, so get as many as possible
+            self.next(limit=MAX_PAGE_SIZE)
+        return True
 
     def fetched_all_results(self):
-        return len(self.result_list) >= len(self)
+        return len(self._rows) >= len(self)
 
     def _update_next_url(self, limit=None, offset=None):
         scheme, netloc, path, query_string, frag = urlparse.urlsplit(self._next_url)
-        query_params = urlparse.parsed_qs(query_string)
+        query_params = urlparse.parse_qs(query_string)
         if limit:
             query_params['limit'] = [limit]
         if offset:
@@ -107,3 +142,108 @@ class ProSearchResourceList(SearchResouceList):
             path = path[:-len('.json')] # grab the last part of the path
         query_params = dict(urlparse.parse_qsl(parsed_url.query))
         return path, query_params
+
+
+@total_ordering
+class _Descending(object):
+    'sort key wrapper reversing the natural order of value'
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class MergedSearchResourceList(Sequence):
+    '''
+    Several pro search result lists read as one lazy stream.
+
+    Results are interleaved by the order_by field when the searches are
+    ordered, otherwise by their rank in each search. Further pages are
+    only requested as the stream reaches them, the searches that need one
+    are paged concurrently, and an entity that turns up again on a later
+    page is only returned once.
+    '''
+
+    def __init__(self, sources, order_by=None):
+        self.sources = list(sources)
+        self.order_by = order_by
+        self._positions = [0] * len(self.sources)
+        self._merged = []
+        self._seen = set()
+
+    def __str__(self):
+        return "Pro Merged Search Result List - total: {0}".format(len(self))
+
+    @property
+    def totals(self):
+        return dict((source.query.endpoint if source.query else source.result_klass.__name__, len(source))
+                    for source in self.sources)
+
+    def __len__(self):
+        # the totals duedil reports, duplicates are only known once fetched
+        return sum(len(source) for source in self.sources)
+
+    def _fill(self):
+        # page every exhausted source that has more results, all at once
+        starved = [source for source, position in zip(self.sources, self._positions)
+                   if position >= len(source.rows) and not source.fetched_all_results()]
+        run_concurrently([source.next for source in starved])
+
+    def _sort_key(self, index):
+        source, position = self.sources[index], self._positions[index]
+        if self.order_by:
+            field, direction = self.order_by
+            value = source.rows[position].get(field)
+            if value is None:
+                return (1, 0, position, index)
+            if direction == 'desc':
+                value = _Descending(value)
+            return (0, value, position, index)
+        return (position, index)
+
+    def _advance(self):
+        while True:
+            self._fill()
+            heads = [i for i, source in enumerate(self.sources)
+                     if self._positions[i] < len(source.rows)]
+            if not heads:
+                return False
+            index = min(heads, key=self._sort_key)
+            source = self.sources[index]
+            result = source._materialize(self._positions[index])
+            self._positions[index] += 1
+            identity = (source.result_klass, result.id)
+            if identity in self._seen:
+                continue
+            self._seen.add(identity)
+            self._merged.append(result)
+            return True
+
+    def __iter__(self):
+        position = 0
+        while position < len(self._merged) or self._advance():
+            yield self._merged[position]
+            position += 1
+
+    def __getitem__(self, key):
+        if type(key) is not int:
+            raise TypeError()
+        if key < 0:
+            # counted from the end of the deduplicated stream, not the totals
+            while self._advance():
+                pass
+            key = len(self._merged) + key
+            if key < 0:
+                raise IndexError()
+        while key >= len(self._merged):
+            if not self._advance():
+                raise IndexError()
+        return self._merged[key]
+
+    def __contains__(self, result):
+        return any(result == r for r in self)
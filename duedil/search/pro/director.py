@@ -13,8 +13,7 @@ class DirectorSearchResult(SearchResource):
     ]
 
     result_obj = {
-        # this import path is incorrect.
-        'director': 'duedil.resources.pro.director.Director'
+        'director': 'duedil.resources.pro.company.Director'
     }
     term_filters = [
         "name",
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+import json
+
+import six
+
+DEFAULT_DIRECTION = 'asc'
+
+
+def _normalize_number(value):
+    # 1e9 and 1000000000 are the same bound, send (and cache) them the same way
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class SearchQuery(object):
+    '''
+    Canonical, hashable form of a pro search.
+
+    Filters are sorted, range bounds are ordered low to high with integral
+    floats turned into ints, and an order_by without a direction gets the
+    default one. Two searches written with different argument order or
+    equivalent values produce equal queries, the same request parameters
+    and therefore the same cache key for each page.
+    '''
+
+    def __init__(self, endpoint, term_filters, range_filters,
+                 order_by=None, limit=None, offset=None, **kwargs):
+        self.endpoint = endpoint
+        self.limit = limit
+        self.offset = offset
+        terms = []
+        ranges = []
+        for arg, value in kwargs.items():
+            if arg in term_filters:
+                # this must be  a string
+                if not isinstance(value, six.string_types):
+                    raise TypeError('{0!s} must be string type'.format(arg))
+                terms.append((arg, six.text_type(value)))
+            elif arg in range_filters:
+                # array of two numbers
+                if not isinstance(value, (list, tuple)):
+                    raise TypeError('{0!s} must be an array'.format(arg))
+                if len(value) != 2:
+                    raise ValueError('Argument {0!s} can only be an array of length 2'.format(arg))
+                for v in value:
+                    if not isinstance(v, six.integer_types + (float,)):
+                        raise TypeError('Value of {0!s} must be numeric'.format(arg))
+                low, high = sorted(_normalize_number(v) for v in value)
+                ranges.append((arg, (low, high)))
+            else:
+                raise TypeError('{0!s} does not match {1!s}'.format(arg, ', '.join(term_filters + range_filters)))
+        self.term_filters = tuple(sorted(terms))
+        self.range_filters = tuple(sorted(ranges))
+
+        if order_by:
+            if not isinstance(order_by, dict):
+                raise TypeError('order_by must be dictionary')
+            if 'field' not in order_by:
+                raise ValueError("'field' must be a key in the order_by dictionary")
+            if order_by['field'] not in term_filters + range_filters:
+                raise TypeError("order_by['field'] must be one of {0!s}".format((', '.join(term_filters + range_filters))))
+            direction = order_by.get('direction') or DEFAULT_DIRECTION
+            if direction not in ['asc', 'desc']:
+                raise ValueError('The direction must either be "asc" or "desc"')
+            self.order_by = (order_by['field'], direction)
+        else:
+            self.order_by = None
+
+        if limit and not isinstance(limit, six.integer_types):
+            raise TypeError('limit must be an integer')
+        if offset and not isinstance(offset, six.integer_types):
+            raise TypeError('offset must be an integer')
+
+    @property
+    def key(self):
+        'identity of the query, paging is deliberately not part of it'
+        return (self.endpoint, self.term_filters, self.range_filters, self.order_by)
+
+    @property
+    def filters(self):
+        filters = dict(self.term_filters)
+        filters.update((k, list(v)) for k, v in self.range_filters)
+        return filters
+
+    def params(self, offset=None, limit=None):
+        '''
+        request parameters for one page of the query, the values are
+        serialised with sorted keys so they double up as a stable cache key
+        '''
+        offset = self.offset if offset is None else offset
+        limit = self.limit if limit is None else limit
+        data = {'filters': json.dumps(self.filters, sort_keys=True)}
+        if self.order_by:
+            field, direction = self.order_by
+            data['orderBy'] = json.dumps({'field': field, 'direction': direction}, sort_keys=True)
+        if limit:
+            data['limit'] = limit
+        if offset:
+            data['offset'] = offset
+        return data
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        if not isinstance(other, SearchQuery):
+            return NotImplemented
+        return self.key == other.key
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        return 'SearchQuery({0!r}, filters={1!r}, order_by={2!r})'.format(
+            self.endpoint, self.filters, self.order_by)
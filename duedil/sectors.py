@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+import base64
+from bisect import bisect_left, bisect_right
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import threading
+import zlib
+
+import six
+
+from .frame import _payload
+from .resources import Resource
+
+METRICS = ('accounts_turnover', 'accounts_pre_tax_profit', 'accounts_no_of_employees')
+
+# sector field -> the names it has in company payloads and search results
+SECTOR_FIELDS = {
+    'sic_code': ('sic_code',),
+    'sic2007code': ('sic2007code', 'sic_2007_code'),
+}
+
+# search result field -> the metric it holds
+SEARCH_METRICS = {
+    'turnover': 'accounts_turnover',
+    'pre_tax_profit': 'accounts_pre_tax_profit',
+    'employee_count': 'accounts_no_of_employees',
+}
+
+COMPANY_ENDPOINT = re.compile(r'^(uk|roi)/companies/[^/]+$')
+SEARCH_ENDPOINT = re.compile(r'^companies$')
+
+
+class KLLSketch(object):
+    '''
+    KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Keeps O(k) of the values it is given in compactors of growing weight,
+    ranks and quantiles are within about 1.7 / k of the exact ones. Sketches
+    merge, so sketches built apart can be combined. The sorted view used
+    by rank() and quantile() is rebuilt after updates, lookups themselves
+    are a bisection.
+    '''
+
+    c = 2.0 / 3.0
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+        self._view = None
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _size(self):
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                # keep the odd one out at this level, promote every other value
+                keep = [compactor.pop()] if len(compactor) % 2 else []
+                offset = self._random.randint(0, 1)
+                self.compactors[level + 1].extend(compactor[offset::2])
+                self.compactors[level] = keep
+                return
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        self._view = None
+        if self._size() >= self._max_size:
+            self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self._view = None
+        while self._size() >= self._max_size:
+            self._compress()
+        return self
+
+    def _sorted(self):
+        if self._view is None:
+            weighted = sorted((value, 2 ** level)
+                              for level, compactor in enumerate(self.compactors)
+                              for value in compactor)
+            values = [value for value, _weight in weighted]
+            cumulative = []
+            total = 0
+            for _value, weight in weighted:
+                total += weight
+                cumulative.append(total)
+            self._view = values, cumulative
+        return self._view
+
+    def rank(self, value):
+        'fraction of the values seen that are <= value'
+        values, cumulative = self._sorted()
+        if not values:
+            return None
+        index = bisect_right(values, value)
+        return cumulative[index - 1] / float(cumulative[-1]) if index else 0.0
+
+    def quantile(self, q):
+        'the value at rank q, 0 <= q <= 1'
+        values, cumulative = self._sorted()
+        if not values:
+            return None
+        index = bisect_left(cumulative, q * cumulative[-1])
+        return values[min(index, len(values) - 1)]
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, state, seed=None):
+        sketch = cls(state['k'], seed=seed)
+        sketch.count = state['count']
+        sketch.compactors = [list(compactor) for compactor in state['compactors']]
+        sketch._max_size = sum(sketch._capacity(level) for level in range(len(sketch.compactors)))
+        return sketch
+
+
+class BloomFilter(object):
+    '''
+    Set membership in a fixed size bit array: never a false negative, a
+    false positive about (1 - e^(-hashes * n / bits)) ^ hashes of the time
+    after n additions, around 1% for a million of them with the defaults
+    '''
+
+    def __init__(self, bits=2 ** 23, hashes=7):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        first, second = struct.unpack('>QQ', hashlib.md5(key.encode('utf-8')).digest())
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.array[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        'add key, False when it was (probably) there already'
+        added = False
+        for p in self._positions(key):
+            if not self.array[p >> 3] & (1 << (p & 7)):
+                self.array[p >> 3] |= 1 << (p & 7)
+                added = True
+        return added
+
+    def to_dict(self):
+        return {'bits': self.bits, 'hashes': self.hashes,
+                'array': base64.b64encode(zlib.compress(bytes(self.array))).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, state):
+        bloom = cls(state['bits'], state['hashes'])
+        bloom.array = bytearray(zlib.decompress(base64.b64decode(state['array'])))
+        return bloom
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+class SectorIndex(object):
+    '''
+    Percentiles of company metrics among the companies of the same sector.
+
+    Holds a KLLSketch per (sector field, code, metric), fed with company
+    payloads, search result rows or Company resources. A company counts
+    once per metric, the first value seen for it is kept; the companies
+    seen are remembered in a BloomFilter of seen_bits bits, so the index
+    stays the same size however many are added, at the price of about 1%
+    of the companies being skipped once a million were added. Give it to a
+    ProClient as sector_index and every company it fetches, alone or in
+    company search results, is added on the way. save() and load()
+    persist the index, add more companies to a loaded index to keep it up
+    to date.
+    '''
+
+    def __init__(self, metrics=METRICS, sector_fields=tuple(sorted(SECTOR_FIELDS)), k=200,
+                 seen_bits=2 ** 23):
+        self.metrics = tuple(metrics)
+        self.sector_fields = tuple(sector_fields)
+        self.k = k
+        self.sketches = {}
+        self._seen = BloomFilter(seen_bits)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sector(values, field):
+        for name in SECTOR_FIELDS.get(field, (field,)):
+            if values.get(name) not in (None, ''):
+                return six.text_type(values[name])
+        return None
+
+    def add(self, company):
+        'add a company payload or Company resource, returns the number of values added'
+        values = company.__dict__ if isinstance(company, Resource) else _payload(company)
+        company_id = company.id if isinstance(company, Resource) else values.get('id')
+        added = 0
+        with self._lock:
+            for metric in self.metrics:
+                value = _number(values.get(metric))
+                if value is None:
+                    continue
+                if company_id is not None and not self._seen.add('{0}:{1}'.format(company_id, metric)):
+                    continue
+                for field in self.sector_fields:
+                    code = self._sector(values, field)
+                    if code is None:
+                        continue
+                    key = (field, code, metric)
+                    if key not in self.sketches:
+                        self.sketches[key] = KLLSketch(self.k)
+                    self.sketches[key].update(value)
+                    added += 1
+        return added
+
+    def extend(self, companies):
+        return sum(self.add(company) for company in companies)
+
+    def observe(self, endpoint, result):
+        'add the companies of a client result, for ProClient.get'
+        if not result:
+            return
+        response = result.get('response') or {}
+        if COMPANY_ENDPOINT.match(endpoint):
+            self.add(response)
+        elif SEARCH_ENDPOINT.match(endpoint):
+            for row in response.get('data') or []:
+                row = dict(row)
+                for field, metric in SEARCH_METRICS.items():
+                    if metric not in row and field in row:
+                        row[metric] = row[field]
+                self.add(row)
+
+    def sketch(self, metric, code, field='sic_code'):
+        return self.sketches.get((field, six.text_type(code), metric))
+
+    def percentile(self, metric, value, code, field='sic_code'):
+        'percentage of the sector whose metric is <= value, None for an unknown sector'
+        sketch = self.sketch(metric, code, field)
+        return None if sketch is None else sketch.rank(value) * 100
+
+    def quantile(self, metric, q, code, field='sic_code'):
+        'the metric at quantile q (0 - 1) of the sector'
+        sketch = self.sketch(metric, code, field)
+        return None if sketch is None else sketch.quantile(q)
+
+    def compare(self, company, field='sic_code'):
+        'metric -> percentile of a company payload or Company resource within its sector'
+        values = company.__dict__ if isinstance(company, Resource) else _payload(company)
+        code = self._sector(values, field)
+        result = {}
+        for metric in self.metrics:
+            value = _number(values.get(metric))
+            if value is not None and code is not None:
+                result[metric] = self.percentile(metric, value, code, field)
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'metrics': list(self.metrics),
+                'sector_fields': list(self.sector_fields),
+                'k': self.k,
+                'sketches': [[field, code, metric, sketch.to_dict()]
+                             for (field, code, metric), sketch in sorted(self.sketches.items())],
+                'seen': self._seen.to_dict(),
+            }
+
+    @classmethod
+    def from_dict(cls, state):
+        index = cls(state['metrics'], state['sector_fields'], state['k'])
+        for field, code, metric, sketch in state['sketches']:
+            index.sketches[(field, code, metric)] = KLLSketch.from_dict(sketch)
+        index._seen = BloomFilter.from_dict(state['seen'])
+        return index
+
+    def save(self, path):
+        'write the index as gzipped json, atomically'
+        partial = path + '.tmp'
+        with gzip.open(partial, 'wb') as index_file:
+            index_file.write(json.dumps(self.to_dict()).encode('utf-8'))
+        getattr(os, 'replace', os.rename)(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rb') as index_file:
+            return cls.from_dict(json.loads(index_file.read().decode('utf-8')))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import threading
+
+import six
+
+
+class Session(object):
+    '''
+    Identity map for resources, keyed by (class, locale, id).
+
+    Give a client a session and every resource built through
+    Resource.instance - related resources, related collections and
+    hydrated search results - is built once and shared from then on, so
+    lazy loads and related lookups are not repeated while traversing.
+    The least recently used resources are dropped beyond maxsize.
+    '''
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._resources = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(klass, id, locale='uk'):
+        return (klass, locale, six.text_type(id))
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __contains__(self, key):
+        return key in self._resources
+
+    def get(self, klass, id, locale='uk'):
+        'the resource if it is in the session, None otherwise'
+        key = self.key(klass, id, locale)
+        with self._lock:
+            resource = self._resources.pop(key, None)
+            if resource is not None:
+                # most recently used goes last
+                self._resources[key] = resource
+            return resource
+
+    def add(self, resource):
+        'put a resource built elsewhere into the session, returns the one the session holds'
+        key = self.key(resource.__class__, resource.id, resource.locale)
+        with self._lock:
+            existing = self._resources.pop(key, None)
+            resource = existing if existing is not None else resource
+            self._resources[key] = resource
+            while len(self._resources) > self.maxsize:
+                self._resources.popitem(last=False)
+        return resource
+
+    def resource(self, klass, id, client, locale='uk', load=False, **kwargs):
+        '''
+        The resource for (klass, locale, id), built from kwargs the first
+        time; later calls update the attributes they are given
+        '''
+        resource = self.get(klass, id, locale)
+        metrics = getattr(client, 'metrics', None)
+        if metrics is not None:
+            metrics.cache('session', resource is not None)
+        if resource is None:
+            self.misses += 1
+            resource = self.add(klass(id=id, client=client, locale=locale, **kwargs))
+        else:
+            self.hits += 1
+            if kwargs:
+                resource._set_attributes(**kwargs)
+        if load and not resource.loaded:
+            resource.load()
+        return resource
+
+    def discard(self, resource):
+        with self._lock:
+            self._resources.pop(self.key(resource.__class__, resource.id, resource.locale), None)
+
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
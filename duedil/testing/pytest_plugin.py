@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+pytest plugin, registered through the pytest11 entry point.
+
+The n_plus_one fixture fails the test on the first N+1 lazy load pattern,
+the --duedil-n-plus-one option applies it to every test. Without either
+the tests run untraced.
+'''
+from __future__ import unicode_literals
+
+import pytest
+
+from ..nplusone import NPlusOneDetector
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('duedil')
+    group.addoption('--duedil-n-plus-one', action='store_true', default=False,
+                    help='fail tests that load duedil resources one by one in a loop')
+    group.addoption('--duedil-n-plus-one-threshold', type=int, default=5,
+                    help='repeated lazy loads reported as N+1 (default 5)')
+
+
+@pytest.fixture
+def n_plus_one(request):
+    'an NPlusOneDetector in raise mode around the test'
+    detector = NPlusOneDetector(threshold=request.config.getoption('duedil_n_plus_one_threshold'),
+                                mode='raise')
+    with detector:
+        yield detector
+
+
+@pytest.fixture(autouse=True)
+def _duedil_n_plus_one(request):
+    if not request.config.getoption('duedil_n_plus_one') or 'n_plus_one' in request.fixturenames:
+        yield None
+        return
+    detector = NPlusOneDetector(threshold=request.config.getoption('duedil_n_plus_one_threshold'),
+                                mode='raise')
+    with detector:
+        yield detector
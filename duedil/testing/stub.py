@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+A local stand-in for the duedil pro api, for benchmarks and tests.
+
+StubServer serves the payloads of a dataset over HTTP on localhost, with
+optional latency and 403 QPS rejections shaped like duedil's, so the
+client, its retries, caches and concurrency run as they do against
+duedil itself. StubTransport answers from a dataset in process instead,
+for profiling the client without the network stack, and StubH2Server
+serves it over cleartext HTTP/2 (pip install duedil[http2]).
+'''
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+
+from requests.exceptions import ReadTimeout
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs, urlparse
+
+from ..transport import Transport, build_response
+
+try:  # pragma: no cover
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:  # pragma: no cover
+    h2 = None
+
+STATUSES = ('Active', 'Active', 'Active', 'Dissolved', 'In Liquidation')
+COMPANY_TYPES = ('Private limited with share capital', 'Public limited', 'Limited liability partnership')
+SIC_CODES = (6201, 6202, 4711, 5610, 7022, 4120, 6810, 8299)
+ACCOUNT_TYPES = ('statutory', 'gaap', 'ifrs')
+# search filter -> company payload field
+SEARCH_FIELDS = {
+    'turnover': 'accounts_turnover',
+    'employee_count': 'accounts_no_of_employees',
+}
+
+
+def _hash(*parts):
+    return int(hashlib.md5(':'.join(six.text_type(p) for p in parts).encode('utf-8')).hexdigest()[:12], 16)
+
+
+def page(data, params, total=None):
+    'the offset/limit page of data as a duedil list response'
+    offset = int(params.get('offset', 0) or 0)
+    limit = int(params.get('limit', 10) or 10)
+    total = len(data) if total is None else total
+    return {'response': {'data': data[offset:offset + limit],
+                         'pagination': {'offset': offset, 'limit': limit, 'total': total}}}
+
+
+class StubDataset(object):
+    '''
+    Deterministic payloads made up from the ids asked for: companies 1 to
+    size exist, each with a few directors, accounts and subsidiaries, and
+    the same id always gives the same payload.
+    '''
+
+    base_url = 'http://duedil.io/v3'
+
+    def __init__(self, size=1000, directors=3, accounts=3, subsidiaries=2):
+        self.size = size
+        self.directors = directors
+        self.accounts = accounts
+        self.subsidiaries = subsidiaries
+        self._companies = None
+
+    def _exists(self, company_id):
+        return company_id.isdigit() and 1 <= int(company_id) <= self.size
+
+    def company(self, company_id, locale='uk'):
+        h = _hash('company', company_id)
+        turnover = h % 50000000
+        return {
+            'id': company_id,
+            'name': 'Company {0} Limited'.format(company_id),
+            'locale': locale,
+            'status': STATUSES[h % len(STATUSES)],
+            'company_type': COMPANY_TYPES[h % len(COMPANY_TYPES)],
+            'sic_code': SIC_CODES[h % len(SIC_CODES)],
+            'incorporation_date': '{0}-{1:02d}-{2:02d}'.format(1980 + h % 35, 1 + h % 12, 1 + h % 28),
+            'accounts_turnover': turnover,
+            'accounts_pre_tax_profit': turnover // 10 - (h % 1000000),
+            'accounts_no_of_employees': 1 + h % 5000,
+            'company_url': '{0}/{1}/companies/{2}'.format(self.base_url, locale, company_id),
+        }
+
+    def director(self, director_id):
+        h = _hash('director', director_id)
+        return {'id': director_id, 'forename': 'Director', 'surname': director_id,
+                'date_of_birth': '{0}-{1:02d}-01'.format(1940 + h % 50, 1 + h % 12)}
+
+    def account_details(self, company_id, account_id, account_type, year):
+        h = _hash('accounts', company_id, account_id)
+        turnover = h % 50000000
+        figures = {
+            'id': account_id, 'company': company_id, 'type': account_type,
+            'date': '{0}-12-31'.format(year), 'currency': 'GBP', 'months': 12,
+            'turnover': turnover, 'pre_tax_profit': turnover // 10 - h % 1000000,
+            'profit_after_tax': turnover // 12 - h % 1000000, 'cash': h % 3000000,
+        }
+        employees = 1 + h % 5000
+        if account_type == 'statutory':
+            figures.update(no_of_employees=employees, liabilities_current=h % 2000000 + 1,
+                           assets_total_current=h % 4000000, shareholder_funds=h % 9000000)
+        else:
+            figures.update(employee_numbers=employees, liabilities_total_current=h % 2000000 + 1,
+                           assets_total_current=h % 4000000)
+        return figures
+
+    def _account_ids(self, company_id):
+        return ['{0}-{1}'.format(company_id, i) for i in range(self.accounts)]
+
+    def _director_ids(self, company_id):
+        # directors are shared between neighbouring companies
+        first = int(company_id) // 2
+        return ['d{0}'.format(first + i) for i in range(self.directors)]
+
+    def _subsidiary_ids(self, company_id):
+        first = int(company_id) * self.subsidiaries
+        return [six.text_type(first + i) for i in range(self.subsidiaries) if first + i <= self.size]
+
+    def get(self, path, params):
+        'the payload for an api path such as uk/companies/1/directors, None for a 404'
+        parts = path.strip('/').split('/')
+        if parts == ['companies']:
+            return self.search(params)
+        if len(parts) < 3 or parts[0] not in ('uk', 'roi'):
+            return None
+        locale, collection, item = parts[:3]
+        rest = parts[3:]
+        if collection == 'directors':
+            if not rest:
+                return {'response': self.director(item)}
+            if rest == ['companies']:
+                number = int(item[1:]) if item[1:].isdigit() else 0
+                # the companies whose _director_ids include this director
+                ids = [six.text_type(n) for n in range(2 * (number - self.directors + 1), 2 * number + 2)
+                       if self._exists(six.text_type(n))]
+                return page([self.company(i, locale) for i in ids], params)
+            return None
+        if collection != 'companies' or not self._exists(item):
+            return None
+        if not rest:
+            return {'response': self.company(item, locale)}
+        related = rest[0]
+        if related == 'directors':
+            return page([self.director(i) for i in self._director_ids(item)], params)
+        if related == 'subsidiaries':
+            return page([self.company(i, locale) for i in self._subsidiary_ids(item)], params)
+        if related == 'parent':
+            parent = int(item) // self.subsidiaries
+            if parent < 1 or parent == int(item):
+                return None
+            return {'response': self.company(six.text_type(parent), locale)}
+        if related == 'accounts':
+            accounts = []
+            for i, account_id in enumerate(self._account_ids(item)):
+                accounts.append({'id': account_id, 'type': ACCOUNT_TYPES[i % len(ACCOUNT_TYPES)],
+                                 'date': '{0}-12-31'.format(2015 - i),
+                                 'uri': '{0}/{1}/companies/{2}/accounts/{3}'.format(
+                                     self.base_url, locale, item, account_id)})
+            if len(rest) == 1:
+                return page(accounts, params)
+            for i, account in enumerate(accounts):
+                if account['id'] == rest[1]:
+                    return {'response': self.account_details(item, account['id'], account['type'], 2015 - i)}
+            return None
+        return None
+
+    def search(self, params):
+        'companies search, terms and ranges filter on the fields of the company payloads'
+        if self._companies is None:
+            self._companies = [self.company(six.text_type(i)) for i in range(1, self.size + 1)]
+        companies = self._companies
+        filters = json.loads(params.get('filters') or '{}')
+        for name, value in filters.items():
+            name = SEARCH_FIELDS.get(name, name)
+            if isinstance(value, list) and len(value) == 2 and all(
+                    isinstance(v, (int, float)) for v in value):
+                companies = [c for c in companies if value[0] <= c.get(name, 0) <= value[1]]
+            elif isinstance(value, list):
+                companies = [c for c in companies if c.get(name) in value]
+            else:
+                companies = [c for c in companies if c.get(name) == value]
+        return page(companies, params)
+
+
+def _path(path, prefix):
+    'the api path of a url path: /v3/uk/companies/1.json is uk/companies/1'
+    path = re.sub(r'\.json$', '', path)
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+class RateLimiter(object):
+    'at most qps requests in any second, per second windows'
+
+    def __init__(self, qps):
+        self.qps = qps
+        self._window = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        now = int(time.time())
+        with self._lock:
+            if now != self._window:
+                self._window, self._count = now, 0
+            self._count += 1
+            return self._count <= self.qps
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, on kept alive connections
+    # Nagle's algorithm would hold the body back for the delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, reason=None):
+        data = body.encode('utf-8')
+        self.send_response(status, reason)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.requests += 1
+        url = urlparse(self.path)
+        params = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+        if stub.latency or stub.jitter:
+            time.sleep(stub.latency + stub.random.random() * stub.jitter)
+        if stub.throttled():
+            stub.rejected += 1
+            return self._send(403, '{"error": "Developer Over Qps"}', 'Forbidden - Over rate limit')
+        payload = stub.dataset.get(_path(url.path, stub.prefix), params)
+        if payload is None:
+            return self._send(404, '{"error": "Not Found"}')
+        return self._send(200, json.dumps(payload))
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # the default backlog of 5 drops connections of concurrent clients
+    request_queue_size = 128
+
+
+class StubServer(object):
+    '''
+    HTTP server for dataset on localhost, in a background thread.
+
+    latency (+ up to jitter) seconds are slept before every response;
+    with qps_limit more than that many requests in a second, and with
+    reject_rate that fraction of all requests, are rejected with duedil's
+    403 over QPS response. Use as a context manager, client() gives a
+    client pointed at the server.
+    '''
+
+    prefix = '/v3/'
+
+    def __init__(self, dataset=None, latency=0.0, jitter=0.0, qps_limit=None, reject_rate=0.0,
+                 host='127.0.0.1', port=0, seed=None):
+        self.dataset = dataset if dataset is not None else StubDataset()
+        self.latency = latency
+        self.jitter = jitter
+        self.reject_rate = reject_rate
+        self.limiter = RateLimiter(qps_limit) if qps_limit else None
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.rejected = 0
+        self._server = _Server((host, port), _Handler)
+        self._server.stub = self
+        self._thread = None
+        if hasattr(self.dataset, 'base_url'):
+            # links in the payloads point back here
+            self.dataset.base_url = self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{0}:{1}{2}'.format(host, port, self.prefix.rstrip('/'))
+
+    def throttled(self):
+        if self.reject_rate and self.random.random() < self.reject_rate:
+            return True
+        return self.limiter is not None and not self.limiter.allow()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='duedil-stub')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, client_class=None, api_key='stub', **kwargs):
+        'a client of client_class, ProClient by default, sending its requests here'
+        if client_class is None:
+            from ..api import ProClient as client_class
+        client = client_class(api_key, **kwargs)
+        client.base_url = self.url
+        return client
+
+
+class StubTransport(Transport):
+    '''
+    A transport answering from dataset in process, no sockets or threads
+    involved, after sleeping latency seconds; ReadTimeout when the latency
+    is over the timeout
+    '''
+
+    prefix = StubServer.prefix
+
+    def __init__(self, dataset=None, latency=0.0):
+        super(StubTransport, self).__init__()
+        self.dataset = dataset if dataset is not None else StubDataset()
+        self.latency = latency
+
+    def _send(self, url, params, timeout):
+        if self.latency:
+            read = timeout[-1] if isinstance(timeout, tuple) else timeout
+            if read is not None and read < self.latency:
+                time.sleep(read)
+                raise ReadTimeout('no response from the stub within {0}s'.format(read))
+            time.sleep(self.latency)
+        url = urlparse(url)
+        query = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+        query.update(params or {})
+        payload = self.dataset.get(_path(url.path, self.prefix), query)
+        if payload is None:
+            return build_response(url.geturl(), 404, '{"error": "Not Found"}', 'Not Found')
+        return build_response(url.geturl(), 200, json.dumps(payload), 'OK',
+                              {'Content-Type': 'application/json'})
+
+
+class StubH2Server(object):
+    '''
+    Serves dataset over HTTP/2 with prior knowledge on localhost, every
+    stream answered on its own thread after latency seconds, so the
+    requests multiplexed on a connection are in flight together. connections
+    counts the connections accepted, requests the streams served and
+    max_in_flight the most streams answered at the same time.
+    '''
+
+    prefix = StubServer.prefix
+
+    def __init__(self, dataset=None, latency=0.0, host='127.0.0.1', port=0):
+        if h2 is None:
+            raise ImportError('h2 is required for StubH2Server, pip install duedil[http2]')
+        self.dataset = dataset if dataset is not None else StubDataset()
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._counter_lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen(128)
+        self._thread = None
+        self._running = False
+        if hasattr(self.dataset, 'base_url'):
+            self.dataset.base_url = self.url
+
+    @property
+    def url(self):
+        host, port = self._socket.getsockname()[:2]
+        return 'http://{0}:{1}{2}'.format(host, port, self.prefix.rstrip('/'))
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._accept, name='duedil-h2-stub')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        try:
+            # wake the accept up
+            socket.create_connection(self._socket.getsockname()[:2], timeout=1).close()
+        except socket.error:
+            pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, client_class=None, api_key='stub', **kwargs):
+        'a client of client_class, ProClient by default, with an HTTP2Transport sending here'
+        from ..http2 import HTTP2Transport
+        if client_class is None:
+            from ..api import ProClient as client_class
+        kwargs.setdefault('transport', HTTP2Transport(prior_knowledge=True))
+        client = client_class(api_key, **kwargs)
+        client.base_url = self.url
+        return client
+
+    def _accept(self):
+        while self._running:
+            connection, _ = self._socket.accept()
+            if not self._running:
+                connection.close()
+                break
+            with self._counter_lock:
+                self.connections += 1
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        # the lock of the connection, notified when the client opens the flow control window
+        window = threading.Condition()
+        with window:
+            conn.initiate_connection()
+            sock.sendall(conn.data_to_send())
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                with window:
+                    events = conn.receive_data(data)
+                    sock.sendall(conn.data_to_send())
+                    window.notify_all()
+                for event in events:
+                    if isinstance(event, h2.events.RequestReceived):
+                        thread = threading.Thread(target=self._respond,
+                                                  args=(sock, conn, window, event.stream_id, dict(event.headers)))
+                        thread.daemon = True
+                        thread.start()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+        except socket.error:
+            pass
+        finally:
+            sock.close()
+
+    def _respond(self, sock, conn, window, stream_id, headers):
+        with self._counter_lock:
+            self.requests += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            url = urlparse(headers[':path'])
+            params = dict((key, values[-1]) for key, values in parse_qs(url.query).items())
+            payload = self.dataset.get(_path(url.path, self.prefix), params)
+            status, body = (404, '{"error": "Not Found"}') if payload is None else (200, json.dumps(payload))
+        finally:
+            with self._counter_lock:
+                self._in_flight -= 1
+        body = body.encode('utf-8')
+        with window:
+            conn.send_headers(stream_id, [(':status', str(status)), ('content-type', 'application/json'),
+                                          ('content-length', str(len(body)))])
+            while True:
+                size = min(len(body), conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if size or not body:
+                    conn.send_data(stream_id, body[:size], end_stream=size == len(body))
+                    body = body[size:]
+                    sock.sendall(conn.data_to_send())
+                    if not body:
+                        break
+                else:
+                    window.wait(1)
@@ -0,0 +1,718 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Seeded synthetic duedil pro data for scale testing.
+
+SyntheticDataset makes every payload up from the seed and the ids in the
+request, so a million companies cost no memory until searched: companies
+with their directors, directorships, shareholders, mortgages, addresses
+and accounts of all five types, director <-> company and parent <->
+subsidiaries links that agree in both directions, and paginated search.
+Serve it with StubServer(SyntheticDataset(...)) or stream it with
+write_ndjson; python -m duedil.testing.synthetic --help.
+'''
+from __future__ import unicode_literals
+
+import argparse
+from array import array
+from collections import OrderedDict
+import gzip
+import io
+import json
+import random
+import sys
+
+import six
+from six.moves import range
+from six.moves.urllib.parse import urlencode
+
+from ..resources.pro.company import (AccountDetailsFinancial, AccountDetailsGAAP,
+                                     AccountDetailsIFRS, AccountDetailsInsurance,
+                                     AccountDetailsStatutory, BankAccount, Company, Director,
+                                     Directorship, Document, Industry, Keywords, Mortgage,
+                                     PreviousCompanyName, RegisteredAddress, ServiceAddress,
+                                     Shareholder)
+from ..resources.pro.company.accounts.timeline import field_name
+from ..search.pro import MAX_PAGE_SIZE
+from .stub import COMPANY_TYPES, SIC_CODES, STATUSES
+
+DETAILS_CLASSES = OrderedDict([
+    ('statutory', AccountDetailsStatutory),
+    ('gaap', AccountDetailsGAAP),
+    ('ifrs', AccountDetailsIFRS),
+    ('financial', AccountDetailsFinancial),
+    ('insurance', AccountDetailsInsurance),
+])
+# how often companies file each type of accounts
+ACCOUNT_TYPE_WEIGHTS = (('statutory', 70), ('gaap', 10), ('ifrs', 10), ('financial', 5), ('insurance', 5))
+ACCOUNTS_TYPES = ('Full', 'Small', 'Medium', 'Group', 'Total Exemption Small', 'Dormant')
+
+FORENAMES = ('James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+             'David', 'Susan', 'Aisha', 'Raj', 'Wei', 'Olu', 'Siobhan', 'Tomasz')
+SURNAMES = ('Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Johnson', 'Davies',
+            'Patel', 'Khan', 'Evans', 'Thomas', 'Roberts', 'Walker', 'Murphy', 'Kowalski')
+WORDS = ('Acme', 'Northern', 'Global', 'Albion', 'Summit', 'Harbour', 'Phoenix', 'Crown',
+         'Meridian', 'Oak', 'Vertex', 'Beacon', 'Thames', 'Pennine', 'Severn', 'Cobalt')
+SUFFIXES = ('Limited', 'Holdings Limited', 'Services Ltd', 'Group plc', 'Trading Limited', 'LLP')
+TOWNS = ('London', 'Manchester', 'Birmingham', 'Leeds', 'Glasgow', 'Bristol', 'Edinburgh',
+         'Cardiff', 'Belfast', 'Nottingham', 'Sheffield', 'Newcastle')
+STREETS = ('High Street', 'Station Road', 'Church Lane', 'Victoria Road', 'Mill Lane', 'Park Avenue')
+BANKS = ('Barclays', 'HSBC', 'Lloyds', 'NatWest', 'Santander')
+
+BOOLEANS = frozenset(['accounts_consolidated', 'active', 'change_in_cash', 'consolidated',
+                      'consolidated_accounts', 'founding', 'reg_tps', 'secretary', 'tps'])
+FLOATS = frozenset(['gearing', 'net_profitability', 'return_on_capital_employed', 'return_on_investment'])
+TEXT = frozenset([
+    'accounts_accountants', 'accounts_auditors', 'accounts_currency', 'accounts_qualification_code',
+    'accounts_solicitors', 'accounts_type', 'amount_secured', 'area_code', 'auditors', 'bank',
+    'care_of', 'charity_number', 'company', 'company_type', 'credit_rating_latest_description',
+    'currency', 'description', 'details', 'documentCode', 'email', 'forename', 'function', 'id',
+    'keywords', 'liquidation_status', 'locale', 'middle_name', 'name', 'nation_code',
+    'nationality', 'owning_company', 'persons_entitled', 'phone', 'po_box', 'position',
+    'position_code', 'postal_area', 'postal_title', 'postcode', 'qualification_code', 'reg_care_of',
+    'reg_email', 'reg_phone', 'reg_web', 'sicCode', 'sicCodeDescription', 'sic_description',
+    'sic2007description', 'solicitors', 'sortCode', 'status', 'surname', 'title', 'trading_phone',
+    'trading_phone_std', 'type', 'website',
+])
+TEXT_PREFIXES = ('address', 'reg_address', 'trading_address')
+
+# search filter -> field of the company profile
+SEARCH_FIELDS = {
+    'employee_count': 'accounts_no_of_employees',
+    'turnover': 'accounts_turnover',
+    'gross_profit': 'accounts_gross_profit',
+    'cost_of_sales': 'accounts_cost_of_sales',
+    'net_assets': 'accounts_assets_net',
+    'current_assets': 'accounts_assets_current',
+    'total_assets': 'accounts_assets_total',
+    'cash': 'accounts_cash',
+    'currency': 'accounts_currency',
+    'location': 'reg_address_town',
+    'postcode': 'reg_address_postcode',
+    'sic_2007_code': 'sic2007code',
+}
+# search results cached per query, each an array of company numbers
+SEARCH_CACHE_SIZE = 8
+
+
+def _date(rng, first_year, last_year):
+    return '{0}-{1:02d}-{2:02d}'.format(rng.randint(first_year, last_year), rng.randint(1, 12),
+                                        rng.randint(1, 28))
+
+
+def _postcode(rng):
+    return '{0}{1} {2}{3}{4}'.format(rng.choice('BEGLMNS'), rng.randint(1, 20), rng.randint(1, 9),
+                                     rng.choice('ABDEFGHJ'), rng.choice('LNPQRSTUW'))
+
+
+def _text(name, rng):
+    'a plausible string for the attribute called name'
+    if name in ('forename', 'middle_name'):
+        return rng.choice(FORENAMES)
+    if name == 'surname':
+        return rng.choice(SURNAMES)
+    if name in ('title', 'postal_title'):
+        return rng.choice(('Mr', 'Mrs', 'Ms', 'Dr'))
+    if name.endswith('postcode') or name == 'postal_area':
+        return _postcode(rng)
+    if name.endswith('address1'):
+        return '{0} {1}'.format(rng.randint(1, 250), rng.choice(STREETS))
+    if name.startswith(TEXT_PREFIXES) or name == 'reg_address_town':
+        return rng.choice(TOWNS)
+    if name in ('currency', 'accounts_currency'):
+        return 'GBP'
+    if name.endswith('phone') or name.endswith('phone_std'):
+        return '0{0} {1:04d} {2:04d}'.format(rng.randint(113, 208), rng.randint(0, 9999), rng.randint(0, 9999))
+    if name.endswith('email'):
+        return 'info@{0}.co.uk'.format(rng.choice(WORDS).lower())
+    if name in ('website', 'reg_web'):
+        return 'www.{0}.co.uk'.format(rng.choice(WORDS).lower())
+    if name in ('nationality',):
+        return rng.choice(('British', 'British', 'Irish', 'French', 'Indian', 'Polish'))
+    if name in ('bank',):
+        return rng.choice(BANKS)
+    if name == 'sortCode':
+        return '{0:02d}-{1:02d}-{2:02d}'.format(rng.randint(10, 99), rng.randint(0, 99), rng.randint(0, 99))
+    return '{0} {1}'.format(name.replace('_', ' ').capitalize(), rng.randint(1, 999))
+
+
+def _value(name, rng, link, scale, year):
+    'a value of the type duedil documents for the attribute called name'
+    if name in BOOLEANS:
+        return rng.random() < 0.3
+    if name in ('last_update', 'date', 'endedDate') or name.endswith('_date') or name.startswith('date_'):
+        return _date(rng, year - 20, year)
+    if name.endswith(('_url', '_uri')) or name == 'uri':
+        return '{0}/{1}'.format(link, name.rsplit('_', 1)[0].replace('_', '-'))
+    if name.endswith('_ratio') or name in FLOATS:
+        return round(rng.uniform(0, 3), 2)
+    if name in TEXT or name.startswith(TEXT_PREFIXES):
+        return _text(name, rng)
+    return int(rng.uniform(0, 0.2) * scale)
+
+
+def fill(klass, values, rng, link, scale=100000, year=2015):
+    '''
+    The payload of a klass resource: values, and made up values of the
+    documented type for every other attribute of klass
+    '''
+    payload = {}
+    if 'id' in values:
+        payload['id'] = values['id']
+    for name in klass.attribute_names:
+        payload[name] = values[name] if name in values else _value(name, rng, link, scale, year)
+    return payload
+
+
+def figures(rng, turnover):
+    'statutory accounts figures that add up, for a business of turnover'
+    f = {'turnover': int(turnover), 'months': 12, 'currency': 'GBP', 'consolidated': False}
+    f['cost_of_sales'] = int(turnover * rng.uniform(0.3, 0.8))
+    f['gross_profit'] = f['turnover'] - f['cost_of_sales']
+    f['wages'] = int(turnover * rng.uniform(0.05, 0.3))
+    f['no_of_employees'] = max(1, f['wages'] // 30000)
+    f['depreciation'] = int(turnover * rng.uniform(0, 0.05))
+    f['operating_profits'] = int(f['gross_profit'] - f['wages'] - f['depreciation'] - turnover * rng.uniform(0, 0.3))
+    f['interest_payments'] = int(turnover * rng.uniform(0, 0.02))
+    f['pre_tax_profit'] = f['operating_profits'] - f['interest_payments']
+    f['taxation'] = max(0, int(f['pre_tax_profit'] * 0.19))
+    f['profit_after_tax'] = f['pre_tax_profit'] - f['taxation']
+    f['dividends_payable'] = max(0, int(f['profit_after_tax'] * rng.uniform(0, 0.5)))
+    f['retained_profit'] = f['profit_after_tax'] - f['dividends_payable']
+    f['directors_emoluments'] = int(f['wages'] * rng.uniform(0.05, 0.2))
+    f['audit_fees'] = int(rng.uniform(2000, 50000))
+    f['cash'] = int(turnover * rng.uniform(0, 0.3))
+    f['stock'] = int(turnover * rng.uniform(0, 0.2))
+    f['trade_debtors'] = int(turnover * rng.uniform(0.05, 0.25))
+    f['assets_other_current'] = int(turnover * rng.uniform(0, 0.05))
+    f['assets_current'] = f['cash'] + f['stock'] + f['trade_debtors'] + f['assets_other_current']
+    f['assets_total_current'] = f['assets_current']
+    f['assets_tangible'] = int(turnover * rng.uniform(0, 0.6))
+    f['assets_intangible'] = int(turnover * rng.uniform(0, 0.1))
+    f['assets_total_fix'] = f['assets_tangible'] + f['assets_intangible']
+    f['trade_creditors'] = int(turnover * rng.uniform(0.05, 0.2))
+    f['short_term_loans'] = int(turnover * rng.uniform(0, 0.1))
+    f['bank_overdraft'] = int(turnover * rng.uniform(0, 0.05))
+    f['liabilities_misc_current'] = int(turnover * rng.uniform(0, 0.05))
+    f['liabilities_current'] = (f['trade_creditors'] + f['short_term_loans'] + f['bank_overdraft']
+                                + f['liabilities_misc_current'])
+    f['lt_loans'] = int(turnover * rng.uniform(0, 0.3))
+    f['liabilities_lt'] = f['lt_loans']
+    f['liabilities_total'] = f['liabilities_current'] + f['liabilities_lt']
+    f['bank_overdraft_lt_loans'] = f['bank_overdraft'] + f['lt_loans']
+    f['assets_net'] = f['assets_current'] + f['assets_total_fix'] - f['liabilities_total']
+    f['shareholder_funds'] = f['assets_net']
+    f['paid_up_equity'] = int(rng.uniform(100, 100000))
+    f['pandl_account_reserve'] = f['shareholder_funds'] - f['paid_up_equity']
+    f['net_worth'] = f['shareholder_funds'] - f['assets_intangible']
+    f['working_capital'] = f['assets_current'] - f['liabilities_current']
+    f['capital_employed'] = f['assets_total_fix'] + f['working_capital']
+    f['operations_net_cashflow'] = int(f['operating_profits'] + f['depreciation'])
+    f['net_cashflow_from_financing'] = -f['dividends_payable']
+    f['increase_in_cash'] = int(turnover * rng.uniform(-0.05, 0.05))
+    total_assets = float(f['assets_current'] + f['assets_total_fix']) or 1.0
+    ratios = {
+        'current_ratio': f['assets_current'] / float(f['liabilities_current'] or 1),
+        'liquidity_ratio': (f['assets_current'] - f['stock']) / float(f['liabilities_current'] or 1),
+        'cash_to_current_liabilities_ratio': f['cash'] / float(f['liabilities_current'] or 1),
+        'cash_to_total_assets_ratio': f['cash'] / total_assets,
+        'gross_margin_ratio': f['gross_profit'] / float(turnover or 1),
+        'net_profitability': f['profit_after_tax'] / float(turnover or 1),
+        'return_on_assets_ratio': f['pre_tax_profit'] / total_assets,
+        'return_on_capital_employed': f['pre_tax_profit'] / float(f['capital_employed'] or 1),
+    }
+    f.update((name, round(value, 2)) for name, value in ratios.items())
+    return f
+
+
+class SyntheticDataset(object):
+    '''
+    size companies, numbered 1 to size, and as many directors, d1 to
+    d<size>; the same seed always gives the same data.
+
+    Director k sits on the board of companies k to k + n - 1, n between 1
+    and max_boards, so every company has at least one director. Companies
+    form groups of group_size consecutive numbers, each a tree with up to
+    fan_out subsidiaries per company. Every company files accounts for the
+    accounts years up to year, all of one type.
+
+    Payloads are made up on request; only search keeps per query arrays
+    of the matching company numbers, for its last SEARCH_CACHE_SIZE
+    queries, so memory grows at most linearly with size. The first page
+    of a new query scans every company, filters on accounts figures cost
+    about twice as much as the others.
+    '''
+
+    base_url = 'http://duedil.io/v3'
+
+    def __init__(self, size=1000000, seed=0, max_boards=4, group_size=7, fan_out=2, accounts=3, year=2015):
+        self.size = size
+        self.seed = seed
+        self.max_boards = max_boards
+        self.group_size = max(1, group_size)
+        self.fan_out = max(1, fan_out)
+        self.accounts = accounts
+        self.year = year
+        self._searches = OrderedDict()
+
+    def _random(self, *key):
+        return random.Random(':'.join(six.text_type(part) for part in (self.seed,) + key))
+
+    def _link(self, locale, collection, item):
+        return '{0}/{1}/{2}/{3}'.format(self.base_url, locale, collection, item)
+
+    @staticmethod
+    def _number(item, prefix=''):
+        if not item.startswith(prefix) or not item[len(prefix):].isdigit():
+            return None
+        return int(item[len(prefix):])
+
+    # the graph
+
+    def boards(self, director):
+        'number of companies director k sits on'
+        return 1 + self._random('boards', director).randrange(self.max_boards)
+
+    def director_companies(self, director):
+        return list(range(director, min(self.size, director + self.boards(director) - 1) + 1))
+
+    def company_directors(self, number):
+        return [k for k in range(max(1, number - self.max_boards + 1), number + 1)
+                if k + self.boards(k) > number]
+
+    def parent(self, number):
+        index = (number - 1) % self.group_size
+        if index == 0:
+            return None
+        return number - index + (index - 1) // self.fan_out
+
+    def subsidiaries(self, number):
+        first = number - (number - 1) % self.group_size
+        index = number - first
+        children = (first + index * self.fan_out + i for i in range(1, self.fan_out + 1))
+        return [child for child in children if child - first < self.group_size and child <= self.size]
+
+    def account_type(self, number):
+        choice = self._random('account-type', number).uniform(0, 100)
+        for account_type, weight in ACCOUNT_TYPE_WEIGHTS:
+            choice -= weight
+            if choice < 0:
+                return account_type
+        return 'statutory'
+
+    # payloads
+
+    def profile(self, number, locale='uk', accounts=True):
+        '''
+        the company fields search filters on, cheap enough to scan every
+        company; without accounts the accounts_ figures are left out, which
+        makes it several times cheaper still
+        '''
+        rng = self._random('company', number)
+        turnover = int(rng.lognormvariate(13, 1.8))
+        sic_code = rng.choice(SIC_CODES)
+        profile = {
+            'id': six.text_type(number),
+            'name': '{0} {1} {2}'.format(rng.choice(WORDS), rng.choice(WORDS), rng.choice(SUFFIXES)),
+            'locale': locale,
+            'status': rng.choice(STATUSES),
+            'company_type': rng.choice(COMPANY_TYPES),
+            'accounts_type': rng.choice(ACCOUNTS_TYPES),
+            'sic_code': sic_code,
+            'sic2007code': sic_code,
+            'incorporation_date': _date(rng, 1950, self.year - self.accounts),
+            'reg_address_town': rng.choice(TOWNS),
+            'reg_address_postcode': _postcode(rng),
+            'company_url': self._link(locale, 'companies', number),
+        }
+        if not accounts:
+            return profile
+        latest = self.figures(number, self.year, turnover)
+        profile.update({
+            'accounts_date': '{0}-12-31'.format(self.year),
+            'accounts_currency': latest['currency'],
+            'accounts_turnover': latest['turnover'],
+            'accounts_no_of_employees': latest['no_of_employees'],
+            'accounts_gross_profit': latest['gross_profit'],
+            'accounts_cost_of_sales': latest['cost_of_sales'],
+            'accounts_assets_net': latest['assets_net'],
+            'accounts_assets_current': latest['assets_current'],
+            'accounts_assets_total': latest['assets_current'] + latest['assets_total_fix'],
+            'accounts_cash': latest['cash'],
+            'accounts_pre_tax_profit': latest['pre_tax_profit'],
+        })
+        return profile
+
+    def figures(self, number, year, turnover=None):
+        'the statutory figures of the accounts of company number for year'
+        if turnover is None:
+            turnover = int(self._random('company', number).lognormvariate(13, 1.8))
+        rng = self._random('figures', number, year)
+        # a few percent growth or decline a year back from the latest accounts
+        for _ in range(self.year - year):
+            turnover /= rng.uniform(0.9, 1.25)
+        return figures(rng, turnover)
+
+    def company(self, number, locale='uk'):
+        profile = self.profile(number, locale)
+        latest = self.figures(number, self.year, profile['accounts_turnover'])
+        values = dict(profile)
+        values.update(('accounts_' + name, value) for name, value in latest.items()
+                      if 'accounts_' + name in Company.attribute_names)
+        directors = self.company_directors(number)
+        mortgages = self.mortgages(number, locale)
+        values.update({
+            'latest_accounts_date': profile['accounts_date'],
+            'accounts_filing_date': '{0}-09-30'.format(self.year + 1),
+            'directorships_open': len(directors),
+            'directorships_open_director': len(directors),
+            'directorships_open_secretary': 0,
+            'mortgages_outstanding_count': sum(1 for m in mortgages if m['status'] == 'Outstanding'),
+            'mortgages_satisfied_count': sum(1 for m in mortgages if m['status'] == 'Fully Satisfied'),
+            'shareholdings_url': profile['company_url'] + '/shareholders',
+        })
+        return fill(Company, values, self._random('company-detail', number), profile['company_url'],
+                    profile['accounts_turnover'], self.year)
+
+    def director(self, director, locale='uk'):
+        rng = self._random('director', director)
+        companies = self.director_companies(director)
+        link = self._link(locale, 'directors', 'd{0}'.format(director))
+        values = {
+            'id': 'd{0}'.format(director),
+            'forename': rng.choice(FORENAMES),
+            'surname': rng.choice(SURNAMES),
+            'date_of_birth': _date(rng, 1935, 1995),
+            'open_directorships_count': len(companies),
+            'director_directorships_count': len(companies),
+            'open_director_directorships_count': len(companies),
+            'secretary_directorships_count': 0,
+            'director_url': link,
+            'companies_url': link + '/companies',
+            'directorships_url': link + '/directorships',
+        }
+        return fill(Director, values, rng, link, 10, self.year)
+
+    def directorship(self, director, number, locale='uk'):
+        person = self.director(director, locale)
+        rng = self._random('directorship', director, number)
+        values = {
+            'id': 'd{0}-{1}'.format(director, number),
+            'active': True,
+            'status': 'open',
+            'founding': rng.random() < 0.2,
+            'secretary': False,
+            'function': 'Director',
+            'owning_company': six.text_type(number),
+            'forename': person['forename'],
+            'surname': person['surname'],
+            'resignation_date': None,
+            'companies_url': self._link(locale, 'companies', number),
+            'directors_uri': person['director_url'],
+        }
+        return fill(Directorship, values, rng, person['director_url'], 10, self.year)
+
+    def accounts_list(self, number, locale='uk'):
+        account_type = self.account_type(number)
+        link = self._link(locale, 'companies', number)
+        return [{'id': '{0}-{1}'.format(number, year), 'type': account_type,
+                 'date': '{0}-12-31'.format(year),
+                 'uri': '{0}/accounts/{1}-{2}'.format(link, number, year)}
+                for year in range(self.year, self.year - self.accounts, -1)]
+
+    def account_details(self, number, year, locale='uk'):
+        klass = DETAILS_CLASSES[self.account_type(number)]
+        values = {'id': '{0}-{1}'.format(number, year), 'date': '{0}-12-31'.format(year),
+                  'type': self.account_type(number), 'company': six.text_type(number)}
+        latest = self.figures(number, year)
+        for name, value in latest.items():
+            attribute = field_name(klass, name)
+            if attribute is not None:
+                values[attribute] = value
+        return fill(klass, values, self._random('details', number, year),
+                    self._link(locale, 'companies', number), latest['turnover'], year)
+
+    def _items(self, klass, kind, number, count, locale, **values):
+        'count klass payloads of company number'
+        rng = self._random(kind, number)
+        link = self._link(locale, 'companies', number)
+        items = []
+        for i in range(rng.randint(*count)):
+            item = dict(values, id='{0}-{1}'.format(number, i + 1))
+            items.append(fill(klass, item, rng, link, 100000, self.year))
+        return items
+
+    def shareholders(self, number, locale='uk'):
+        items = self._items(Shareholder, 'shareholders', number, (1, 4), locale,
+                            company=six.text_type(number), currency='GBP', type='Ordinary')
+        rng = self._random('shares', number)
+        for item in items:
+            item['number'] = rng.randint(1, 10000)
+            item['value'] = item['number'] * rng.choice((1, 1, 10, 100))
+        return items
+
+    def mortgages(self, number, locale='uk'):
+        items = self._items(Mortgage, 'mortgages', number, (0, 3), locale, type='Debenture')
+        rng = self._random('mortgage-status', number)
+        for i, item in enumerate(items):
+            item['number'] = i + 1
+            if rng.random() < 0.5:
+                item['status'] = 'Outstanding'
+                item['date_satisfied'] = None
+            else:
+                item['status'] = 'Fully Satisfied'
+        return items
+
+    def industries(self, number, locale='uk'):
+        sic_code = self.profile(number, locale)['sic_code']
+        items = self._items(Industry, 'industries', number, (1, 3), locale)
+        items[0]['sicCode'] = six.text_type(sic_code)
+        return items
+
+    def related(self, number, key, locale='uk'):
+        'payload of the related resource key of company number: a list, a dict, or None'
+        if key == 'directors':
+            return [self.director(k, locale) for k in self.company_directors(number)]
+        if key == 'directorships':
+            return [self.directorship(k, number, locale) for k in self.company_directors(number)]
+        if key == 'subsidiaries':
+            return [self.company(child, locale) for child in self.subsidiaries(number)]
+        if key == 'parent':
+            parent = self.parent(number)
+            return self.company(parent, locale) if parent else None
+        if key == 'accounts':
+            return self.accounts_list(number, locale)
+        if key == 'shareholders':
+            return self.shareholders(number, locale)
+        if key == 'mortgages':
+            return self.mortgages(number, locale)
+        if key == 'industries':
+            return self.industries(number, locale)
+        link = self._link(locale, 'companies', number)
+        if key == 'registered-address':
+            profile = self.profile(number, locale)
+            return fill(RegisteredAddress, {'id': profile['id'], 'company': profile['id'],
+                                            'postcode': profile['reg_address_postcode'],
+                                            'address4': profile['reg_address_town']},
+                        self._random('address', number), link, 10, self.year)
+        if key == 'keywords':
+            profile = self.profile(number, locale)
+            return fill(Keywords, {'id': profile['id'], 'locale': locale, 'name': profile['name'],
+                                   'company_url': link,
+                                   'keywords': ' '.join(profile['name'].split()[:2]).lower()},
+                        self._random('keywords', number), link, 10, self.year)
+        classes = {
+            'service-addresses': (ServiceAddress, (1, 2)),
+            'previous-company-names': (PreviousCompanyName, (0, 2)),
+            'bank-accounts': (BankAccount, (0, 2)),
+            'documents': (Document, (1, 5)),
+        }
+        if key in classes:
+            klass, count = classes[key]
+            return self._items(klass, key, number, count, locale)
+        return None
+
+    # the api
+
+    def get(self, path, params):
+        'the payload for an api path such as uk/companies/1/directors, None for a 404'
+        parts = path.strip('/').split('/')
+        if parts in (['companies'], ['directors']):
+            return self.search(parts[0], params)
+        if len(parts) < 3 or parts[0] not in ('uk', 'roi'):
+            return None
+        locale, collection, item = parts[:3]
+        rest = parts[3:]
+        if collection == 'directors':
+            director = self._number(item, 'd')
+            if director is None or not 1 <= director <= self.size:
+                return None
+            if not rest:
+                return {'response': self.director(director, locale)}
+            if rest == ['companies']:
+                return self._list([self.company(n, locale) for n in self.director_companies(director)], params)
+            if rest == ['directorships']:
+                return self._list([self.directorship(director, n, locale)
+                                   for n in self.director_companies(director)], params)
+            return None
+        number = self._number(item)
+        if collection != 'companies' or number is None or not 1 <= number <= self.size:
+            return None
+        if not rest:
+            return {'response': self.company(number, locale)}
+        if rest[0] == 'accounts' and len(rest) == 2:
+            company, _, year = rest[1].partition('-')
+            if company != item or not year.isdigit() or not 0 <= self.year - int(year) < self.accounts:
+                return None
+            return {'response': self.account_details(number, int(year), locale)}
+        if len(rest) > 1:
+            return None
+        result = self.related(number, rest[0], locale)
+        if result is None:
+            return None
+        if isinstance(result, list):
+            return self._list(result, params)
+        return {'response': result}
+
+    @staticmethod
+    def _list(rows, params):
+        offset = int(params.get('offset', 0) or 0)
+        limit = int(params.get('limit', 10) or 10)
+        return {'response': {'data': rows[offset:offset + limit],
+                             'pagination': {'offset': offset, 'limit': limit, 'total': len(rows)}}}
+
+    def _matches(self, row, filters):
+        for name, wanted in filters.items():
+            value = row.get(SEARCH_FIELDS.get(name, name))
+            if name == 'name':
+                if wanted.lower() not in (value or '').lower():
+                    return False
+            elif isinstance(wanted, list) and len(wanted) == 2 and all(
+                    v is None or isinstance(v, (int, float)) for v in wanted):
+                if not isinstance(value, (int, float)):
+                    return False
+                if (wanted[0] is not None and value < wanted[0]) or (wanted[1] is not None and value > wanted[1]):
+                    return False
+            elif isinstance(wanted, list):
+                if six.text_type(value) not in [six.text_type(v) for v in wanted]:
+                    return False
+            elif six.text_type(value) != six.text_type(wanted):
+                return False
+        return True
+
+    def _search_numbers(self, collection, filters, order_by):
+        'the numbers of the companies or directors matching filters, in order'
+        if not filters and not order_by:
+            return range(1, self.size + 1)
+        key = json.dumps([collection, filters, order_by], sort_keys=True)
+        numbers = self._searches.pop(key, None)
+        if numbers is None:
+            if collection == 'companies':
+                fields = [SEARCH_FIELDS.get(name, name) for name in filters]
+                if order_by:
+                    fields.append(SEARCH_FIELDS.get(order_by.get('field'), order_by.get('field')))
+                accounts = any(field.startswith('accounts_') for field in fields)
+
+                def row(number):
+                    return self.profile(number, accounts=accounts)
+            else:
+                row = self._director_row
+            numbers = array(str('l'), (n for n in range(1, self.size + 1) if self._matches(row(n), filters)))
+            if order_by:
+                field = SEARCH_FIELDS.get(order_by.get('field'), order_by.get('field'))
+                values = dict((n, row(n).get(field)) for n in numbers)
+                numbers = array(str('l'), sorted(numbers, key=lambda n: (values[n] is None, values[n]),
+                                                 reverse=order_by.get('direction') == 'desc'))
+            while len(self._searches) >= SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        self._searches[key] = numbers
+        return numbers
+
+    def _director_row(self, director, locale='uk'):
+        payload = self.director(director, locale)
+        return {'id': payload['id'], 'name': '{0} {1}'.format(payload['forename'], payload['surname']),
+                'locale': locale, 'date_of_birth': payload['date_of_birth'],
+                'director_url': payload['director_url'], 'directorships_url': payload['directorships_url'],
+                'companies_url': payload['companies_url']}
+
+    def search(self, collection, params):
+        'a page of companies or directors search, with the pagination duedil returns'
+        filters = json.loads(params.get('filters') or '{}')
+        order_by = json.loads(params.get('orderBy') or 'null')
+        offset = int(params.get('offset', 0) or 0)
+        limit = min(int(params.get('limit', 10) or 10), MAX_PAGE_SIZE)
+        numbers = self._search_numbers(collection, filters, order_by)
+        row = self.profile if collection == 'companies' else self._director_row
+        pagination = {'offset': offset, 'limit': limit, 'total': len(numbers)}
+        if offset + limit < len(numbers):
+            query = dict((k, v) for k, v in params.items() if k != 'api_key')
+            query.update(offset=offset + limit, limit=limit)
+            pagination['next_url'] = '{0}/{1}?{2}'.format(self.base_url, collection,
+                                                          urlencode(sorted(query.items())))
+        return {'response': {'data': [row(n) for n in numbers[offset:offset + limit]],
+                             'pagination': pagination}}
+
+    # streaming
+
+    def records(self, start=1, stop=None, locale='uk', related=True):
+        '''
+        (endpoint, payload) for every company from start up to stop, then
+        with related its related resources and account details, and the
+        directors whose first board is the company
+        '''
+        stop = self.size if stop is None else min(stop, self.size)
+        for number in range(start, stop + 1):
+            company = '{0}/companies/{1}'.format(locale, number)
+            yield company, {'response': self.company(number, locale)}
+            if not related:
+                continue
+            for key in sorted(Company.related_resources):
+                result = self.related(number, key, locale)
+                if isinstance(result, list):
+                    yield '{0}/{1}'.format(company, key), self._list(result, {'limit': MAX_PAGE_SIZE})
+                elif result is not None:
+                    yield '{0}/{1}'.format(company, key), {'response': result}
+            for account in self.accounts_list(number, locale):
+                year = int(account['date'][:4])
+                yield '{0}/accounts/{1}'.format(company, account['id']), {
+                    'response': self.account_details(number, year, locale)}
+            director = '{0}/directors/d{1}'.format(locale, number)
+            yield director, {'response': self.director(number, locale)}
+            yield director + '/companies', self._list(
+                [self.company(n, locale) for n in self.director_companies(number)], {'limit': MAX_PAGE_SIZE})
+
+
+def write_ndjson(dataset, out, **kwargs):
+    '''
+    Write dataset.records(**kwargs) to the text file out, one
+    {"endpoint": ..., "response": ...} object a line; returns the count
+    '''
+    count = 0
+    for endpoint, payload in dataset.records(**kwargs):
+        # json.dumps makes a str on Python 2, which io text files refuse
+        out.write(six.text_type(json.dumps({'endpoint': endpoint, 'response': payload['response']}, sort_keys=True)))
+        out.write('\n')
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m duedil.testing.synthetic',
+                                     description='write a synthetic duedil dataset as NDJSON')
+    parser.add_argument('output', nargs='?', default='-', help='file, .gz is compressed, - for stdout')
+    parser.add_argument('--size', type=int, default=1000, help='number of companies')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--companies-only', action='store_true', help='leave out related resources')
+    args = parser.parse_args(argv)
+    dataset = SyntheticDataset(size=args.size, seed=args.seed)
+    if args.output == '-':
+        out = sys.stdout
+    elif args.output.endswith('.gz'):
+        out = io.TextIOWrapper(gzip.open(args.output, 'wb'), encoding='utf-8')
+    else:
+        out = io.open(args.output, 'w', encoding='utf-8')
+    try:
+        write_ndjson(dataset, out, related=not args.companies_only)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
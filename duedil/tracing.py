@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+from __future__ import unicode_literals
+
+from contextlib import contextmanager
+import binascii
+import os
+import threading
+import time
+import traceback
+
+import six
+
+from .concurrency import ContextLocal, register_context
+from .metrics import endpoint_class
+
+_PACKAGE = os.path.dirname(os.path.abspath(__file__))
+
+# apart for every thread and asyncio task
+_local = ContextLocal('duedil.tracing')
+
+
+def _id(size):
+    return binascii.hexlify(os.urandom(size)).decode('ascii')
+
+
+def _now():
+    return int(time.time() * 1e9)
+
+
+def active():
+    'the Tracer tracing the current thread, None when not tracing'
+    return getattr(_local, 'tracer', None)
+
+
+class Span(object):
+    'one Client.get, or the root span of a Tracer'
+
+    def __init__(self, trace_id, parent_id, name, attributes=None, stack=None, resource_class=None):
+        self.trace_id = trace_id
+        self.span_id = _id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.stack = stack
+        self.resource_class = resource_class
+        self.start = _now()
+        self.end = None
+        self.requests = 0
+
+    @property
+    def duration(self):
+        'seconds'
+        return ((self.end or _now()) - self.start) / 1e9
+
+    def to_otel(self):
+        'the span as an OTLP/JSON span'
+        attributes = dict(self.attributes)
+        if self.stack:
+            attributes['code.stacktrace'] = ''.join(traceback.format_list(self.stack))
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 'SPAN_KIND_CLIENT' if self.parent_id else 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end or _now()),
+            'attributes': [{'key': key, 'value': _otel_value(value)}
+                           for key, value in sorted(attributes.items()) if value is not None],
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, six.integer_types):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': '{0}'.format(value)}
+
+
+class Tracer(object):
+    '''
+    Records which attribute access caused which duedil call.
+
+    While a tracer is entered (with Tracer() as tracer: ...) every
+    Client.get made by the thread, and by the threads the concurrency
+    helpers start from it, becomes a span under the tracer's root span.
+    The span names the resource class and the attribute or related key
+    whose lazy load made the call, whether the cache answered it, how long
+    it took and, with capture_stack, the stack of the code outside duedil
+    that made it. to_otel() exports the spans as OTLP/JSON and summary()
+    sums them up per trigger.
+    '''
+
+    def __init__(self, name='duedil', capture_stack=True, stack_limit=8):
+        self.name = name
+        self.capture_stack = capture_stack
+        self.stack_limit = stack_limit
+        self.trace_id = _id(16)
+        self.root = None
+        self.spans = []
+        self._lock = threading.Lock()
+        self._previous = []
+
+    def __enter__(self):
+        if self.root is None:
+            self.root = Span(self.trace_id, None, self.name)
+        self._previous.append((active(), getattr(_local, 'trigger', None)))
+        _local.tracer = self
+        _local.trigger = None
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.tracer, _local.trigger = self._previous.pop()
+        if not self._previous:
+            self.root.end = _now()
+
+    def _stack(self):
+        frames = traceback.extract_stack()
+        # the frames leading up to the outermost call into duedil
+        for index, frame in enumerate(frames):
+            if os.path.abspath(frame[0]).startswith(_PACKAGE):
+                frames = frames[:index]
+                break
+        return frames[-self.stack_limit:]
+
+    def start(self, endpoint):
+        klass, attribute = getattr(_local, 'trigger', None) or (None, None)
+        attributes = {
+            'duedil.endpoint': endpoint,
+            'duedil.resource': klass.__name__ if klass else None,
+            'duedil.attribute': attribute,
+            # made from a worker of the concurrency helpers, as part of a batch
+            'duedil.batched': getattr(_local, 'batched', False),
+            'thread.name': threading.current_thread().name,
+        }
+        return Span(self.trace_id, self.root.span_id, 'GET {0}'.format(endpoint_class(endpoint)),
+                    attributes, self._stack() if self.capture_stack else None, klass)
+
+    def finish(self, span, error=None):
+        span.end = _now()
+        span.attributes['duedil.cache_hit'] = span.requests == 0
+        span.attributes['duedil.requests'] = span.requests
+        if error is not None:
+            span.attributes['exception.type'] = error.__class__.__name__
+        with self._lock:
+            self.spans.append(span)
+
+    def to_otel(self):
+        'the root span and the call spans as an OTLP/JSON resourceSpans list'
+        spans = [self.root] + list(self.spans) if self.root else list(self.spans)
+        return [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'duedil'},
+                'spans': [span.to_otel() for span in spans],
+            }],
+        }]
+
+    def summary(self):
+        '''
+        {'calls', 'requests', 'cache_hits', 'duration', 'triggers'}, triggers
+        being one dict per (resource, attribute) that made calls, most calls then
+        most requests first, ties by name
+        '''
+        triggers = {}
+        for span in list(self.spans):
+            key = (span.attributes['duedil.resource'], span.attributes['duedil.attribute'])
+            trigger = triggers.setdefault(key, {
+                'resource': key[0], 'attribute': key[1], 'calls': 0, 'requests': 0,
+                'duration': 0.0, 'endpoints': set(),
+            })
+            trigger['calls'] += 1
+            trigger['requests'] += span.requests
+            trigger['duration'] += span.duration
+            trigger['endpoints'].add(endpoint_class(span.attributes['duedil.endpoint']))
+        for trigger in triggers.values():
+            trigger['endpoints'] = sorted(trigger['endpoints'])
+        spans = list(self.spans)
+        return {
+            'calls': len(spans),
+            'requests': sum(span.requests for span in spans),
+            'cache_hits': sum(1 for span in spans if span.requests == 0),
+            'duration': self.root.duration if self.root else 0.0,
+            'triggers': sorted(triggers.values(), key=lambda t: (-t['calls'], -t['requests'], t['resource'], t['attribute'])),
+        }
+
+
+def trace(**kwargs):
+    'a Tracer, to be entered: with trace() as tracer: ...'
+    return Tracer(**kwargs)
+
+
+@contextmanager
+def trigger(resource, attribute):
+    'calls made inside are attributed to attribute of resource'
+    if active() is None:
+        yield
+        return
+    previous = getattr(_local, 'trigger', None)
+    _local.trigger = (resource.__class__, attribute)
+    try:
+        yield
+    finally:
+        _local.trigger = previous
+
+
+@contextmanager
+def span(endpoint):
+    'a span around a Client.get when the thread is traced'
+    tracer = active()
+    if tracer is None:
+        yield None
+        return
+    current = tracer.start(endpoint)
+    previous = getattr(_local, 'span', None)
+    _local.span = current
+    try:
+        yield current
+    except Exception as error:
+        tracer.finish(current, error)
+        raise
+    else:
+        tracer.finish(current)
+    finally:
+        _local.span = previous
+
+
+def request_sent():
+    'count a request going out for the current span, from Client._started'
+    current = getattr(_local, 'span', None)
+    if current is not None:
+        current.requests += 1
+
+
+@contextmanager
+def _restore(tracer, trigger_):
+    previous = active(), getattr(_local, 'trigger', None), getattr(_local, 'batched', False)
+    _local.tracer, _local.trigger, _local.batched = tracer, trigger_, True
+    try:
+        yield
+    finally:
+        _local.tracer, _local.trigger, _local.batched = previous
+
+
+def _capture():
+    tracer = active()
+    if tracer is None:
+        return None
+    trigger_ = getattr(_local, 'trigger', None)
+    return lambda: _restore(tracer, trigger_)
+
+
+register_context(_capture)
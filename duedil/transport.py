@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+'''
+Transports send the requests Client._get builds, Client(transport=...).
+
+A Transport sends a GET of a url with params within a timeout and returns
+the requests.Response, streams a response body, keeps TransportStats and is
+closed when done with. Client._get builds the request, maps the errors
+and retries; which transport carries the request is up to the client:
+
+* RequestsTransport, the default, pools connections in a requests.Session
+* RecordingTransport records the traffic of another transport to a
+  Cassette and ReplayTransport serves it back from there:
+
+    with Cassette('crawl.cassette', 'w') as cassette:
+        client = ProClient(api_key, transport=RecordingTransport(cassette))
+        ...
+    client = ProClient(api_key, transport=ReplayTransport(Cassette('crawl.cassette')))
+
+* duedil.testing.stub.StubTransport answers from a stub dataset in process
+'''
+from __future__ import unicode_literals
+
+from datetime import timedelta
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from six.moves.urllib.parse import urlencode, urlsplit
+
+
+def request_key(url, params=None):
+    '''
+    The cassette key of a request: the path and the sorted parameters
+    without the api key, so recordings replay whatever the host or key
+    '''
+    params = sorted((k, v) for k, v in (params or {}).items() if k != 'api_key')
+    path = urlsplit(url).path
+    return '{0}?{1}'.format(path, urlencode(params)) if params else path
+
+
+def build_response(url, status_code, body, reason=None, headers=None, elapsed=0.0):
+    'a requests.Response as if it came from the network'
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = 'utf-8'
+    response._content = body.encode('utf-8') if not isinstance(body, bytes) else body
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class TransportStats(object):
+    'what went through a transport, safe to update from many threads'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.seconds = 0.0
+
+    def record(self, seconds, received=0, error=False):
+        'a request that took seconds and received bytes of body, or failed'
+        with self._lock:
+            self.requests += 1
+            self.seconds += seconds
+            self.bytes_received += received
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors,
+                    'bytes_received': self.bytes_received, 'seconds': self.seconds}
+
+
+class Transport(object):
+    '''
+    Base of the transports: subclasses implement _send(url, params, timeout)
+    returning a requests.Response, send adds the stats. timeout is in
+    seconds, either one number or a (connect, read) tuple, None for the
+    transport's own
+    '''
+
+    def __init__(self):
+        self.stats = TransportStats()
+
+    def _send(self, url, params, timeout):
+        raise NotImplementedError
+
+    def send(self, url, params=None, timeout=None):
+        start = time.time()
+        response = None
+        try:
+            response = self._send(url, params, timeout)
+            return response
+        finally:
+            self.stats.record(time.time() - start, len(response.content or b'') if response is not None else 0,
+                              error=response is None)
+
+    def stream(self, url, params=None, chunk_size=65536, timeout=None):
+        'the body of the response in chunks of up to chunk_size bytes'
+        content = self.send(url, params, timeout).content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def connection_stats(self):
+        'stats with the connection counts where the transport knows them'
+        return self.stats.snapshot()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RequestsTransport(Transport):
+    '''
+    Keeps connections to duedil open in a requests.Session: up to
+    pool_size per host, enough for the concurrency helpers' workers.
+    timeout is used for the requests sent without one, None waits forever.
+    '''
+
+    def __init__(self, pool_size=16, timeout=None):
+        super(RequestsTransport, self).__init__()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is None else timeout
+
+    def _send(self, url, params, timeout):
+        return self.session.get(url, params=params, timeout=self._timeout(timeout))
+
+    def stream(self, url, params=None, chunk_size=65536, timeout=None):
+        start = time.time()
+        response = self.session.get(url, params=params, timeout=self._timeout(timeout), stream=True)
+        received = 0
+        try:
+            for chunk in response.iter_content(chunk_size):
+                received += len(chunk)
+                yield chunk
+        finally:
+            response.close()
+            self.stats.record(time.time() - start, received)
+
+    def connection_stats(self):
+        stats = self.stats.snapshot()
+        stats['connections_opened'] = 0
+        stats['pooled_requests'] = 0
+        if self._session is not None:
+            for adapter in set(self._session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        stats['connections_opened'] += pool.num_connections
+                        stats['pooled_requests'] += pool.num_requests
+        return stats
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class CassetteError(Exception):
+    pass
+
+
+class CassetteMiss(CassetteError, KeyError):
+    'the request was not recorded'
+
+
+class Cassette(object):
+    '''
+    A file of recorded responses, opened for replay with mode 'r' or to
+    record with mode 'w'.
+
+    Every response is a zlib compressed JSON record after a 4 byte length.
+    Closing a recording appends the compressed index, the record offsets
+    by request key, and a trailer pointing at it, so replay reads the
+    index once and then seeks straight to each response. A recording that was never closed
+    has its index rebuilt by reading the records one after the other.
+    '''
+
+    MAGIC = b'DUEDILCASSETTE1\n'
+    TRAILER = b'DUEDILINDEX'
+    _length = struct.Struct('>I')
+    _offset = struct.Struct('>Q')
+
+    def __init__(self, path, mode='r'):
+        if mode not in ('r', 'w'):
+            raise ValueError('mode must either be "r" or "w"')
+        self.path = path
+        self.mode = mode
+        self.index = {}
+        self._lock = threading.Lock()
+        if mode == 'w':
+            self._file = open(path, 'wb')
+            self._file.write(self.MAGIC)
+        else:
+            self._file = open(path, 'rb')
+            if self._file.read(len(self.MAGIC)) != self.MAGIC:
+                self._file.close()
+                raise CassetteError('{0} is not a duedil cassette'.format(path))
+            self.index = self._read_index()
+
+    def _read_index(self):
+        trailer = len(self.TRAILER) + self._offset.size
+        self._file.seek(0, os.SEEK_END)
+        end = self._file.tell()
+        if end >= len(self.MAGIC) + trailer:
+            self._file.seek(end - trailer)
+            tail = self._file.read(trailer)
+            if tail.startswith(self.TRAILER):
+                start = self._offset.unpack(tail[len(self.TRAILER):])[0]
+                self._file.seek(start)
+                index = json.loads(zlib.decompress(self._file.read(end - trailer - start)).decode('utf-8'))
+                return dict((key, tuple(entry)) for key, entry in index.items())
+        return self._scan(end)
+
+    def _scan(self, end):
+        index = {}
+        offset = len(self.MAGIC)
+        self._file.seek(offset)
+        while offset + self._length.size <= end:
+            length = self._length.unpack(self._file.read(self._length.size))[0]
+            data = self._file.read(length)
+            if len(data) < length:
+                # the recording stopped half way through this record
+                break
+            key = json.loads(zlib.decompress(data).decode('utf-8'))['key']
+            index[key] = (offset + self._length.size, length)
+            offset += self._length.size + length
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def record(self, key, response, elapsed=None):
+        '''
+        add response to a recording; the last response of a key is the one
+        replayed, so a request retried after a 403 replays its success
+        '''
+        if elapsed is None:
+            elapsed = response.elapsed.total_seconds() if response.elapsed else 0.0
+        record = {
+            'key': key,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+            'body': response.text,
+            'elapsed': elapsed,
+        }
+        data = zlib.compress(json.dumps(record).encode('utf-8'))
+        with self._lock:
+            offset = self._file.tell() + self._length.size
+            self._file.write(self._length.pack(len(data)))
+            self._file.write(data)
+            self.index[key] = (offset, len(data))
+
+    def lookup(self, key):
+        'the recorded response of key as a dict, CassetteMiss if there is none'
+        try:
+            offset, length = self.index[key]
+        except KeyError:
+            raise CassetteMiss(key)
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.mode == 'w':
+                start = self._file.tell()
+                self._file.write(zlib.compress(json.dumps(self.index, sort_keys=True).encode('utf-8')))
+                self._file.write(self.TRAILER + self._offset.pack(start))
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingTransport(Transport):
+    'sends through transport, requests by default, and records every response in cassette'
+
+    def __init__(self, cassette, transport=None):
+        super(RecordingTransport, self).__init__()
+        self.cassette = cassette
+        self.transport = transport or RequestsTransport()
+
+    def _send(self, url, params, timeout):
+        start = time.time()
+        response = self.transport.send(url, params, timeout)
+        self.cassette.record(request_key(url, params), response, time.time() - start)
+        return response
+
+    def connection_stats(self):
+        return self.transport.connection_stats()
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    '''
+    Serves the responses recorded in cassette. With latency each
+    response takes that many times as long as it took when recorded.
+    Requests that were not recorded raise CassetteMiss, or go through
+    fallback when there is one.
+    '''
+
+    def __init__(self, cassette, latency=0.0, fallback=None):
+        super(ReplayTransport, self).__init__()
+        self.cassette = cassette
+        self.latency = latency
+        self.fallback = fallback
+
+    def _send(self, url, params, timeout):
+        try:
+            record = self.cassette.lookup(request_key(url, params))
+        except CassetteMiss:
+            if self.fallback is None:
+                raise
+            return self.fallback.send(url, params, timeout)
+        if self.latency and record['elapsed']:
+            time.sleep(record['elapsed'] * self.latency)
+        return build_response(url, record['status'], record['body'], record['reason'],
+                              record['headers'], record['elapsed'])
@@ -51,7 +51,7 @@ setup(name='duedil',
       author_email='christian.ledermann@gmail.com',
       url='http://duedilv3.readthedocs.org/en/latest/',
       license='Apache License 2.0',
-      packages=find_packages(exclude=['ez_setup', 'examples', 'tests']),
+      packages=find_packages(exclude=['ez_setup', 'examples', 'tests', 'benchmarks']),
       include_package_data=True,
       zip_safe=False,
       install_requires=[
@@ -60,10 +60,19 @@ setup(name='duedil',
           'six',
           'retrying',
           'dogpile.cache',
+          'futures; python_version < "3"',
       ],
+      extras_require={
+          'numpy': ['numpy'],
+          'pandas': ['numpy', 'pandas'],
+          'arrow': ['numpy', 'pyarrow'],
+          'http2': ['httpx[http2]'],
+      },
       tests_require=['pytest', 'requests_mock'],
       cmdclass = {'test': PyTest},
       entry_points="""
       # -*- Entry points: -*-
+      [pytest11]
+      duedil = duedil.testing.pytest_plugin
       """,
       )
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import sys
+
+from duedil.cache import configure_cache, dp_region
+
+# async def is a syntax error before Python 3.5
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 5) else []
+
+# the tests count requests, nothing is cached between them
+if not dp_region.is_configured:
+    configure_cache('dogpile.cache.null')
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import datetime
+import re
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.resources.pro.company import (Company, AccountDetailsGAAP,
+                                          AccountDetailsIFRS, AccountDetailsStatutory)
+
+API_KEY = '12345'
+
+ACCOUNTS = [
+    {'id': 'a3', 'type': 'ifrs', 'date': '2014-12-31',
+     'uri': 'http://duedil.io/v3/uk/companies/1/accounts/a3'},
+    {'id': 'a1', 'type': 'statutory', 'date': '2012-12-31',
+     'uri': 'http://duedil.io/v3/uk/companies/1/accounts/a1'},
+    {'id': 'a2', 'type': 'gaap', 'date': '2013-12-31',
+     'uri': 'http://duedil.io/v3/uk/companies/1/accounts/a2'},
+]
+
+DETAILS = {
+    'a1': {'id': 'a1', 'date': '2012-12-31', 'turnover': 100, 'no_of_employees': 10,
+           'shareholder_funds': 50},
+    'a2': {'id': 'a2', 'date': '2013-12-31', 'turnover': 120, 'employee_numbers': 12,
+           'total_shareholders_funds': 60},
+    'a3': {'id': 'a3', 'date': '2014-12-31', 'turnover': 150, 'employee_numbers': 15,
+           'total_shareholder_funds': 70},
+}
+
+
+def accounts_response(request, context):
+    path = request.path[len('/v3/uk/companies/1/'):-len('.json')]
+    if path == 'accounts':
+        return {'response': {'data': ACCOUNTS, 'pagination': {'total': len(ACCOUNTS)}}}
+    return {'response': DETAILS[path.split('/')[-1]]}
+
+
+class AccountsTimelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ProClient(API_KEY)
+
+    @requests_mock.mock()
+    def test_timeline(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/1/.*'), json=accounts_response)
+        timeline = Company(client=self.client, id='1').accounts_timeline()
+        # the accounts list, then the three details
+        self.assertEqual(m.call_count, 4)
+        self.assertEqual(timeline.dates, [datetime.date(2012, 12, 31),
+                                          datetime.date(2013, 12, 31),
+                                          datetime.date(2014, 12, 31)])
+        self.assertEqual([type(entry.details) for entry in timeline],
+                         [AccountDetailsStatutory, AccountDetailsGAAP, AccountDetailsIFRS])
+        self.assertEqual(timeline.field('turnover'), [100, 120, 150])
+        self.assertEqual(timeline.fields('no_of_employees', 'shareholder_funds'),
+                         {'no_of_employees': [10, 12, 15], 'shareholder_funds': [50, 60, 70]})
+        # no further requests once the timeline is built
+        self.assertEqual(timeline[0].details.path, 'companies/1/accounts')
+        self.assertEqual(m.call_count, 4)
+
+    @requests_mock.mock()
+    def test_missing_details(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/1/.*'), json=accounts_response)
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/1/accounts/a2.json', status_code=404)
+        timeline = Company(client=self.client, id='1').accounts_timeline()
+        self.assertIsNone(timeline[1].details)
+        self.assertEqual(timeline.field('turnover'), [100, None, 150])
+        self.assertEqual(timeline.field('no_such_field'), [None, None, None])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+# Python 3.5+ only, tests/conftest.py leaves it out of the collection on Python 2
+
+import asyncio
+import time
+import unittest
+
+from duedil import deadlines
+from duedil.aio import aget, aget_many
+from duedil.hedging import HedgingPolicy
+from duedil.http2 import HTTP2Transport, httpx
+from duedil.metrics import DURATION, Metrics
+from duedil.ratelimit import TokenBucket
+from duedil.testing.stub import StubDataset, StubH2Server, h2
+from duedil.tracing import trace
+
+
+def run(coroutine):
+    'asyncio.run, which is Python 3.7+'
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(deadlines.ContextVar is None, 'contextvars is Python 3.7+')
+class DeadlineTestCase(unittest.TestCase):
+
+    def test_tasks(self):
+        async def with_deadline(entered, done):
+            with deadlines.deadline(0.01):
+                entered.set()
+                await done.wait()
+                await asyncio.sleep(0.02)
+                return deadlines.timeout(10)
+
+        async def without(entered, done):
+            await entered.wait()
+            try:
+                return deadlines.current(), deadlines.timeout(10)
+            finally:
+                done.set()
+
+        async def both():
+            entered, done = asyncio.Event(), asyncio.Event()
+            return await asyncio.gather(with_deadline(entered, done), without(entered, done),
+                                        return_exceptions=True)
+        expired, unbounded = run(both())
+        # the deadline of one task is none of the other's business
+        self.assertEqual(unbounded, (None, 10))
+        self.assertIsInstance(expired, deadlines.DeadlineExceeded)
+
+
+@unittest.skipIf(httpx is None or h2 is None, 'httpx and h2 are not installed')
+class AsyncioTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubH2Server(StubDataset(size=50), latency=0.05).start()
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_aget_many(self):
+        async def fetch():
+            try:
+                return await aget_many(self.client, ['uk/companies/1', 'uk/companies/2', 'uk/companies/51'])
+            finally:
+                await self.client.transport.aclose()
+        results = run(fetch())
+        self.assertEqual([r.get('response', {}).get('id') for r in results], ['1', '2', None])
+        self.assertLessEqual(self.server.connections, 2)
+        self.assertEqual(self.client.transport.connection_stats()['requests'], 3)
+
+    def aget_many(self, client, endpoints):
+        async def fetch():
+            try:
+                return await aget_many(client, endpoints)
+            finally:
+                await client.transport.aclose()
+        return run(fetch())
+
+    def test_metrics_and_tracing(self):
+        client = self.server.client(metrics=Metrics())
+        with trace(capture_stack=False) as tracer:
+            self.aget_many(client, ['uk/companies/{0}'.format(i) for i in range(1, 6)])
+        histogram = client.metrics.snapshot()['histograms'][DURATION][(('endpoint', '{locale}/companies/{id}'),)]
+        self.assertEqual(histogram['count'], 5)
+        # every request timed from its own start, all of them in flight together
+        self.assertGreaterEqual(histogram['sum'], 5 * 0.05)
+        # a span per task, each counting its own request
+        self.assertEqual([span.requests for span in tracer.spans], [1] * 5)
+
+    def test_hedged(self):
+        policy = HedgingPolicy(min_samples=10, max_ratio=1.0)
+        self.addCleanup(policy.close)
+        for _ in range(10):
+            policy.observe('{locale}/companies/{id}', 0.01)
+        client = self.server.client(hedging=policy)
+        results = self.aget_many(client, ['uk/companies/1', 'uk/companies/2'])
+        self.assertEqual([r['response']['id'] for r in results], ['1', '2'])
+        stats = policy.stats()
+        self.assertEqual((stats['requests'], stats['hedges']), (2, 2))
+
+    def test_rate_limited(self):
+        self.client.rate_limiter = TokenBucket(5, burst=1)
+
+        async def fetch():
+            try:
+                return await aget_many(self.client, ['uk/companies/1', 'uk/companies/2', 'uk/companies/3'])
+            finally:
+                await self.client.transport.aclose()
+        start = time.time()
+        run(fetch())
+        # a token every 200ms, the first one saved up
+        self.assertGreaterEqual(time.time() - start, 0.4)
+
+    def test_aget_needs_async_transport(self):
+        client = self.server.client(transport=HTTP2Transport(prior_knowledge=True))
+        client.transport = None
+        with self.assertRaises(TypeError):
+            run(aget(client, 'uk/companies/1'))
@@ -27,9 +27,13 @@ from requests.exceptions import HTTPError
 
 from duedil.api import LiteClient, ProClient, InternationalClient, Client, APIMonthlyLimitException
 from duedil.resources.lite import Company as LiteCompany
-from duedil.search.pro import CompanySearchResult as ProCompanySearchResult, DirectorSearchResult
+from duedil.search.pro import (CompanySearchResult as ProCompanySearchResult, DirectorSearchResult,
+                               MergedSearchResourceList, ProSearchResourceList)
 from duedil.search.lite import CompanySearchResult as LiteCompanySearchResult
 from duedil.search.international import CompanySearchResult as InternationalCompanySearchResult, InternationalSearchResourceList
+from duedil.search import hydrate
+from duedil.resources.pro.company import Company, Director
+from duedil.cache import kwargs_key_generator
 
 API_KEY = '12345'
 
@@ -263,7 +267,123 @@ class ProClientTestCase(unittest.TestCase):
         results = self.client.search()
         self.assertEqual(len(results), 2)
         self.assertIn('api_key=12345', m._adapter.last_request.query)
-        self.assertIsInstance(results, list)
+        self.assertIsInstance(results, MergedSearchResourceList)
+        self.assertEqual(results.totals, {'companies': 1, 'directors': 1})
+        self.assertIsInstance(results[0], ProCompanySearchResult)
+        self.assertIsInstance(results[1], DirectorSearchResult)
+
+    @requests_mock.mock()
+    def test_search_merged_pages_and_dedupes(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/companies.json', [
+            {'json': {'response': {'data': [{'id': 'c1', 'name': 'A', 'turnover': 30},
+                                            {'id': 'c2', 'name': 'B', 'turnover': 10}],
+                                   'pagination': {'total': 3}}}},
+            {'json': {'response': {'data': [{'id': 'c2', 'name': 'B', 'turnover': 10},
+                                            {'id': 'c3', 'name': 'C', 'turnover': 5}],
+                                   'pagination': {'total': 3}}}},
+        ])
+        m.register_uri('GET', 'http://duedil.io/v3/directors.json',
+                       json={'response': {'data': [{'id': 'd1', 'name': 'D', 'turnover': 20}],
+                                          'pagination': {'total': 1}}})
+        results = self.client.search(order_by={'field': 'turnover', 'direction': 'desc'})
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(len(results), 4)
+        self.assertEqual([r.id for r in results], ['c1', 'd1', 'c2', 'c3'])
+        self.assertEqual(m.call_count, 3)
+        # already merged results are not fetched again
+        self.assertEqual(results[3].id, 'c3')
+        self.assertEqual(m.call_count, 3)
+
+    @requests_mock.mock()
+    def test_search_merged_negative_index(self, m):
+        # duedil counts c2 twice, the stream only returns it once
+        m.register_uri('GET', 'http://duedil.io/v3/companies.json', [
+            {'json': {'response': {'data': [{'id': 'c1', 'name': 'A'}, {'id': 'c2', 'name': 'B'}],
+                                   'pagination': {'total': 4}}}},
+            {'json': {'response': {'data': [{'id': 'c2', 'name': 'B'}, {'id': 'c3', 'name': 'C'}],
+                                   'pagination': {'total': 4}}}},
+        ])
+        m.register_uri('GET', 'http://duedil.io/v3/directors.json',
+                       json={'response': {'data': [{'id': 'd1', 'name': 'D'}], 'pagination': {'total': 1}}})
+        results = self.client.search()
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[-1].id, 'c3')
+        self.assertEqual(results[-4].id, 'c1')
+        self.assertRaises(IndexError, lambda: results[-5])
+
+
+class CountingCompanySearchResult(ProCompanySearchResult):
+    built = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingCompanySearchResult.built += 1
+        super(CountingCompanySearchResult, self).__init__(*args, **kwargs)
+
+
+class SearchResultListTestCase(unittest.TestCase):
+
+    client = ProClient(API_KEY)
+    page = {'response': {'data': [{'id': str(i), 'name': 'Company {0}'.format(i)} for i in range(5)],
+                         'pagination': {'total': 5}}}
+
+    def setUp(self):
+        CountingCompanySearchResult.built = 0
+
+    def test_rows_do_not_build_results(self):
+        results = ProSearchResourceList(self.page, CountingCompanySearchResult, self.client)
+        self.assertEqual(len(results), 5)
+        self.assertEqual([r['name'] for r in results.rows][-1], 'Company 4')
+        self.assertIn('3', results)
+        self.assertEqual(CountingCompanySearchResult.built, 0)
+
+    def test_results_built_on_access_once(self):
+        results = ProSearchResourceList(self.page, CountingCompanySearchResult, self.client)
+        self.assertEqual(results[2].name, 'Company 2')
+        self.assertEqual(CountingCompanySearchResult.built, 1)
+        self.assertIs(results[2], results[2])
+        self.assertEqual(CountingCompanySearchResult.built, 1)
+        self.assertEqual(len(list(results)), 5)
+        self.assertEqual(CountingCompanySearchResult.built, 5)
+
+    @requests_mock.mock()
+    def test_index_pages_forward(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/companies.json', [
+            {'json': {'response': {'data': [{'id': '1', 'name': 'One'}], 'pagination': {'total': 2}}}},
+            {'json': {'response': {'data': [{'id': '2', 'name': 'Two'}], 'pagination': {'total': 2}}}},
+        ])
+        results = self.client.search_company(name='Duedil')
+        self.assertEqual(results[1].id, '2')
+        self.assertEqual(m.call_count, 2)
+
+
+class SearchHydrationTestCase(unittest.TestCase):
+
+    client = ProClient(API_KEY)
+
+    def test_hydrated_once(self):
+        result = ProCompanySearchResult(self.client, id='06999618', name='Duedil Limited')
+        company = result.company
+        self.assertIsInstance(company, Company)
+        self.assertIs(result.company, company)
+        self.assertIs(ProCompanySearchResult.result_class('company'), Company)
+
+    def test_director_hydration_path(self):
+        result = DirectorSearchResult(self.client, id='12345', name='John Doe')
+        self.assertIsInstance(result.director, Director)
+
+    @requests_mock.mock()
+    def test_bulk_hydrate(self, m):
+        for company_id in ('1', '2', '3'):
+            m.register_uri('GET', 'http://duedil.io/v3/uk/companies/{0}.json'.format(company_id),
+                           json={'response': {'name': 'Company {0}'.format(company_id)}})
+        results = [ProCompanySearchResult(self.client, id=str(i)) for i in (1, 2, 3)]
+        companies = hydrate(results, fields=['company'])
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual([c.name for c in companies], ['Company 1', 'Company 2', 'Company 3'])
+        self.assertTrue(all(c.loaded for c in companies))
+        self.assertIs(results[0].company, companies[0])
+        hydrate(results)
+        self.assertEqual(m.call_count, 3)
 
 
 class SearchQueryTestCase(unittest.TestCase):
@@ -332,6 +452,58 @@ class SearchQueryTestCase(unittest.TestCase):
         self.client.search_company(offset=50)
         self.assertEqual(m._adapter.last_request.qs['offset'][0], '50')
 
+    @requests_mock.mock()
+    def test_search_order_default_direction(self, m):
+        m.register_uri('GET', self.url,
+                       json={
+                       'response':{'pagination':{'total':0}}
+                       })
+        self.client.search_company(order_by={'field': 'turnover'})
+        self.assertEqual(
+            json.loads(m._adapter.last_request.qs['orderby'][0]),
+            {"direction": "asc", "field": "turnover"})
+
+    def test_canonical_query(self):
+        query = self.client.company_query(turnover=[1e9, 0], name='Duedil',
+                                          order_by={'field': 'turnover'})
+        same = self.client.company_query(name='Duedil', turnover=(0, 1000000000),
+                                         order_by={'field': 'turnover', 'direction': 'asc'})
+        self.assertEqual(query, same)
+        self.assertEqual(hash(query), hash(same))
+        self.assertEqual(query.params(), same.params())
+        self.assertEqual(len({query, same}), 1)
+        self.assertEqual(query.params()['filters'],
+                         '{"name": "Duedil", "turnover": [0, 1000000000]}')
+
+    def test_query_endpoint_in_identity(self):
+        self.assertNotEqual(self.client.company_query(name='Duedil'),
+                            self.client.director_query(name='Duedil'))
+
+    def test_cache_key_ignores_kwarg_order(self):
+        def _get(endpoint, data=None):
+            pass
+        generate_key = kwargs_key_generator('ns', _get)
+        self.assertEqual(generate_key('companies', data={'filters': '{}', 'limit': 5}),
+                         generate_key('companies', data={'limit': 5, 'filters': '{}'}))
+
+    @requests_mock.mock()
+    def test_execute_pages_canonically(self, m):
+        m.register_uri('GET', self.url, [
+            {'json': {'response': {'data': [{'id': '1', 'name': 'One'}],
+                                   'pagination': {'total': 2, 'next_url': 'http://duedil.io/v3/companies.json?junk=1'}}}},
+            {'json': {'response': {'data': [{'id': '2', 'name': 'Two'}],
+                                   'pagination': {'total': 2}}}},
+        ])
+        query = self.client.company_query(name='Duedil', limit=1)
+        results = self.client.execute(query)
+        self.assertIs(results.query, query)
+        results.next()
+        self.assertEqual(len(results.result_list), 2)
+        last = m._adapter.last_request.qs
+        self.assertNotIn('junk', last)
+        self.assertEqual(last['offset'], ['1'])
+        self.assertEqual(last['limit'], ['1'])
+
 
 class I12ClientTestCase(unittest.TestCase):
 
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.crawler import Crawler, Edge, Node, DIRECTOR_OF, PARENT_OF
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+from duedil.transport import Transport, build_response
+
+API_KEY = '12345'
+
+# company 1 has director d1 and subsidiary 2, d1 also directs company 3
+GRAPH = {
+    'companies/1/directors': [{'id': 'd1', 'forename': 'Jane'}],
+    'companies/1/subsidiaries': [{'id': '2', 'name': 'Two'}],
+    'directors/d1/companies': [{'id': '1', 'name': 'One'}, {'id': '3', 'name': 'Three'}],
+    'companies/3/directors': [{'id': 'd2', 'forename': 'John'}],
+}
+
+
+def graph_response(request, context):
+    path = request.path[len('/v3/uk/'):-len('.json')]
+    if path.endswith('/parent'):
+        context.status_code = 404
+        return {}
+    data = GRAPH.get(path, [])
+    return {'response': {'data': data, 'pagination': {'total': len(data)}}}
+
+
+class GraphTransport(Transport):
+    'serves GRAPH a little slowly, counting the requests in flight'
+
+    def __init__(self):
+        super(GraphTransport, self).__init__()
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _send(self, url, params, timeout):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.02)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        path = url[len('http://duedil.io/v3/uk/'):-len('.json')]
+        if path.endswith('/parent'):
+            return build_response(url, 404, '{}')
+        data = GRAPH.get(path, [])
+        return build_response(url, 200, json.dumps({'response': {'data': data, 'pagination': {'total': len(data)}}}))
+
+
+class CrawlerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ProClient(API_KEY, session=Session())
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _mock(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/.*'), json=graph_response)
+
+    @requests_mock.mock()
+    def test_bfs(self, m):
+        self._mock(m)
+        seed = Company('1', client=self.client)
+        events = list(Crawler(self.client, max_depth=2).crawl([seed]))
+        nodes = [(e.kind, e.id, e.depth) for e in events if isinstance(e, Node)]
+        edges = set(e for e in events if isinstance(e, Edge))
+        self.assertEqual(nodes[0], ('company', '1', 0))
+        self.assertEqual(sorted(nodes), sorted([
+            ('company', '1', 0), ('director', 'd1', 1), ('company', '2', 1),
+            ('company', '3', 2)]))
+        self.assertIn(Edge(DIRECTOR_OF, ('director', 'uk', 'd1'), ('company', 'uk', '1')), edges)
+        self.assertIn(Edge(PARENT_OF, ('company', 'uk', '1'), ('company', 'uk', '2')), edges)
+        self.assertIn(Edge(DIRECTOR_OF, ('director', 'uk', 'd1'), ('company', 'uk', '3')), edges)
+        # d1 -> 1 is found from both sides but reported once
+        self.assertEqual(len(edges), len([e for e in events if isinstance(e, Edge)]))
+        # depth 2 nodes are not expanded
+        self.assertFalse([r for r in m.request_history if 'companies/3/' in r.path])
+        self.assertTrue([r for r in m.request_history if 'companies/2/' in r.path])
+
+    @requests_mock.mock()
+    def test_fan_out(self, m):
+        self._mock(m)
+        seed = Company('1', client=self.client)
+        events = list(Crawler(self.client, max_depth=2, fan_out=1, relations=('companies', 'directors')).crawl([seed]))
+        nodes = [e.id for e in events if isinstance(e, Node)]
+        self.assertEqual(nodes, ['1', 'd1'])
+
+    @requests_mock.mock()
+    def test_resume_from_checkpoint(self, m):
+        self._mock(m)
+        checkpoint = os.path.join(self.tmp, 'crawl.json')
+        crawler = Crawler(self.client, max_depth=3, max_workers=1, checkpoint=checkpoint)
+        stream = crawler.crawl([Company('1', client=self.client)])
+        # into the second batch, the first one is logged
+        first = [next(stream) for _ in range(6)]
+        with open(checkpoint) as log:
+            self.assertIn(['expand', 'company', 'uk', '1'], [json.loads(line) for line in log])
+        stream.close()
+        # compacted to what is left to crawl
+        with open(checkpoint) as log:
+            entries = [json.loads(line) for line in log]
+        self.assertEqual(sorted(entry[0] for entry in entries), ['seen', 'visit', 'visit'])
+
+        resumed = Crawler(ProClient(API_KEY), max_depth=3, max_workers=1, checkpoint=checkpoint)
+        rest = list(resumed.crawl())
+        nodes = set(e.id for e in first + rest if isinstance(e, Node))
+        self.assertEqual(nodes, set(['1', 'd1', '2', '3', 'd2']))
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_max_workers_bound_requests(self):
+        transport = GraphTransport()
+        client = ProClient(API_KEY, transport=transport, session=Session())
+        list(Crawler(client, max_depth=2, max_workers=2).crawl([Company('1', client=client)]))
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_strategy(self):
+        with self.assertRaises(ValueError):
+            Crawler(self.client, strategy='random')
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
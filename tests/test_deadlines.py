@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import time
+import unittest
+
+import requests_mock
+from requests.exceptions import ReadTimeout
+
+from duedil.api import DEFAULT_TIMEOUT, ProClient, retry_wait
+from duedil.concurrency import run_concurrently
+from duedil.crawler import Crawler
+from duedil.deadlines import DeadlineExceeded, current, deadline
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+from duedil.testing.stub import StubDataset, StubTransport
+from duedil.transport import Transport, build_response
+
+API_KEY = '12345'
+
+
+class TimeoutRecorder(Transport):
+
+    def __init__(self):
+        super(TimeoutRecorder, self).__init__()
+        self.timeouts = []
+
+    def _send(self, url, params, timeout):
+        self.timeouts.append(timeout)
+        return build_response(url, 200, '{"response": {}}')
+
+
+class TimeoutTestCase(unittest.TestCase):
+
+    def test_client_timeout(self):
+        transport = TimeoutRecorder()
+        ProClient(API_KEY, transport=transport).get('uk/companies/1')
+        ProClient(API_KEY, transport=transport, timeout=(1, 2)).get('uk/companies/1')
+        self.assertEqual(transport.timeouts, [DEFAULT_TIMEOUT, (1, 2)])
+
+    def test_capped_by_deadline(self):
+        transport = TimeoutRecorder()
+        with deadline(0.5):
+            ProClient(API_KEY, transport=transport, timeout=(0.1, 2)).get('uk/companies/1')
+            ProClient(API_KEY, transport=transport, timeout=5).get('uk/companies/1')
+        (connect, read), timeout = transport.timeouts
+        self.assertEqual(connect, 0.1)
+        self.assertLessEqual(read, 0.5)
+        self.assertLessEqual(timeout, 0.5)
+
+    def test_read_timeout(self):
+        client = ProClient(API_KEY, transport=StubTransport(StubDataset(size=5), latency=0.1), timeout=0.02)
+        self.assertRaises(ReadTimeout, client.get, 'uk/companies/1')
+
+
+class DeadlineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = StubTransport(StubDataset(size=20), latency=0.05)
+        self.client = ProClient(API_KEY, transport=self.transport)
+
+    def test_expired(self):
+        with deadline(0):
+            self.assertRaises(DeadlineExceeded, self.client.get, 'uk/companies/1')
+        self.assertEqual(self.transport.stats.requests, 0)
+        self.assertIsNone(current())
+
+    def test_cuts_request_short(self):
+        start = time.time()
+        with deadline(0.01):
+            self.assertRaises(DeadlineExceeded, self.client.get, 'uk/companies/1')
+        self.assertLess(time.time() - start, 0.05)
+
+    def test_nested(self):
+        with deadline(0.1) as outer:
+            with deadline(10) as inner:
+                self.assertIs(current(), inner)
+                self.assertLessEqual(inner.remaining(), 0.1)
+            self.assertIs(current(), outer)
+
+    def test_propagated_to_workers(self):
+        with deadline(1) as outer:
+            self.assertEqual(run_concurrently([current, current, current]), [outer] * 3)
+
+    def test_get_many(self):
+        endpoints = ['uk/companies/{0}'.format(i) for i in range(1, 17)]
+        with deadline(0.12):
+            self.assertRaises(DeadlineExceeded, self.client.get_many, endpoints, max_workers=2)
+        with deadline(0.12, partial=True):
+            results = self.client.get_many(endpoints, max_workers=2)
+        self.assertEqual(results[0]['response']['id'], '1')
+        self.assertIsNone(results[-1])
+
+    def test_throttling_retries(self):
+        with requests_mock.mock() as m:
+            m.get(requests_mock.ANY, status_code=403, reason='Forbidden - Over rate limit',
+                  text='Developer Over Qps')
+            start = time.time()
+            with deadline(0.5):
+                self.assertRaises(DeadlineExceeded, ProClient(API_KEY).get, 'uk/companies/1')
+            self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(retry_wait(3), 8000)
+        self.assertEqual(retry_wait(5), 10000)
+
+    def test_prefetch_related_partial(self):
+        company = Company.instance(ProClient(API_KEY, transport=self.transport, session=Session()), '1')
+        with deadline(0, partial=True):
+            company.prefetch_related('directors', 'subsidiaries')
+        self.assertEqual(self.transport.stats.requests, 0)
+        self.assertTrue(len(company.directors))
+
+    def test_crawl_partial(self):
+        client = ProClient(API_KEY, transport=self.transport, session=Session())
+        crawler = Crawler(client, max_depth=1)
+        with deadline(0, partial=True):
+            nodes = list(crawler.crawl([Company.instance(client, '1')]))
+        self.assertEqual([node.id for node in nodes], ['1'])
+        self.assertEqual([node.id for node in crawler.frontier], ['1'])
+        # resumed from the frontier once there is time
+        self.assertTrue(list(crawler.crawl()))
+        self.assertFalse(crawler.frontier)
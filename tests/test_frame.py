@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import re
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.frame import CompanyFrame, np
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+API_KEY = '12345'
+
+PAYLOADS = [
+    {'response': {'id': '1', 'name': 'One', 'status': 'Active', 'company_type': 'Private',
+                  'sic_code': 6201, 'accounts_turnover': 100, 'accounts_no_of_employees': '10'}},
+    {'response': {'id': '2', 'name': 'Two', 'status': 'Dissolved', 'company_type': 'Private',
+                  'sic_code': 6201, 'accounts_turnover': None}},
+    {'id': '3', 'name': 'Three', 'status': 'Active', 'company_type': 'Public',
+     'sic_code': 4711, 'accounts_turnover': 300, 'accounts_no_of_employees': 30},
+    {'id': '4', 'name': 'Four', 'company_type': 'Private', 'sic_code': 4711, 'accounts_turnover': 50},
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class CompanyFrameTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = CompanyFrame.from_payloads(PAYLOADS)
+
+    def test_columns(self):
+        frame = self.frame
+        self.assertEqual(len(frame), 4)
+        self.assertEqual(frame['accounts_turnover'].dtype, np.float64)
+        self.assertTrue(np.isnan(frame['accounts_turnover'][1]))
+        self.assertEqual(list(frame['accounts_no_of_employees'][[0, 2]]), [10.0, 30.0])
+        self.assertEqual(frame.categories['status'], ['Active', 'Dissolved'])
+        self.assertEqual(list(frame['status']), [0, 1, 0, -1])
+        self.assertEqual(list(frame.decoded('sic_code')), ['6201', '6201', '4711', '4711'])
+        self.assertEqual(list(frame.decoded('status')), ['Active', 'Dissolved', 'Active', None])
+
+    def test_dates_and_strings(self):
+        payloads = [
+            {'id': '1', 'accounts_turnover': '100', 'accounts_date': '2015-03-31', 'accounts_currency': 'GBP',
+             'accounts_url': 'http://duedil.io/v3/uk/companies/1/accounts', 'accounts_account_status': 'Filed',
+             'accounts_accounts_format': 'Full'},
+            {'id': '2', 'accounts_date': None, 'accounts_currency': 'EUR'},
+        ]
+        frame = CompanyFrame.from_payloads(payloads)
+        self.assertEqual(list(frame['accounts_turnover'][:1]), [100.0])
+        self.assertEqual(str(frame['accounts_date'][0]), '2015-03-31')
+        self.assertTrue(np.isnat(frame['accounts_date'][1]))
+        self.assertEqual(list(frame['accounts_currency']), ['GBP', 'EUR'])
+        self.assertEqual(list(frame['accounts_url']), ['http://duedil.io/v3/uk/companies/1/accounts', None])
+        self.assertEqual(list(frame['accounts_account_status']), ['Filed', None])
+        self.assertEqual(list(frame['accounts_accounts_format']), ['Full', None])
+        self.assertEqual(list(frame.sort('accounts_date', ascending=False)['id']), ['1', '2'])
+        self.assertEqual(len(frame.group_by('accounts_date')), 1)
+
+    def test_filter(self):
+        frame = self.frame
+        active = frame.filter(frame['accounts_turnover'] > 60, status='Active')
+        self.assertEqual(list(active['id']), ['1', '3'])
+        self.assertEqual(len(frame.filter(status='Unknown')), 0)
+
+    def test_sort(self):
+        by_turnover = self.frame.sort('accounts_turnover', ascending=False)
+        self.assertEqual(list(by_turnover['id']), ['3', '1', '4', '2'])
+        by_status = self.frame.sort('status')
+        self.assertEqual(list(by_status['id']), ['1', '3', '2', '4'])
+        self.assertEqual(list(self.frame.sort('name')['id']), ['4', '1', '3', '2'])
+
+    def test_group_by(self):
+        grouped = self.frame.group_by('sic_code')
+        self.assertEqual(list(grouped.size()), [2, 2])
+        sectors = grouped.agg(turnover=('accounts_turnover', 'sum'),
+                              employees=('accounts_no_of_employees', 'mean'),
+                              largest=('accounts_turnover', 'max'),
+                              reported=('accounts_turnover', 'count'))
+        self.assertEqual(list(sectors.decoded('sic_code')), ['4711', '6201'])
+        self.assertEqual(list(sectors['turnover']), [350.0, 100.0])
+        self.assertEqual(list(sectors['employees']), [30.0, 10.0])
+        self.assertEqual(list(sectors['largest']), [300.0, 100.0])
+        self.assertEqual(list(sectors['reported']), [2, 1])
+
+    def test_group_without_values(self):
+        grouped = self.frame.group_by('status')
+        # no Dissolved company reported a turnover
+        for how in ('sum', 'mean', 'min', 'max'):
+            self.assertTrue(np.isnan(grouped.aggregate('accounts_turnover', how)[1]), how)
+        self.assertEqual(list(grouped.aggregate('accounts_turnover', 'sum')[:1]), [400.0])
+        self.assertEqual(list(grouped.aggregate('accounts_turnover', 'count')), [2, 0])
+
+    @requests_mock.mock()
+    def test_fetch(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'),
+                       json=lambda request, context: PAYLOADS[int(request.path[-6]) - 1])
+        frame = CompanyFrame.fetch(ProClient(API_KEY), ['1', '2'])
+        self.assertEqual(list(frame['id']), ['1', '2'])
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_to_pandas(self):
+        df = self.frame.to_pandas()
+        self.assertEqual(list(df['status'].cat.categories), ['Active', 'Dissolved'])
+        self.assertEqual(list(df['id']), ['1', '2', '3', '4'])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_to_arrow(self):
+        table = self.frame.to_arrow()
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column('status').to_pylist(), ['Active', 'Dissolved', 'Active', None])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
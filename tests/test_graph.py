@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import shutil
+import tempfile
+import unittest
+
+from duedil.api import ProClient
+from duedil.crawler import Edge, Node, DIRECTOR_OF, PARENT_OF
+from duedil.graph import CompanyGraph, np
+from duedil.resources.pro.company import Company, Director
+
+API_KEY = '12345'
+
+ONE = ('company', 'uk', '1')
+TWO = ('company', 'uk', '2')
+JANE = ('director', 'uk', 'd1')
+
+
+def events():
+    client = ProClient(API_KEY)
+    return [
+        Node('company', 'uk', '1', 0, Company('1', client=client, name='One')),
+        Node('director', 'uk', 'd1', 1, Director('d1', client=client)),
+        Edge(DIRECTOR_OF, JANE, ONE),
+        Node('company', 'uk', '2', 1, Company('2', client=client, name='Two')),
+        Edge(PARENT_OF, ONE, TWO),
+        Edge(DIRECTOR_OF, JANE, TWO),
+    ]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class CompanyGraphTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = CompanyGraph.from_crawl(events())
+
+    def test_interning(self):
+        self.assertEqual(len(self.graph), 3)
+        self.assertEqual(self.graph.node_id(ONE), 0)
+        self.assertEqual(self.graph.key(1), JANE)
+        self.assertEqual(list(self.graph.columns['name']), ['One', '', 'Two'])
+
+    def test_csr(self):
+        jane = self.graph.node_id(JANE)
+        self.assertEqual(sorted(self.graph.neighbours(jane, DIRECTOR_OF)), [0, 2])
+        self.assertEqual(list(self.graph.neighbours(0, PARENT_OF)), [2])
+        self.assertEqual(list(self.graph.neighbours(0, DIRECTOR_OF)), [])
+        self.assertEqual(self.graph.edge_count(), 3)
+
+    def test_save_load_mmap(self):
+        path = tempfile.mkdtemp()
+        try:
+            self.graph.save(path)
+            loaded = CompanyGraph.load(path)
+            self.assertIsInstance(loaded.edges[DIRECTOR_OF][1], np.memmap)
+            self.assertEqual(loaded.key(2), TWO)
+            self.assertEqual(list(loaded.neighbours(loaded.node_id(JANE), DIRECTOR_OF)),
+                             list(self.graph.neighbours(1, DIRECTOR_OF)))
+            self.assertEqual(list(loaded.columns['name']), ['One', '', 'Two'])
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import re
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.groups import GroupResolver
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+
+API_KEY = '12345'
+
+PARENTS = {'1': '10', '2': '10', '10': '100', '7': '8', '8': '7'}
+SUBSIDIARIES = {'100': ['10'], '10': ['1', '2']}
+
+
+def group_response(request, context):
+    company_id, relation = request.path[len('/v3/uk/companies/'):-len('.json')].split('/')
+    if relation == 'parent':
+        if company_id not in PARENTS:
+            context.status_code = 404
+            return {}
+        return {'response': {'id': PARENTS[company_id], 'name': 'Parent'}}
+    data = [{'id': i} for i in SUBSIDIARIES.get(company_id, [])]
+    return {'response': {'data': data, 'pagination': {'total': len(data)}}}
+
+
+class GroupResolverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ProClient(API_KEY, session=Session())
+
+    def _company(self, company_id):
+        return Company.instance(self.client, company_id)
+
+    @requests_mock.mock()
+    def test_resolve_shares_paths(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=group_response)
+        groups = GroupResolver().resolve([self._company('1'), self._company('2'), self._company('100')])
+        self.assertEqual([(g.ultimate_parent.id, g.depth, g.cyclic) for g in groups],
+                         [('100', 2, False), ('100', 2, False), ('100', 0, False)])
+        # 1, 2 and 100 together, then 10 once
+        self.assertEqual(m.call_count, 4)
+
+    @requests_mock.mock()
+    def test_cycle(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=group_response)
+        group = GroupResolver().resolve([self._company('7')])[0]
+        self.assertTrue(group.cyclic)
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_group_trees(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=group_response)
+        resolver = GroupResolver()
+        first, second = resolver.group_trees([self._company('1'), self._company('2')])
+        self.assertIs(first, second)
+        self.assertEqual(first.company.id, '100')
+        middle = first.subsidiaries[0]
+        self.assertEqual(middle.company.id, '10')
+        self.assertEqual(sorted(t.company.id for t in middle.subsidiaries), ['1', '2'])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import threading
+import time
+import unittest
+
+from duedil.api import ProClient
+from duedil.deadlines import DeadlineExceeded, deadline
+from duedil.hedging import HedgingPolicy
+from duedil.metrics import HEDGES, Metrics
+from duedil.ratelimit import TokenBucket
+from duedil.transport import Transport, build_response
+
+API_KEY = '12345'
+COMPANY = '{locale}/companies/{id}'
+
+
+class Scripted(Transport):
+    'answers after the next of delays, then after default'
+
+    def __init__(self, delays=(), default=0.005):
+        super(Scripted, self).__init__()
+        self.delays = list(delays)
+        self.default = default
+        self._lock = threading.Lock()
+
+    def _send(self, url, params, timeout):
+        with self._lock:
+            delay = self.delays.pop(0) if self.delays else self.default
+        time.sleep(delay)
+        return build_response(url, 200, '{"response": {"id": "1"}}')
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_acquire(self):
+        bucket = TokenBucket(50, burst=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertFalse(bucket.acquire(timeout=0.001))
+        start = time.time()
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.time() - start, 0.01)
+        bucket = TokenBucket(10, burst=1)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertTrue(0.09 <= bucket.reserve() <= 0.1)
+        self.assertIsNone(bucket.reserve(timeout=0.1))
+
+    def test_client(self):
+        client = ProClient(API_KEY, transport=Scripted(default=0), rate_limiter=TokenBucket(50, burst=1))
+        start = time.time()
+        for _ in range(6):
+            client.get('uk/companies/1')
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        with deadline(0.001):
+            self.assertRaises(DeadlineExceeded, client.get, 'uk/companies/1')
+
+
+class HedgingPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def client(self, transport, **kwargs):
+        kwargs.setdefault('min_samples', 10)
+        kwargs.setdefault('max_ratio', 1.0)
+        rate_limiter = kwargs.pop('rate_limiter', None)
+        self.policy = HedgingPolicy(**kwargs)
+        self.addCleanup(self.policy.close)
+        # latencies seen before, requests made to learn them could be hedged themselves
+        for _ in range(20):
+            self.policy.observe(COMPANY, 0.005)
+        return ProClient(API_KEY, transport=transport, metrics=self.metrics, hedging=self.policy,
+                         rate_limiter=rate_limiter)
+
+    def test_percentile(self):
+        policy = HedgingPolicy(min_samples=10)
+        for i in range(9):
+            policy.observe(COMPANY, 0.01)
+        self.assertIsNone(policy.delay(COMPANY))
+        for i in range(91):
+            policy.observe(COMPANY, i / 1000.0)
+        # recomputed every tenth of the window, so near the 95th percentile of all 100
+        self.assertTrue(0.075 <= policy.delay(COMPANY) <= 0.085)
+        self.assertIsNone(policy.delay('{locale}/companies/{id}/directors'))
+        policy.min_delay = 0.5
+        self.assertEqual(policy.delay(COMPANY), 0.5)
+
+    def test_hedge_wins(self):
+        client = self.client(Scripted([2.0]))
+        start = time.time()
+        self.assertEqual(client.get('uk/companies/1'), {'response': {'id': '1'}})
+        self.assertLess(time.time() - start, 1.0)
+        stats = self.policy.stats()
+        self.assertEqual((stats['requests'], stats['hedges'], stats['wins']), (1, 1, 1))
+        self.assertIn(COMPANY, stats['delays'])
+        self.assertEqual(self.metrics.counter(HEDGES, endpoint=COMPANY, outcome='won'), 1)
+
+    def test_first_wins(self):
+        client = self.client(Scripted([0.1, 1.0]))
+        client.get('uk/companies/1')
+        self.assertEqual(self.metrics.counter(HEDGES, endpoint=COMPANY, outcome='lost'), 1)
+
+    def test_over_budget(self):
+        client = self.client(Scripted([0.2]), max_ratio=0.01)
+        start = time.time()
+        client.get('uk/companies/1')
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        self.assertEqual(self.policy.stats()['hedges'], 0)
+        self.assertEqual(self.metrics.counter(HEDGES, endpoint=COMPANY, outcome='over_budget'), 1)
+
+    def test_rate_limited(self):
+        # the request takes the only token, none is left for its hedge
+        client = self.client(Scripted([0.2]), rate_limiter=TokenBucket(0.001, burst=1))
+        client.get('uk/companies/1')
+        self.assertEqual(self.policy.stats()['hedges'], 0)
+        self.assertEqual(self.metrics.counter(HEDGES, endpoint=COMPANY, outcome='rate_limited'), 1)
+
+    def test_workers_busy(self):
+        client = self.client(Scripted(default=0.2), max_workers=1, max_ratio=0)
+        start = time.time()
+        threads = [threading.Thread(target=client.get, args=('uk/companies/1',)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # sent together rather than one after the other on the only worker
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(self.policy.stats()['requests'], 3)
+        self.assertEqual(self.policy._in_flight, 0)
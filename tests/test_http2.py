@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import unittest
+
+from duedil.http2 import httpx
+from duedil.testing.stub import StubDataset, StubH2Server, h2
+
+
+@unittest.skipIf(httpx is None or h2 is None, 'httpx and h2 are not installed')
+class HTTP2TransportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubH2Server(StubDataset(size=50), latency=0.05).start()
+        self.client = self.server.client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_get_many_multiplexed(self):
+        endpoints = ['uk/companies/{0}'.format(i) for i in range(1, 33)]
+        results = self.client.get_many(endpoints)
+        self.assertEqual([r['response']['id'] for r in results], [str(i) for i in range(1, 33)])
+        self.assertLessEqual(self.server.connections, 2)
+        self.assertEqual(self.server.requests, 32)
+        # the streams sharing a connection were answered concurrently
+        self.assertGreater(self.server.max_in_flight, 2)
+        stats = self.client.transport.connection_stats()
+        self.assertEqual(stats['requests'], 32)
+        self.assertEqual(stats['responses_by_http_version'], {'HTTP/2': 32})
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get('uk/companies/51'), {})
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import threading
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.concurrency import map_concurrently
+from duedil.metrics import (Metrics, endpoint_class, CACHE, DURATION, NOT_FOUND,
+                            REQUESTS, RESPONSE_BYTES, RETRIES)
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+
+API_KEY = '12345'
+
+COMPANY = '{locale}/companies/{id}'
+
+
+class EndpointClassTestCase(unittest.TestCase):
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class('uk/companies/06999618/directors'),
+                         '{locale}/companies/{id}/directors')
+        self.assertEqual(endpoint_class('http://duedil.io/v3/roi/companies/1/accounts/2.json?limit=5',
+                                        'http://duedil.io/v3'),
+                         '{locale}/companies/{id}/accounts/{id}')
+        self.assertEqual(endpoint_class('companies'), 'companies')
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.client = ProClient(API_KEY, session=Session(), metrics=self.metrics)
+
+    @requests_mock.mock()
+    def test_requests(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/1.json', text='{"response": {"id": "1"}}')
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/2.json', status_code=404)
+        self.client.get('uk/companies/1')
+        self.client.get('uk/companies/2')
+        metrics = self.metrics
+        self.assertEqual(metrics.counter(REQUESTS, endpoint=COMPANY, status='200'), 1)
+        self.assertEqual(metrics.counter(REQUESTS, endpoint=COMPANY, status='404'), 1)
+        self.assertEqual(metrics.counter(NOT_FOUND, endpoint=COMPANY), 1)
+        self.assertEqual(metrics.counter(RESPONSE_BYTES, endpoint=COMPANY), 25)
+        self.assertEqual(metrics.counter(CACHE, tier='dogpile', result='miss'), 2)
+        histogram = metrics.snapshot()['histograms'][DURATION][(('endpoint', COMPANY),)]
+        self.assertEqual(histogram['count'], 2)
+        self.assertEqual(histogram['buckets'][float('inf')], 2)
+
+    @requests_mock.mock()
+    def test_retries(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/1.json', [
+            {'status_code': 403, 'reason': 'Forbidden - Over rate limit', 'text': 'Developer Over Qps'},
+            {'json': {'response': {'id': '1'}}},
+        ])
+        self.client.get('uk/companies/1')
+        self.assertEqual(self.metrics.counter(RETRIES, endpoint=COMPANY), 1)
+        self.assertEqual(self.metrics.counter(REQUESTS, endpoint=COMPANY, status='403'), 1)
+
+    def test_session_tier(self):
+        Company.instance(self.client, '1')
+        Company.instance(self.client, '1')
+        self.assertEqual(self.metrics.counter(CACHE, tier='session', result='miss'), 1)
+        self.assertEqual(self.metrics.counter(CACHE, tier='session', result='hit'), 1)
+
+    def test_threads(self):
+        def work():
+            for _ in range(1000):
+                self.metrics.increment('work_total', kind='a')
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.metrics.counter('work_total', kind='a'), 4000)
+
+    def test_ended_threads_retired(self):
+        for _ in range(50):
+            map_concurrently(lambda i: self.metrics.increment('work_total', kind='a'), range(2))
+        self.assertEqual(self.metrics.counter('work_total', kind='a'), 100)
+        # the pools' threads are gone, their counts stay
+        self.assertLessEqual(len(self.metrics._shards), 3)
+
+    @requests_mock.mock()
+    def test_hooks_overridden(self, m):
+        class Client(ProClient):
+            def pre_request_hook(self, endpoint, data):
+                pass
+
+            def post_request_hook(self, response):
+                pass
+
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/1.json', json={'response': {'id': '1'}})
+        Client(API_KEY, metrics=self.metrics).get('uk/companies/1')
+        self.assertEqual(self.metrics.counter(REQUESTS, endpoint=COMPANY, status='200'), 1)
+        self.assertEqual(self.metrics.counter(CACHE, tier='dogpile', result='miss'), 1)
+
+    def test_prometheus(self):
+        self.metrics.increment(REQUESTS, endpoint=COMPANY, status='200')
+        self.metrics.observe(DURATION, 0.02, endpoint=COMPANY)
+        text = self.metrics.prometheus()
+        self.assertIn('# TYPE duedil_requests_total counter\n', text)
+        self.assertIn('duedil_requests_total{endpoint="{locale}/companies/{id}",status="200"} 1\n', text)
+        self.assertIn('duedil_request_duration_seconds_bucket{endpoint="{locale}/companies/{id}",le="0.01"} 0\n',
+                      text)
+        self.assertIn('duedil_request_duration_seconds_bucket{endpoint="{locale}/companies/{id}",le="0.025"} 1\n',
+                      text)
+        self.assertIn('duedil_request_duration_seconds_bucket{endpoint="{locale}/companies/{id}",le="+Inf"} 1\n',
+                      text)
+        self.assertIn('duedil_request_duration_seconds_count{endpoint="{locale}/companies/{id}"} 1\n', text)
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import re
+import unittest
+import warnings
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.nplusone import NPlusOneDetector, NPlusOneError, NPlusOneWarning, detect_n_plus_one
+from duedil.resources import prefetch_related
+from duedil.resources.pro.company import Company
+
+API_KEY = '12345'
+
+
+def company_response(request, context):
+    path = request.path[len('/v3/uk/companies/'):-len('.json')]
+    if '/' in path:
+        return {'response': {'data': [], 'pagination': {'total': 0}}}
+    return {'response': {'id': path, 'name': 'Company ' + path}}
+
+
+class NPlusOneTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ProClient(API_KEY)
+        self.companies = [Company(str(i), client=self.client) for i in range(6)]
+
+    @requests_mock.mock()
+    def test_raise(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        with self.assertRaises(NPlusOneError) as raised:
+            with detect_n_plus_one(threshold=3, mode='raise'):
+                [company.name for company in self.companies]
+        message = str(raised.exception)
+        self.assertIn('Company.name was loaded one at a time 3 times', message)
+        self.assertIn('test_nplusone.py', message)
+        self.assertIn('Client.get_many', message)
+
+    @requests_mock.mock()
+    def test_warn_related(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with NPlusOneDetector(threshold=3) as detector:
+                for company in self.companies:
+                    company.directors
+        self.assertEqual(len(detector.found), 1)
+        self.assertEqual([w.category for w in caught], [NPlusOneWarning])
+        self.assertIn("prefetch_related(resources, 'directors')", detector.found[0])
+
+    @requests_mock.mock()
+    def test_batches_and_window(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        with NPlusOneDetector(threshold=3, mode='raise') as detector:
+            prefetch_related(self.companies, 'directors')
+            [company.directors for company in self.companies]
+        self.assertEqual(detector.found, [])
+        with NPlusOneDetector(threshold=3, window=0, mode='raise') as detector:
+            [company.name for company in self.companies]
+        self.assertEqual(detector.found, [])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
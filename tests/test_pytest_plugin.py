@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+from __future__ import unicode_literals
+
+import unittest
+
+import pytest
+
+pytest_plugins = 'pytester'
+
+LOOP = '''
+import re
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.cache import configure_cache, dp_region
+from duedil.resources.pro.company import Company
+
+if not dp_region.is_configured:
+    configure_cache('dogpile.cache.null')
+
+
+def company_response(request, context):
+    return {'response': {'id': '1', 'name': 'Company'}}
+
+
+def test_loop(request):
+    client = ProClient('12345')
+    with requests_mock.mock() as m:
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        [Company(str(i), client=client).name for i in range(6)]
+'''
+
+
+class PytestPluginTestCase(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _pytester(self, request):
+        # testdir on the pytest versions before pytester
+        self.pytester = request.getfixturevalue('pytester' if hasattr(pytest, 'Pytester') else 'testdir')
+        # the plugin is already loaded when duedil is installed
+        self.plugin = [] if request.config.pluginmanager.hasplugin('duedil') else ['-p', 'duedil.testing.pytest_plugin']
+
+    def run_loop(self, *args, **kwargs):
+        self.pytester.makepyfile(kwargs.get('source', LOOP))
+        return self.pytester.runpytest(*(self.plugin + list(args)))
+
+    def test_opt_in(self):
+        result = self.run_loop()
+        result.assert_outcomes(passed=1)
+        # nothing traced without the option
+        self.assertNotIn('NPlusOne', result.stdout.str())
+
+    def test_option(self):
+        result = self.run_loop('--duedil-n-plus-one')
+        result.assert_outcomes(failed=1)
+        result.stdout.fnmatch_lines(['*NPlusOneError: N+1 lazy loads: Company.name*'])
+        self.run_loop('--duedil-n-plus-one', '--duedil-n-plus-one-threshold=10').assert_outcomes(passed=1)
+
+    def test_fixture(self):
+        result = self.run_loop(source=LOOP.replace('test_loop(request)', 'test_loop(n_plus_one)'))
+        result.assert_outcomes(failed=1)
+        result.stdout.fnmatch_lines(['*NPlusOneError: N+1 lazy loads: Company.name*'])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
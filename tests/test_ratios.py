@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import unittest
+
+from duedil.api import ProClient
+from duedil.ratios import account_columns, compute_ratios, deltas, ratio_frame, np
+from duedil.resources.pro.company import AccountDetailsGAAP
+
+API_KEY = '12345'
+
+RECORDS = [
+    {'company': '1', 'date': '2013-12-31', 'assets_total_current': 300, 'liabilities_current': 150,
+     'stock': 60, 'turnover': 1000, 'pre_tax_profit': 100, 'shareholder_funds': 400,
+     'lt_loans': 100, 'assets_total': 800},
+    {'company': '1', 'date': '2012-12-31', 'assets_total_current': 200, 'liabilities_current': 100,
+     'stock': 40, 'turnover': 800, 'pre_tax_profit': 0, 'shareholder_funds': 400,
+     'lt_loans': 200, 'assets_total': 600},
+    # other accounts type, no current liabilities filed
+    {'response': {'company': '2', 'date': '2013-06-30', 'assets_total_current': 50,
+                  'turnover': 0, 'total_shareholders_funds': 0}},
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class RatioTestCase(unittest.TestCase):
+
+    def test_ratios(self):
+        ratios = compute_ratios(account_columns(RECORDS))
+        np.testing.assert_allclose(ratios['current_ratio'], [2.0, 2.0, np.nan])
+        np.testing.assert_allclose(ratios['liquidity_ratio'], [1.6, 1.6, np.nan])
+        np.testing.assert_allclose(ratios['gearing'], [25.0, 50.0, np.nan])
+        np.testing.assert_allclose(ratios['profit_ratio'], [10.0, 0.0, np.nan])
+        np.testing.assert_allclose(ratios['return_on_assets_ratio'], [12.5, 0.0, np.nan])
+        # capital employed falls back to total assets less current liabilities
+        np.testing.assert_allclose(ratios['return_on_capital_employed'], [100.0 / 650 * 100, 0.0, np.nan])
+
+    def test_missing_debt(self):
+        ratios = compute_ratios({'shareholder_funds': [100.0, 100.0], 'bank_overdraft': [np.nan, 20.0]},
+                                ['gearing', 'debt_to_capital_ratio', 'liquidity_ratio'])
+        # no loan or overdraft line known is no gearing known, one known is enough
+        np.testing.assert_allclose(ratios['gearing'], [np.nan, 20.0])
+        np.testing.assert_allclose(ratios['debt_to_capital_ratio'], [np.nan, 20.0 / 120])
+        np.testing.assert_allclose(ratios['liquidity_ratio'], [np.nan, np.nan])
+
+    def test_aliases_and_resources(self):
+        details = AccountDetailsGAAP('g1', client=ProClient(API_KEY), company='3', date='2014-01-31',
+                                     liabilities_total_current=10, assets_total_current=25)
+        ratios = compute_ratios(account_columns([details]), ['current_ratio'])
+        self.assertEqual(list(ratios['current_ratio']), [2.5])
+
+    def test_deltas(self):
+        columns = account_columns(RECORDS)
+        changes = deltas(columns, ['turnover', 'pre_tax_profit'])
+        np.testing.assert_allclose(changes['turnover_delta'], [200.0, np.nan, np.nan])
+        np.testing.assert_allclose(changes['turnover_delta_percentage'], [25.0, np.nan, np.nan])
+        # growth from 0 has no percentage
+        np.testing.assert_allclose(changes['pre_tax_profit_delta'], [100.0, np.nan, np.nan])
+        np.testing.assert_allclose(changes['pre_tax_profit_delta_percentage'], [np.nan] * 3)
+
+    def test_ratio_frame(self):
+        frame = ratio_frame(RECORDS, ['current_ratio', 'gearing'])
+        self.assertEqual(len(frame), 3)
+        np.testing.assert_allclose(frame['gearing_delta'], [-25.0, np.nan, np.nan])
+        latest = frame.sort('date', ascending=False)
+        self.assertEqual(list(latest['company']), ['1', '2', '1'])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -24,17 +24,15 @@ import unittest
 import requests_mock
 # from requests.exceptions import HTTPError
 
-from duedil.resources import Resource, ProResource, RelatedResourceMixin
+from duedil.resources import Resource, ProResource, RelatedResourceMixin, RelatedResourceList, prefetch_related
 from duedil.resources.pro.company import Company
 from duedil.resources.lite import Company as LiteCompany
-from duedil.cache import configure_cache
+from duedil.api import ProClient
+from duedil.session import Session
 
 API_KEY = '12345'
 
 
-cache_region = configure_cache('dogpile.cache.null')
-
-
 class TestResource(Resource):
     pass
 
@@ -216,6 +214,114 @@ class RelatedResourceTestCase(unittest.TestCase):
         related = res.test_related_list
         self.assertIsInstance(related[0], TestRelatedListResource)
 
+    @requests_mock.mock()
+    def test_load_related_paginated(self, m):
+        url = 'http://duedil.io/v3/uk/test/12345/test-related-list.json'
+        m.register_uri('GET', url, [
+            {'json': {'response': {
+                'pagination': {'total': 3, 'offset': 0, 'limit': 2},
+                'data': [{'name': 'One', 'id': '1'}, {'name': 'Two', 'id': '2'}]}}},
+            {'json': {'response': {
+                'pagination': {'total': 3, 'offset': 2, 'limit': 2},
+                'data': [{'name': 'Three', 'id': '3'}]}}},
+        ])
+        res = TestHasRelatedResources(api_key=API_KEY, id=12345)
+        related = res.test_related_list
+        self.assertIsInstance(related, RelatedResourceList)
+        self.assertEqual(len(related), 3)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(m.request_history[0].qs['limit'], ['100'])
+        self.assertEqual([r.name for r in related], ['One', 'Two', 'Three'])
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(m.request_history[1].qs['offset'], ['2'])
+        self.assertIs(res.test_related_list, related)
+        self.assertEqual(related[2].id, '3')
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_load_related_index_pages(self, m):
+        url = 'http://duedil.io/v3/uk/test/12345/test-related-list.json'
+        m.register_uri('GET', url, [
+            {'json': {'response': {
+                'pagination': {'total': 2},
+                'data': [{'name': 'One', 'id': '1'}]}}},
+            {'json': {'response': {
+                'pagination': {'total': 2},
+                'data': [{'name': 'Two', 'id': '2'}]}}},
+        ])
+        related = TestHasRelatedResources(api_key=API_KEY, id=12345).test_related_list
+        self.assertEqual(related[-1].name, 'Two')
+        with self.assertRaises(IndexError):
+            related[2]
+
+
+class PrefetchRelatedTestCase(unittest.TestCase):
+
+    def _register(self, m, company_id):
+        m.register_uri('GET', 'http://duedil.io/v3/uk/test/{0}/test-related.json'.format(company_id),
+                       json={'response': {'name': 'Related {0}'.format(company_id), 'id': '1'}})
+        m.register_uri('GET', 'http://duedil.io/v3/uk/test/{0}/test-related-list.json'.format(company_id),
+                       json={'response': {'data': [{'name': 'Listed', 'id': '2'}],
+                                          'pagination': {'total': 1}}})
+
+    @requests_mock.mock()
+    def test_prefetch_related(self, m):
+        self._register(m, 12345)
+        res = TestHasRelatedResources(api_key=API_KEY, id=12345)
+        self.assertIs(res.prefetch_related('test-related', 'test_related_list'), res)
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(res.test_related.name, 'Related 12345')
+        self.assertEqual(res.test_related_list[0].name, 'Listed')
+        res.prefetch_related('test-related')
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_prefetch_related_bulk(self, m):
+        for company_id in (1, 2, 3):
+            self._register(m, company_id)
+        resources = [TestHasRelatedResources(api_key=API_KEY, id=i) for i in (1, 2, 3)]
+        prefetch_related(resources, 'test-related', max_workers=2)
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual([r.test_related.name for r in resources],
+                         ['Related 1', 'Related 2', 'Related 3'])
+        self.assertEqual(m.call_count, 3)
+
+    def test_prefetch_unknown(self):
+        res = TestHasRelatedResources(api_key=API_KEY, id=12345)
+        with self.assertRaises(ValueError):
+            res.prefetch_related('not-related')
+
+
+class SessionTestCase(unittest.TestCase):
+
+    @requests_mock.mock()
+    def test_related_share_identity(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/uk/test/1/test-loadable.json',
+                       json={'response': {'name': 'Parent', 'id': '99', 'locale': 'uk'}})
+        m.register_uri('GET', 'http://duedil.io/v3/uk/test/2/test-loadable.json',
+                       json={'response': {'name': 'Parent', 'id': '99'}})
+        client = ProClient(API_KEY, session=Session())
+        first = TestHasRelatedResources(id=1, client=client).test_loadable
+        second = TestHasRelatedResources(id=2, client=client).test_loadable
+        self.assertIs(first, second)
+        self.assertEqual(client.session.hits, 1)
+
+    def test_instance_without_session(self):
+        client = ProClient(API_KEY)
+        self.assertIsNot(TestRelatedProResource.instance(client, '1'),
+                         TestRelatedProResource.instance(client, '1'))
+
+    def test_eviction(self):
+        client = ProClient(API_KEY, session=Session(maxsize=2))
+        first = TestRelatedProResource.instance(client, '1', name='One')
+        TestRelatedProResource.instance(client, '2')
+        self.assertIs(TestRelatedProResource.instance(client, 1), first)
+        TestRelatedProResource.instance(client, '3')
+        self.assertEqual(len(client.session), 2)
+        self.assertIsNone(client.session.get(TestRelatedProResource, '2'))
+        self.assertIs(client.session.get(TestRelatedProResource, '1'), first)
+        self.assertIsNone(client.session.get(TestRelatedProResource, '1', locale='roi'))
+
 
 
 class LiteCompanyTestCase(unittest.TestCase):
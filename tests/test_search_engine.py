@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.search.engine import LocalQueryEngine, np
+
+API_KEY = '12345'
+
+ROWS = [
+    {'id': '1', 'name': 'Alpha', 'locale': 'uk', 'sic_code': '6201', 'turnover': 500},
+    {'id': '2', 'name': 'Beta', 'locale': 'uk', 'sic_code': '6201', 'turnover': 5000},
+    {'id': '3', 'name': 'Gamma', 'locale': 'uk', 'sic_code': '6201', 'turnover': 50000},
+    {'id': '4', 'name': 'Delta', 'locale': 'roi', 'sic_code': '6201'},
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class LocalQueryEngineTestCase(unittest.TestCase):
+
+    url = 'http://duedil.io/v3/companies.json'
+
+    def setUp(self):
+        self.client = ProClient(API_KEY, query_engine=LocalQueryEngine())
+
+    def _broad(self, m):
+        m.register_uri('GET', self.url,
+                       json={'response': {'data': ROWS, 'pagination': {'total': len(ROWS)}}})
+        return self.client.search_company(turnover=[0, 1e9], sic_code='6201')
+
+    @requests_mock.mock()
+    def test_narrower_range_answered_locally(self, m):
+        self._broad(m)
+        self.assertEqual(m.call_count, 1)
+        results = self.client.search_company(sic_code='6201', turnover=[1000, 100000])
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(len(results), 2)
+        self.assertEqual([r.id for r in results], ['2', '3'])
+
+    @requests_mock.mock()
+    def test_expired(self, m):
+        self.client.query_engine.expiration_time = 60
+        self._broad(m)
+        for index in self.client.query_engine._indexes.values():
+            index.created -= 61
+        results = self.client.search_company(sic_code='6201', turnover=[1000, 100000])
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(len(results), len(ROWS))
+        # the expired result set is gone, the new search is registered instead
+        self.assertEqual([index.query.range_filters for index in self.client.query_engine._indexes.values()],
+                         [(('turnover', (1000, 100000)),)])
+
+    @requests_mock.mock()
+    def test_order(self, m):
+        self._broad(m)
+        results = self.client.search_company(sic_code='6201', turnover=[100, 1e9],
+                                             order_by={'field': 'turnover', 'direction': 'desc'})
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual([r.id for r in results], ['3', '2', '1'])
+
+    @requests_mock.mock()
+    def test_extra_term_goes_remote(self, m):
+        self._broad(m)
+        # duedil may match UK as a word of the locale, the rows cannot tell
+        self.client.search_company(sic_code='6201', turnover=[0, 1e9], locale='UK')
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_local_paging(self, m):
+        self._broad(m)
+        results = self.client.search_company(sic_code='6201', turnover=[0, 1e9],
+                                             order_by={'field': 'turnover'}, limit=2)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(results.result_list), 2)
+        results.next()
+        # rows without the field sort last
+        self.assertEqual([r.id for r in results.result_list], ['1', '2', '3', '4'])
+        self.assertEqual(m.call_count, 1)
+
+    @requests_mock.mock()
+    def test_wider_range_goes_remote(self, m):
+        self._broad(m)
+        self.client.search_company(sic_code='6201', turnover=[0, 1e12])
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_different_term_goes_remote(self, m):
+        self._broad(m)
+        self.client.search_company(sic_code='4711', turnover=[0, 100])
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_field_missing_from_rows_goes_remote(self, m):
+        self._broad(m)
+        self.client.search_company(sic_code='6201', turnover=[0, 1e9], gearing=[0, 1])
+        self.assertEqual(m.call_count, 2)
+
+    @requests_mock.mock()
+    def test_partial_result_not_registered(self, m):
+        m.register_uri('GET', self.url,
+                       json={'response': {'data': ROWS[:2], 'pagination': {'total': 40}}})
+        self.client.search_company(turnover=[0, 1e9], sic_code='6201')
+        self.client.search_company(turnover=[0, 100], sic_code='6201')
+        self.assertEqual(m.call_count, 2)
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.resources.pro.company import Company
+from duedil.sectors import KLLSketch, SectorIndex
+
+API_KEY = '12345'
+
+
+class KLLSketchTestCase(unittest.TestCase):
+
+    def test_quantiles(self):
+        values = list(range(100000))
+        random.Random(1).shuffle(values)
+        sketch = KLLSketch(k=200, seed=1)
+        for value in values:
+            sketch.update(value)
+        self.assertEqual(sketch.count, 100000)
+        self.assertLess(sum(len(c) for c in sketch.compactors), 2000)
+        for q in (0.1, 0.5, 0.9):
+            self.assertAlmostEqual(sketch.quantile(q) / 100000.0, q, delta=0.02)
+            self.assertAlmostEqual(sketch.rank(q * 100000), q, delta=0.02)
+
+    def test_merge(self):
+        low, high = KLLSketch(seed=1), KLLSketch(seed=2)
+        for value in range(5000):
+            low.update(value)
+            high.update(value + 5000)
+        merged = low.merge(high)
+        self.assertEqual(merged.count, 10000)
+        self.assertAlmostEqual(merged.rank(5000), 0.5, delta=0.02)
+
+
+class SectorIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SectorIndex()
+        for turnover in range(1, 101):
+            self.index.add({'id': str(turnover), 'sic_code': 6201, 'sic2007code': '62012',
+                            'accounts_turnover': turnover * 1000})
+
+    def test_percentile(self):
+        self.assertEqual(self.index.percentile('accounts_turnover', 25000, 6201), 25.0)
+        self.assertEqual(self.index.percentile('accounts_turnover', 25000, '62012', 'sic2007code'), 25.0)
+        self.assertEqual(self.index.quantile('accounts_turnover', 0.5, '6201'), 50000)
+        self.assertIsNone(self.index.percentile('accounts_turnover', 1, 4711))
+        company = Company('x', client=ProClient(API_KEY), sic_code=6201, accounts_turnover=75000)
+        self.assertEqual(self.index.compare(company), {'accounts_turnover': 75.0})
+
+    def test_counted_once(self):
+        self.assertEqual(self.index.add({'id': '1', 'sic_code': 6201, 'accounts_turnover': 1}), 0)
+        self.assertEqual(self.index.sketch('accounts_turnover', 6201).count, 100)
+
+    def test_save_load(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'sectors.json.gz')
+            self.index.save(path)
+            loaded = SectorIndex.load(path)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertEqual(loaded.percentile('accounts_turnover', 25000, 6201), 25.0)
+        loaded.add({'id': '101', 'sic_code': 6201, 'accounts_turnover': 0})
+        self.assertEqual(loaded.sketch('accounts_turnover', 6201).count, 101)
+        self.assertEqual(loaded.add({'id': '5', 'sic_code': 6201, 'accounts_turnover': 0}), 0)
+
+    @requests_mock.mock()
+    def test_fed_by_client(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/uk/companies/7.json',
+                       json={'response': {'id': '7', 'sic_code': 4711, 'accounts_turnover': 10}})
+        client = ProClient(API_KEY, sector_index=SectorIndex())
+        client.get('uk/companies/7')
+        self.assertEqual(client.sector_index.percentile('accounts_turnover', 10, 4711), 100.0)
+
+    @requests_mock.mock()
+    def test_fed_by_search(self, m):
+        m.register_uri('GET', 'http://duedil.io/v3/companies.json', json={'response': {
+            'data': [{'id': '8', 'sic_code': 4711, 'turnover': 10, 'pre_tax_profit': 2, 'employee_count': 3},
+                     {'id': '9', 'sic_code': 4711, 'turnover': 30}],
+            'pagination': {'total': 2}}})
+        client = ProClient(API_KEY, sector_index=SectorIndex())
+        client.search_company(sic_code='4711')
+        index = client.sector_index
+        self.assertEqual(index.percentile('accounts_turnover', 10, 4711), 50.0)
+        self.assertEqual(index.sketch('accounts_pre_tax_profit', 4711).count, 1)
+        self.assertEqual(index.sketch('accounts_no_of_employees', 4711).count, 1)
+
+    def test_seen_is_bounded(self):
+        index = SectorIndex(seen_bits=1024)
+        index.extend({'id': str(i), 'sic_code': 6201, 'accounts_turnover': i} for i in range(2000))
+        # an overfull filter skips companies, it does not grow
+        self.assertEqual(len(index._seen.array), 128)
+        self.assertGreater(index.sketch('accounts_turnover', 6201).count, 100)
+        self.assertEqual(SectorIndex.from_dict(index.to_dict())._seen.array, index._seen.array)
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
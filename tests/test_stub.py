@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import unittest
+
+import requests
+
+from duedil.api import is_throttled
+from duedil.resources.pro.company import Company
+from duedil.session import Session
+from duedil.testing.stub import StubDataset, StubServer
+
+
+class StubDatasetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = StubDataset(size=20)
+
+    def test_deterministic(self):
+        self.assertEqual(self.dataset.get('uk/companies/7', {}), StubDataset(size=20).get('uk/companies/7', {}))
+        self.assertIsNone(self.dataset.get('uk/companies/21', {}))
+        self.assertIsNone(self.dataset.get('uk/companies/7/unknown', {}))
+
+    def test_director_companies(self):
+        for company_id in ('4', '5', '6'):
+            for director in self.dataset.get('uk/companies/{0}/directors'.format(company_id), {})['response']['data']:
+                companies = self.dataset.get('uk/directors/{0}/companies'.format(director['id']),
+                                             {'limit': 100})['response']['data']
+                self.assertIn(company_id, [c['id'] for c in companies])
+
+    def test_search(self):
+        result = self.dataset.get('companies', {'filters': '{"status": "Active"}', 'limit': 5})['response']
+        self.assertEqual(len(result['data']), 5)
+        self.assertTrue(all(c['status'] == 'Active' for c in result['data']))
+        self.assertEqual(result['pagination']['total'],
+                         len([i for i in range(1, 21) if self.dataset.company(str(i))['status'] == 'Active']))
+
+
+class StubServerTestCase(unittest.TestCase):
+
+    def test_client(self):
+        with StubServer(StubDataset(size=20)) as server:
+            client = server.client(session=Session())
+            company = Company.instance(client, '3')
+            self.assertEqual(company.name, 'Company 3 Limited')
+            self.assertEqual([d.id for d in company.directors], ['d1', 'd2', 'd3'])
+            self.assertEqual(client.get('uk/companies/99'), {})
+            self.assertEqual(server.requests, 3)
+
+    def test_throttled(self):
+        with StubServer(StubDataset(size=20), reject_rate=1.0) as server:
+            response = requests.get(server.url + '/uk/companies/1.json')
+            self.assertTrue(is_throttled(response))
+            self.assertEqual(server.rejected, 1)
+
+    def test_qps_limit(self):
+        with StubServer(StubDataset(size=20), qps_limit=2) as server:
+            responses = [requests.get(server.url + '/uk/companies/1.json') for _ in range(3)]
+        # the requests may straddle two one second windows
+        self.assertLessEqual(sum(is_throttled(r) for r in responses), 1)
+        self.assertGreaterEqual(sum(r.status_code == 200 for r in responses), 2)
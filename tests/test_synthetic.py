@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import io
+import json
+import unittest
+
+from duedil.resources.pro.company import Company, Director
+from duedil.session import Session
+from duedil.testing.stub import StubServer
+from duedil.testing.synthetic import DETAILS_CLASSES, SyntheticDataset, write_ndjson
+
+
+class SyntheticDatasetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = SyntheticDataset(size=500, seed=3)
+
+    def test_seeded(self):
+        self.assertEqual(self.dataset.company(42), SyntheticDataset(size=500, seed=3).company(42))
+        self.assertNotEqual(self.dataset.company(42), SyntheticDataset(size=500, seed=4).company(42))
+
+    def test_schema(self):
+        company = self.dataset.company(1)
+        self.assertEqual(set(company), set(Company.attribute_names) | {'id'})
+        self.assertEqual(set(self.dataset.director(1)), set(Director.attribute_names) | {'id'})
+        self.assertIsInstance(company['accounts_turnover'], int)
+        self.assertIsInstance(company['accounts_consolidated'], bool)
+        self.assertEqual(len(company['incorporation_date']), 10)
+
+    def test_directors(self):
+        for number in range(1, 100):
+            directors = self.dataset.company_directors(number)
+            self.assertIn(number, directors)
+            for director in directors:
+                self.assertIn(number, self.dataset.director_companies(director))
+        for director in range(1, 100):
+            for number in self.dataset.director_companies(director):
+                self.assertIn(director, self.dataset.company_directors(number))
+
+    def test_groups(self):
+        for number in range(1, 100):
+            for child in self.dataset.subsidiaries(number):
+                self.assertEqual(self.dataset.parent(child), number)
+            parent = self.dataset.parent(number)
+            if parent is not None:
+                self.assertIn(number, self.dataset.subsidiaries(parent))
+        self.assertIsNone(self.dataset.parent(1))
+        self.assertEqual(self.dataset.subsidiaries(1), [2, 3])
+
+    def test_accounts(self):
+        found = {}
+        for number in range(1, 500):
+            found.setdefault(self.dataset.account_type(number), number)
+        self.assertEqual(set(found), set(DETAILS_CLASSES))
+        for account_type, number in found.items():
+            details = self.dataset.get('uk/companies/{0}/accounts/{0}-2015'.format(number), {})['response']
+            self.assertEqual(set(details), set(DETAILS_CLASSES[account_type].attribute_names) | {'id'})
+        statutory = found['statutory']
+        details = self.dataset.account_details(statutory, 2015)
+        self.assertEqual(details['turnover'], self.dataset.company(statutory)['accounts_turnover'])
+        self.assertEqual(details['gross_profit'], details['turnover'] - details['cost_of_sales'])
+        self.assertIsNone(self.dataset.get('uk/companies/1/accounts/1-2001', {}))
+
+    def test_search(self):
+        first = self.dataset.get('companies', {'filters': '{"status": "Active"}', 'limit': 20})['response']
+        total = first['pagination']['total']
+        self.assertEqual(total, sum(self.dataset.profile(n)['status'] == 'Active' for n in range(1, 501)))
+        self.assertTrue(all(row['status'] == 'Active' for row in first['data']))
+        self.assertIn('offset=20', first['pagination']['next_url'])
+        last = self.dataset.get('companies', {'filters': '{"status": "Active"}', 'limit': 20,
+                                              'offset': total - 5})['response']
+        self.assertEqual(len(last['data']), 5)
+        self.assertNotIn('next_url', last['pagination'])
+
+        ordered = self.dataset.get('companies', {'filters': '{"turnover": [100000, null]}', 'limit': 100,
+                                                 'orderBy': '{"direction": "desc", "field": "turnover"}'})
+        turnovers = [row['accounts_turnover'] for row in ordered['response']['data']]
+        self.assertEqual(turnovers, sorted(turnovers, reverse=True))
+        self.assertTrue(all(turnover >= 100000 for turnover in turnovers))
+
+    def test_ndjson(self):
+        out = io.StringIO()
+        count = write_ndjson(SyntheticDataset(size=3), out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), count)
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(records[0]['endpoint'], 'uk/companies/1')
+        self.assertIn('uk/companies/1/accounts/1-2015', [r['endpoint'] for r in records])
+        out = io.StringIO()
+        self.assertEqual(write_ndjson(SyntheticDataset(size=3), out, related=False), 3)
+
+
+class SyntheticServerTestCase(unittest.TestCase):
+
+    def test_served(self):
+        with StubServer(SyntheticDataset(size=200, seed=1)) as server:
+            client = server.client(session=Session())
+            company = Company.instance(client, '10')
+            self.assertEqual([d.id for d in company.directors],
+                             ['d{0}'.format(k) for k in server.dataset.company_directors(10)])
+            self.assertEqual(company.parent.id, '8')
+            self.assertIn('10', [c.id for c in company.parent.subsidiaries])
+            timeline = company.accounts_timeline()
+            self.assertEqual([entry.date.year for entry in timeline], [2013, 2014, 2015])
+            results = client.search_company(limit=10, status='Active')
+            self.assertGreater(len(results), 20)
+            self.assertEqual(results[20].status, 'Active')
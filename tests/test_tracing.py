@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import re
+import unittest
+
+import requests_mock
+
+from duedil.api import ProClient
+from duedil.resources import prefetch_related
+from duedil.resources.pro.company import Company
+from duedil.tracing import trace
+
+API_KEY = '12345'
+
+
+def company_response(request, context):
+    path = request.path[len('/v3/uk/companies/'):-len('.json')]
+    if '/' in path:
+        return {'response': {'data': [{'id': 'd1'}], 'pagination': {'total': 1}}}
+    return {'response': {'id': path, 'name': 'Company ' + path}}
+
+
+class TracingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = ProClient(API_KEY)
+
+    @requests_mock.mock()
+    def test_attribution(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        company = Company('1', client=self.client)
+        with trace() as tracer:
+            company.name
+            company.directors
+        self.assertEqual([(s.attributes['duedil.resource'], s.attributes['duedil.attribute'])
+                          for s in tracer.spans],
+                         [('Company', 'name'), ('Company', 'directors')])
+        span = tracer.spans[0]
+        self.assertEqual(span.name, 'GET {locale}/companies/{id}')
+        self.assertEqual(span.requests, 1)
+        # the stack ends in the code that read the attribute
+        self.assertTrue(span.stack[-1][0].endswith('test_tracing.py'))
+
+    @requests_mock.mock()
+    def test_threads_and_summary(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        companies = [Company(str(i), client=self.client) for i in range(3)]
+        with trace(capture_stack=False) as tracer:
+            prefetch_related(companies, 'directors')
+            for company in companies:
+                company.name
+        summary = tracer.summary()
+        self.assertEqual(summary['calls'], 6)
+        self.assertEqual(summary['requests'], 6)
+        # as many calls and requests each, so ordered by name
+        self.assertEqual([(t['resource'], t['attribute'], t['calls'], t['requests']) for t in summary['triggers']],
+                         [('Company', 'directors', 3, 3), ('Company', 'name', 3, 3)])
+        self.assertEqual(summary['triggers'][0]['endpoints'], ['{locale}/companies/{id}/directors'])
+
+    @requests_mock.mock()
+    def test_otel(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        with trace(name='page') as tracer:
+            Company('1', client=self.client).name
+        spans = tracer.to_otel()[0]['scopeSpans'][0]['spans']
+        root, call = spans
+        self.assertEqual(root['name'], 'page')
+        self.assertEqual(call['parentSpanId'], root['spanId'])
+        self.assertEqual(call['traceId'], root['traceId'])
+        self.assertEqual(len(call['traceId']), 32)
+        attributes = dict((a['key'], a['value']) for a in call['attributes'])
+        self.assertEqual(attributes['duedil.attribute'], {'stringValue': 'name'})
+        self.assertEqual(attributes['duedil.cache_hit'], {'boolValue': False})
+        self.assertIn('code.stacktrace', attributes)
+
+    @requests_mock.mock()
+    def test_not_tracing(self, m):
+        m.register_uri('GET', re.compile('http://duedil.io/v3/uk/companies/.*'), json=company_response)
+        tracer = trace()
+        Company('1', client=self.client).name
+        self.assertEqual(tracer.spans, [])
+
+
+if __name__ == '__main__':   # pragma: no cover
+    unittest.main()
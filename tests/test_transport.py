@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+#  DuedilApiClient v3 Pro
+#  @copyright 2014 Christian Ledermann
+#
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests_mock
+
+from requests.exceptions import ConnectionError, HTTPError
+
+from duedil.api import APIMonthlyLimitException, ProClient
+from duedil.testing.stub import StubDataset, StubServer, StubTransport
+from duedil.transport import (Cassette, CassetteError, CassetteMiss, RecordingTransport,
+                              ReplayTransport, RequestsTransport, Transport, build_response,
+                              request_key)
+
+API_KEY = '12345'
+
+URL = 'http://duedil.io/v3/uk/companies/{0}.json'
+
+
+class RequestKeyTestCase(unittest.TestCase):
+
+    def test_request_key(self):
+        self.assertEqual(request_key('http://duedil.io/v3/uk/companies/1.json', {'api_key': 'a'}),
+                         '/v3/uk/companies/1.json')
+        self.assertEqual(request_key('http://127.0.0.1:8000/v3/companies', {'limit': 5, 'api_key': 'b',
+                                                                           'filters': '{}'}),
+                         '/v3/companies?filters=%7B%7D&limit=5')
+
+
+class CassetteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.cassette')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @requests_mock.mock()
+    def test_record_replay(self, m):
+        for i in range(1, 4):
+            m.register_uri('GET', URL.format(i), text='{{"response": {{"id": "{0}"}}}}'.format(i))
+        m.register_uri('GET', URL.format(4), status_code=404, text='')
+        with Cassette(self.path, 'w') as cassette:
+            client = ProClient(API_KEY, transport=RecordingTransport(cassette))
+            recorded = [client.get('uk/companies/{0}'.format(i)) for i in range(1, 5)]
+        self.assertEqual(m.call_count, 4)
+
+        with Cassette(self.path) as cassette:
+            self.assertEqual(len(cassette), 4)
+            client = ProClient('another key', transport=ReplayTransport(cassette))
+            client.base_url = 'http://127.0.0.1:1/v3'
+            self.assertEqual([client.get('uk/companies/{0}'.format(i)) for i in range(1, 5)], recorded)
+            self.assertRaises(CassetteMiss, client.get, 'uk/companies/5')
+        self.assertEqual(m.call_count, 4)
+
+    def test_last_response_wins(self):
+        with Cassette(self.path, 'w') as cassette:
+            cassette.record('/a', build_response('/a', 403, 'Developer Over Qps'), 0.1)
+            cassette.record('/a', build_response('/a', 200, '{"response": {}}'), 0.2)
+        with Cassette(self.path) as cassette:
+            record = cassette.lookup('/a')
+        self.assertEqual((record['status'], record['elapsed']), (200, 0.2))
+
+    def test_unclosed(self):
+        cassette = Cassette(self.path, 'w')
+        for i in range(3):
+            cassette.record('/{0}'.format(i), build_response('/', 200, '{"i": %d}' % i), 0)
+        cassette._file.flush()
+        # a crashed recording, with half of a last record
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00\x00\x01\x00abc')
+        replay = Cassette(self.path)
+        self.assertEqual(sorted(replay.index), ['/0', '/1', '/2'])
+        self.assertEqual(replay.lookup('/2')['body'], '{"i": 2}')
+        replay.close()
+        cassette.close()
+
+    def test_not_a_cassette(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{}')
+        self.assertRaises(CassetteError, Cassette, self.path)
+
+    def test_latency_and_fallback(self):
+        with Cassette(self.path, 'w') as cassette:
+            cassette.record('/v3/uk/companies/1.json', build_response('/', 200, '{"response": {"id": "1"}}'), 0.05)
+
+        class Fallback(object):
+            def send(self, url, params=None, timeout=None):
+                return build_response(url, 200, '{"response": {"id": "fallback"}}')
+
+        with Cassette(self.path) as cassette:
+            transport = ReplayTransport(cassette, latency=1.0, fallback=Fallback())
+            start = time.time()
+            response = transport.send(URL.format(1), {'api_key': API_KEY})
+            self.assertGreaterEqual(time.time() - start, 0.05)
+            self.assertEqual(response.json(), {'response': {'id': '1'}})
+            self.assertEqual(transport.send(URL.format(2)).json()['response']['id'], 'fallback')
+
+
+class TransportTestCase(unittest.TestCase):
+
+    def test_stats(self):
+        class Broken(Transport):
+            def _send(self, url, params, timeout):
+                if params:
+                    raise ConnectionError()
+                return build_response(url, 200, '{"response": {}}')
+
+        transport = Broken()
+        transport.send('http://duedil.io/v3/uk/companies/1.json')
+        self.assertRaises(ConnectionError, transport.send, 'http://duedil.io/v3/uk/companies/1.json', {'a': 1})
+        stats = transport.connection_stats()
+        self.assertEqual((stats['requests'], stats['errors'], stats['bytes_received']), (2, 1, 16))
+        self.assertEqual(b''.join(transport.stream('http://duedil.io/v3/uk/companies/1.json', chunk_size=5)),
+                         b'{"response": {}}')
+
+    def test_requests_pooled(self):
+        with StubServer(StubDataset(size=20)) as server, RequestsTransport(pool_size=2) as transport:
+            client = server.client(transport=transport)
+            for i in range(1, 11):
+                self.assertEqual(client.get('uk/companies/{0}'.format(i))['response']['id'], str(i))
+            self.assertEqual(client.get('uk/companies/99'), {})
+            chunks = list(transport.stream(server.url + '/uk/companies/1.json', chunk_size=64))
+            self.assertGreater(len(chunks), 1)
+            stats = transport.connection_stats()
+        self.assertEqual(stats['requests'], 12)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['pooled_requests'], 12)
+
+    def test_stub_transport(self):
+        transport = StubTransport(StubDataset(size=20))
+        client = ProClient(API_KEY, transport=transport)
+        self.assertEqual(client.get('uk/companies/3')['response']['name'], 'Company 3 Limited')
+        self.assertEqual(client.get('uk/companies/30'), {})
+        results = client.search_company(limit=5, status='Active')
+        self.assertEqual(results[7].id, [c['id'] for c in StubDataset(size=20).search(
+            {'filters': '{"status": "Active"}', 'limit': 20})['response']['data']][7])
+        self.assertEqual(transport.stats.requests, 4)
+        client.close()
+
+    def test_error_mapping(self):
+        self.assertEqual(ProClient._result(build_response('/', 404, '')), {})
+        self.assertRaises(APIMonthlyLimitException, ProClient._result,
+                          build_response('/', 403, 'Developer Over Rate', 'Forbidden'))
+        self.assertRaises(HTTPError, ProClient._result, build_response('/', 500, 'oops', 'Server Error'))